@@ -0,0 +1,247 @@
+# backend/app/benchmarks/knowledge_base_benchmark.py
+"""
+Retrieval quality and latency benchmark for the knowledge base.
+
+Builds a throwaway ChromaDB collection from the checked-in scraped_data files,
+runs a labelled query set through the same collection.query() call that
+KnowledgeBaseService.search makes, and reports recall@k, MRR, query latency
+percentiles, embedding throughput and index build time.
+
+Run from the backend directory:
+
+    python -m app.benchmarks.knowledge_base_benchmark
+    python -m app.benchmarks.knowledge_base_benchmark --chunker window --chunk-size 120
+    python -m app.benchmarks.knowledge_base_benchmark --model all-MiniLM-L6-v2 --hnsw-m 32 --search-ef 64
+    python -m app.benchmarks.knowledge_base_benchmark --output results.json
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import chromadb
+
+from app.utils.chunking import prepare_text_chunks, prepare_window_chunks
+from app.utils.embeddings import SentenceTransformerEmbeddings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).parent.parent
+DEFAULT_DATA_DIR = APP_DIR / "scraped_data"
+DEFAULT_QUERIES = Path(__file__).parent / "kb_queries.json"
+DEFAULT_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+COLLECTION_NAME = "kb_benchmark"
+
+
+def load_chunks(data_dir: Path, chunker: str, chunk_size: int, overlap: int) -> List[Dict]:
+    """Chunk every scraped page in data_dir with the selected chunker"""
+    chunks = []
+    for json_file in sorted(data_dir.glob("*.json")):
+        with open(json_file, "r", encoding="utf-8") as f:
+            content = json.load(f)
+
+        if chunker == "structured":
+            chunks.extend(prepare_text_chunks(content))
+        else:
+            chunks.extend(prepare_window_chunks(content, chunk_size=chunk_size, overlap=overlap))
+
+    return chunks
+
+
+def build_hnsw_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    """Collection metadata for the requested HNSW settings; unset values keep Chroma defaults"""
+    metadata: Dict[str, Any] = {"hnsw:space": args.space}
+    if args.hnsw_m is not None:
+        metadata["hnsw:M"] = args.hnsw_m
+    if args.construction_ef is not None:
+        metadata["hnsw:construction_ef"] = args.construction_ef
+    if args.search_ef is not None:
+        metadata["hnsw:search_ef"] = args.search_ef
+    if args.num_threads is not None:
+        metadata["hnsw:num_threads"] = args.num_threads
+    return metadata
+
+
+def is_relevant(document: str, metadata: Dict[str, Any], judgement: Dict[str, str]) -> bool:
+    """A hit satisfies a judgement when its URL contains judgement['url'] and its text contains judgement['contains']"""
+    if judgement.get("url") and judgement["url"] not in metadata.get("url", ""):
+        return False
+    if judgement.get("contains") and judgement["contains"].lower() not in document.lower():
+        return False
+    return True
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    chunks = load_chunks(Path(args.data_dir), args.chunker, args.chunk_size, args.chunk_overlap)
+    if not chunks:
+        raise RuntimeError(f"No chunks produced from {args.data_dir}")
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        labelled_queries = json.load(f)
+
+    embedding_function = SentenceTransformerEmbeddings(model_name=args.model)
+
+    # Embedding throughput, measured separately from index construction
+    texts = [chunk["text"] for chunk in chunks]
+    embed_start = time.perf_counter()
+    embeddings = embedding_function(texts)
+    embed_seconds = time.perf_counter() - embed_start
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        client = chromadb.PersistentClient(path=storage_dir)
+        collection = client.create_collection(
+            name=COLLECTION_NAME,
+            embedding_function=embedding_function,
+            metadata=build_hnsw_metadata(args),
+        )
+
+        ids = [
+            hashlib.sha256(f"{idx}_{chunk['url']}_{chunk['text']}".encode()).hexdigest()
+            for idx, chunk in enumerate(chunks)
+        ]
+        metadatas = [
+            {"url": chunk["url"], "type": chunk["type"], "title": chunk["title"]}
+            for chunk in chunks
+        ]
+
+        build_start = time.perf_counter()
+        for start in range(0, len(chunks), args.batch_size):
+            end = start + args.batch_size
+            collection.add(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=texts[start:end],
+                metadatas=metadatas[start:end],
+            )
+        build_seconds = time.perf_counter() - build_start
+
+        # Warm up the model and index so the first query does not skew the percentiles
+        collection.query(query_texts=[labelled_queries[0]["query"]], n_results=args.k)
+
+        latencies_ms: List[float] = []
+        per_query = []
+        for item in labelled_queries:
+            results = None
+            for _ in range(args.repeat):
+                query_start = time.perf_counter()
+                results = collection.query(query_texts=[item["query"]], n_results=args.k)
+                latencies_ms.append((time.perf_counter() - query_start) * 1000)
+
+            documents = results["documents"][0]
+            hit_metadatas = results["metadatas"][0]
+            judgements = item["relevant"]
+
+            satisfied = sum(
+                1 for judgement in judgements
+                if any(is_relevant(doc, meta, judgement) for doc, meta in zip(documents, hit_metadatas))
+            )
+            first_rank: Optional[int] = next(
+                (
+                    rank for rank, (doc, meta) in enumerate(zip(documents, hit_metadatas), 1)
+                    if any(is_relevant(doc, meta, judgement) for judgement in judgements)
+                ),
+                None,
+            )
+
+            per_query.append({
+                "query": item["query"],
+                "recall": satisfied / len(judgements) if judgements else 0.0,
+                "reciprocal_rank": 1.0 / first_rank if first_rank else 0.0,
+                "first_relevant_rank": first_rank,
+            })
+
+    return {
+        "config": {
+            "model": args.model,
+            "chunker": args.chunker,
+            "chunk_size": args.chunk_size if args.chunker == "window" else None,
+            "chunk_overlap": args.chunk_overlap if args.chunker == "window" else None,
+            "hnsw": build_hnsw_metadata(args),
+            "k": args.k,
+            "repeat": args.repeat,
+        },
+        "corpus": {
+            "chunks": len(chunks),
+            "queries": len(labelled_queries),
+        },
+        "quality": {
+            f"recall@{args.k}": round(statistics.mean(q["recall"] for q in per_query), 4),
+            "mrr": round(statistics.mean(q["reciprocal_rank"] for q in per_query), 4),
+        },
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 3),
+            "p95": round(percentile(latencies_ms, 95), 3),
+            "p99": round(percentile(latencies_ms, 99), 3),
+            "mean": round(statistics.mean(latencies_ms), 3),
+        },
+        "indexing": {
+            "embedding_seconds": round(embed_seconds, 3),
+            "embeddings_per_second": round(len(chunks) / embed_seconds, 1) if embed_seconds else None,
+            "index_build_seconds": round(build_seconds, 3),
+        },
+        "per_query": per_query,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark knowledge base retrieval quality and latency")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="Directory of scraped page JSON files")
+    parser.add_argument("--queries", default=str(DEFAULT_QUERIES), help="Labelled query set (JSON)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Sentence Transformer model name")
+    parser.add_argument("--chunker", choices=["structured", "window"], default="structured",
+                        help="structured = ChromaDataLoader chunks; window = fixed word windows")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Words per window (window chunker)")
+    parser.add_argument("--chunk-overlap", type=int, default=40, help="Overlapping words (window chunker)")
+    parser.add_argument("--space", default="cosine", choices=["cosine", "l2", "ip"], help="HNSW distance")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="HNSW M (graph degree)")
+    parser.add_argument("--construction-ef", type=int, default=None, help="HNSW construction_ef")
+    parser.add_argument("--search-ef", type=int, default=None, help="HNSW search_ef")
+    parser.add_argument("--num-threads", type=int, default=None, help="HNSW build threads")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents per collection.add call")
+    parser.add_argument("-k", type=int, default=5, help="Results per query (recall@k)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--output", default=None, help="Write the full report to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+    report = run_benchmark(args)
+
+    print(f"\nKnowledge base benchmark ({report['corpus']['chunks']} chunks, {report['corpus']['queries']} queries)")
+    print(f"Config: {json.dumps(report['config'])}")
+    for section in ("quality", "latency_ms", "indexing"):
+        print(f"\n{section}:")
+        for name, value in report[section].items():
+            print(f"  {name:<24} {value}")
+
+    misses = [q["query"] for q in report["per_query"] if not q["first_relevant_rank"]]
+    if misses:
+        print(f"\nQueries with no relevant hit in top {args.k}:")
+        for query in misses:
+            print(f"  - {query}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nFull report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,11 +20,53 @@ class Settings(BaseSettings):
     SMTP_PORT: int
     FRONTEND_URL: str
 
+    # Email outbox sender
+    EMAIL_SMTP_POOL_SIZE: int = 4  # Persistent SMTP connections, i.e. concurrent sends
+    EMAIL_BATCH_SIZE: int = 100
+    EMAIL_RATE_PER_MINUTE: int = 1200  # Keep under the SMTP provider's sending limit
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 30  # Doubles after each failed attempt
+    EMAIL_RETRY_MAX_SECONDS: float = 3600
+    EMAIL_POLL_INTERVAL_SECONDS: float = 2
+
     # ChromaDB Configuration
     CHROMADB_HOST: str = "localhost"
     CHROMADB_PORT: int = 8000
-    CHROMADB_COLLECTION_NAME: str = "government_services_v1"
-    
+    CHROMADB_COLLECTION_NAME: str = "government_services_v1"  # Used until a rebuild activates a newer version
+    CHROMADB_STORAGE_PATH: str = "/tmp/chroma_storage"  # Shared by the API and ChromaDataLoader
+    CHROMADB_EMBEDDING_MODEL: str = "paraphrase-multilingual-MiniLM-L12-v2"
+
+    # HNSW index parameters (applied when a collection version is created)
+    CHROMADB_HNSW_SPACE: str = "cosine"
+    CHROMADB_HNSW_M: int = 16
+    CHROMADB_HNSW_CONSTRUCTION_EF: int = 100
+    CHROMADB_HNSW_SEARCH_EF: int = 10  # Recall/latency knob for queries
+    CHROMADB_HNSW_NUM_THREADS: int = 2  # Kept low so background rebuilds leave CPU for live queries
+    CHROMADB_REBUILD_BATCH_SIZE: int = 256
+    CHROMADB_REBUILD_PAUSE_SECONDS: float = 0.05  # Pause between rebuild batches
+
+    # Admin dashboard/analytics response cache (per department)
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30
+    DASHBOARD_CACHE_STALE_SECONDS: int = 120  # Served while a background refresh runs
+
+    # Notification WebSockets
+    WS_SEND_QUEUE_SIZE: int = 100  # Messages buffered per connection before a slow client is dropped
+    WS_SEND_TIMEOUT_SECONDS: float = 10
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25
+    WS_IDLE_TIMEOUT_SECONDS: float = 75  # Evict connections with no successful send or received frame for this long
+
+    # Real-time notification fan-out across API workers: "local" (single process) or "redis"
+    NOTIFICATION_PUBSUB_BACKEND: str = "local"
+    NOTIFICATION_PUBSUB_URL: str | None = None  # Defaults to CELERY_BROKER_URL
+    NOTIFICATION_PUBSUB_CHANNEL: str = "gov-portal:notifications"
+
+    # Background workers. Set RUN_BACKGROUND_WORKERS=false on API processes when the jobs
+    # run in their own process (python -m app.tasks.run_workers); that split needs the redis pub/sub
+    # backend so notifications created by the workers reach the API's WebSockets (both refuse to start otherwise).
+    RUN_BACKGROUND_WORKERS: bool = True
+    WORKER_LEASE_SECONDS: float = 30  # Cluster-wide jobs move to another process this long after their leader dies
+    WORKER_RESTART_DELAY_SECONDS: float = 10
+
     # Web Monitoring Settings
     SCRAPING_INTERVAL_MINUTES: int = 30
     MAX_CONCURRENT_SCRAPES: int = 5
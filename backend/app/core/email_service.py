@@ -1,14 +1,52 @@
 # backend/app/core/email_service.py
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings
 import logging
 import datetime
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from jinja2 import DictLoader, Environment, Template
+from markupsafe import Markup
 
 logger = logging.getLogger(__name__)
 
 
+def render_notification_email(
+    subject: str,
+    message: str,
+    notification_type: str,
+    appointment=None,
+    document=None
+) -> str:
+    """Render the HTML body of a notification email with its type-specific template"""
+    if notification_type == "DocumentExpiry" and document:
+        return generate_document_expiry_template(document, message)
+    if notification_type == "AppointmentStatusChange" and appointment:
+        return generate_status_change_template(appointment, message)
+    return generate_general_template(subject, message)
+
+
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = settings.EMAIL_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Errors that retrying will not fix, such as a rejected recipient"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # Configuration problem; retry once it is fixed
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
 async def send_notification_email(
     email: str,
     subject: str,
@@ -17,114 +55,276 @@ async def send_notification_email(
     appointment=None,
     document=None
 ):
-    """Send email notification with type-specific templates"""
+    """
+    Render and send one notification email right away on a short-lived connection.
+    Application code queues emails in the outbox instead; this is for scripts and manual tests.
+    """
     if not settings.EMAIL_ENABLED:
         logger.info("Email notifications are disabled in settings")
         return
 
+    pool = SMTPConnectionPool(1)
     try:
-        # Use configured credentials
-        sender_email = settings.EMAIL_FROM
-        sender_password = settings.EMAIL_APP_PASSWORD
+        body = render_notification_email(subject, message, notification_type, appointment, document)
+        await pool.send(build_message(email, subject, body))
+        logger.info(f"Email notification sent to {email}")
+    except Exception as e:
+        logger.error(f"Failed to send email to {email}: {str(e)}")
+    finally:
+        await pool.close()
+
+
+class SMTPConnectionPool:
+    """
+    A fixed number of logged-in SMTP connections, reused across emails.
+    smtplib is blocking, so every connect and send runs in a worker thread.
+    Connections are opened on first use and reopened when the server drops them.
+    """
 
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = email
-        msg['Subject'] = subject
+    def __init__(self, size: int):
+        self._connections: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._connections.put_nowait(None)
 
-        if notification_type == "DocumentExpiry":
-            body = generate_document_expiry_template(document, message)
-        elif notification_type == "AppointmentStatusChange" and appointment:
-            body = generate_status_change_template(appointment, message)
-        else:
-            body = generate_general_template(subject, message)
+    @staticmethod
+    def _connect() -> smtplib.SMTP_SSL:
+        server = smtplib.SMTP_SSL(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=30)
+        server.login(settings.EMAIL_FROM, settings.EMAIL_APP_PASSWORD)
+        return server
 
-        msg.attach(MIMEText(body, 'html'))
+    @classmethod
+    def _send_blocking(
+        cls, server: Optional[smtplib.SMTP_SSL], msg: MIMEMultipart
+    ) -> Tuple[Optional[smtplib.SMTP_SSL], Optional[Exception]]:
+        """
+        Send msg, connecting or reconnecting as needed. Returns the connection now in use
+        (None if none could be opened) and the error, if any, so that a connection opened
+        here goes back to the pool even when the send fails.
+        """
+        try:
+            if server is None:
+                server = cls._connect()
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connection closed by the server; reconnect once
+                cls._close_blocking(server)
+                server = None
+                server = cls._connect()
+                server.send_message(msg)
+        except Exception as e:
+            return server, e
+        return server, None
 
-        with smtplib.SMTP_SSL(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-            logger.info(f"Email notification sent to {email}")
+    @staticmethod
+    def _close_blocking(server: Optional[smtplib.SMTP_SSL]):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            pass
 
-    except Exception as e:
-        logger.error(f"Failed to send email to {email}: {str(e)}")
+    async def send(self, msg: MIMEMultipart):
+        """Send on a free pooled connection, waiting for one if all are busy"""
+        server = await self._connections.get()
+        error = None
+        try:
+            server, error = await asyncio.to_thread(self._send_blocking, server, msg)
+            if error is not None and not isinstance(
+                error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)
+            ):
+                # Message-level errors leave the connection usable; anything else drops it
+                await asyncio.to_thread(self._close_blocking, server)
+                server = None
+        finally:
+            self._connections.put_nowait(server)
+        if error is not None:
+            raise error
+
+    async def close(self):
+        """Log out idle connections; the pool reconnects if used again"""
+        servers = []
+        while not self._connections.empty():
+            servers.append(self._connections.get_nowait())
+        for server in servers:
+            await asyncio.to_thread(self._close_blocking, server)
+            self._connections.put_nowait(None)
 
 
 # -------------------------------------------------------------------
-# Common Base Template
+# Templates
 # -------------------------------------------------------------------
-def generate_base_template(title: str, content: str) -> str:
-    """Reusable HTML email template with logo, banner, and brand colors"""
-    return f"""
+# Compiled once when the renderer is created. Every template extends base.html; the
+# footer only changes with the year, so it is rendered once per year and reused.
+EMAIL_TEMPLATES = {
+    "base.html": """
     <html>
     <body style="margin:0; padding:0; font-family: Arial, sans-serif; background-color:#f9f9f9;">
         <div style="max-width: 650px; margin: 20px auto; background:#ffffff; border-radius:10px; overflow:hidden; box-shadow:0 4px 10px rgba(0,0,0,0.1);">
             
             <div style="background: linear-gradient(90deg, #FFC107, #FF5B00, #e74c3c); padding:20px; text-align:center;">
                 <img src="https://your-backend-url.com/static/gov_portal_logo.png"   alt="Gov-Portal" style="height:50px;">
-                <h1 style="color:#fff; margin:0; font-size:22px;">{title}</h1>
+                <h1 style="color:#fff; margin:0; font-size:22px;">{% block title %}{% endblock %}</h1>
             </div>
 
             <!-- Body -->
             <div style="padding:25px; color:#333; line-height:1.6;">
-                {content}
+                {% block content %}{% endblock %}
             </div>
 
-            <!-- Footer -->
-            <div style="background-color:#f4f4f4; padding:15px; text-align:center; font-size:12px; color:#555;">
-                <p>Need help? <a href="{settings.FRONTEND_URL}/support" style="color:#FF5B00; text-decoration:none;">Contact support</a></p>
-                <p>© {datetime.datetime.now().year} Gov-Portal. All rights reserved.</p>
-            </div>
+            {{ footer }}
         </div>
     </body>
     </html>
-    """
-
-
-# -------------------------------------------------------------------
-# Appointment Notification Template
-# -------------------------------------------------------------------
-def generate_status_change_template(appointment, message: str) -> str:
-    content = f"""
+    """,
+    "footer.html": """<!-- Footer -->
+            <div style="background-color:#f4f4f4; padding:15px; text-align:center; font-size:12px; color:#555;">
+                <p>Need help? <a href="{{ frontend_url }}/support" style="color:#FF5B00; text-decoration:none;">Contact support</a></p>
+                <p>© {{ year }} Gov-Portal. All rights reserved.</p>
+            </div>""",
+    "status_change.html": """{% extends "base.html" %}
+        {% block title %}Gov-Portal Appointment Update 🚀{% endblock %}
+        {% block content %}
         <h2 style="color:#279541;">Appointment Update</h2>
-        <p><strong>Service:</strong> {appointment.service.name}</p>
-        <p><strong>Date/Time:</strong> {appointment.appointment_datetime.strftime('%Y-%m-%d %H:%M')}</p>
+        <p><strong>Service:</strong> {{ appointment.service.name }}</p>
+        <p><strong>Date/Time:</strong> {{ appointment.appointment_datetime.strftime('%Y-%m-%d %H:%M') }}</p>
         <p><strong>Status:</strong> 
-            <span style="color:{get_status_color(appointment.status)}">{appointment.status}</span>
+            <span style="color:{{ status_color(appointment.status) }}">{{ appointment.status }}</span>
         </p>
-        <p>{message}</p>
-    """
-    return generate_base_template("Gov-Portal Appointment Update 🚀", content)
-
-
-# -------------------------------------------------------------------
-# Document Expiry Template
-# -------------------------------------------------------------------
-def generate_document_expiry_template(document, message: str) -> str:
-    content = f"""
+        <p>{{ message }}</p>
+        {% endblock %}""",
+    "document_expiry.html": """{% extends "base.html" %}
+        {% block title %}Gov-Portal Document Expiry ⏰{% endblock %}
+        {% block content %}
         <h2 style="color:#8C1F28;">Document Expiry Notice</h2>
-        <p><strong>Document Type:</strong> {document.document_type}</p>
-        <p><strong>Expiry Date:</strong> <span style="color:#FF5B00;">{document.expiry_date.strftime('%Y-%m-%d')}</span></p>
-        <p><strong>Days Remaining:</strong> {(document.expiry_date - datetime.datetime.now()).days}</p>
-        <p>{message}</p>
-        <a href="{settings.FRONTEND_URL}/documents/renew/{document.document_id}" 
+        <p><strong>Document Type:</strong> {{ document.document_type }}</p>
+        <p><strong>Expiry Date:</strong> <span style="color:#FF5B00;">{{ document.expiry_date.strftime('%Y-%m-%d') }}</span></p>
+        <p><strong>Days Remaining:</strong> {{ days_remaining }}</p>
+        <p>{{ message }}</p>
+        <a href="{{ frontend_url }}/documents/renew/{{ document.document_id }}" 
            style="display:inline-block; background-color:#279541; color:white; padding:12px 20px; text-decoration:none; border-radius:6px; margin-top:15px;">
             Renew Document
         </a>
-    """
-    return generate_base_template("Gov-Portal Document Expiry ⏰", content)
+        {% endblock %}""",
+    "general.html": """{% extends "base.html" %}
+        {% block title %}Gov-Portal Notification 📩{% endblock %}
+        {% block content %}
+        <h2 style="color:#FF5B00;">{{ subject }}</h2>
+        <p>{{ message }}</p>
+        <p><em>Please log in to your account for more details.</em></p>
+        {% endblock %}""",
+    "digest.html": """{% extends "base.html" %}
+        {% block title %}Gov-Portal Notifications 📩{% endblock %}
+        {% block content %}
+        <h2 style="color:#FF5B00;">You have {{ notifications|length }} new notifications</h2>
+        {% for notification in notifications %}
+        <div style="border-left:4px solid {{ notification.color }}; padding:4px 12px; margin:12px 0;">
+            <p style="margin:0;"><strong>{{ notification.title }}</strong></p>
+            <p style="margin:4px 0 0;">{{ notification.message }}</p>
+        </div>
+        {% endfor %}
+        <p><em>Please log in to your account for more details.</em></p>
+        {% endblock %}""",
+}
+
+# Digest entry headings and accent colors per notification type
+DIGEST_TYPE_STYLES = {
+    "Appointment": ("Appointment Reminder", "#279541"),
+    "AppointmentStatusChange": ("Appointment Update", "#3498db"),
+    "DocumentExpiry": ("Document Expiry Notice", "#8C1F28"),
+    "Document": ("Document Update", "#FF5B00"),
+}
+
+
+class EmailTemplateRenderer:
+    """Renders the compiled email templates and records per-template render times"""
+
+    def __init__(self, templates: Dict[str, str]):
+        self.env = Environment(loader=DictLoader(templates), autoescape=True)
+        self.env.globals.update(frontend_url=settings.FRONTEND_URL, status_color=get_status_color)
+        self._templates: Dict[str, Template] = {
+            name: self.env.get_template(name) for name in templates if name not in ("base.html", "footer.html")
+        }
+        self._footer_year: Optional[int] = None
+        self._footer = Markup("")
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def footer(self) -> Markup:
+        year = datetime.datetime.now().year
+        if year != self._footer_year:
+            self._footer = Markup(self.env.get_template("footer.html").render(year=year))
+            self._footer_year = year
+        return self._footer
+
+    def render(self, name: str, **context) -> str:
+        return self.render_many(name, [context])[0]
+
+    def render_many(self, name: str, contexts: List[Dict[str, Any]]) -> List[str]:
+        """Render one template for many recipients, e.g. a batch of digest emails"""
+        template = self._templates[name]
+        footer = self.footer()
+        started = time.perf_counter()
+        bodies = [template.render(footer=footer, **context) for context in contexts]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stats = self._stats.setdefault(name, {"renders": 0, "total_ms": 0.0, "max_batch_ms": 0.0})
+        stats["renders"] += len(contexts)
+        stats["total_ms"] += elapsed_ms
+        stats["max_batch_ms"] = max(stats["max_batch_ms"], elapsed_ms)
+        return bodies
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "renders": stats["renders"],
+                "avg_ms": round(stats["total_ms"] / stats["renders"], 3) if stats["renders"] else 0.0,
+                "max_batch_ms": round(stats["max_batch_ms"], 3),
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+def generate_status_change_template(appointment, message: str) -> str:
+    return template_renderer.render("status_change.html", appointment=appointment, message=message)
+
+
+def days_until(moment: datetime.datetime) -> int:
+    """Whole days from now until a UTC timestamp; naive values are taken as UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return (moment - datetime.datetime.now(datetime.timezone.utc)).days
+
+
+def generate_document_expiry_template(document, message: str) -> str:
+    return template_renderer.render(
+        "document_expiry.html",
+        document=document,
+        message=message,
+        days_remaining=days_until(document.expiry_date),
+    )
 
 
-# -------------------------------------------------------------------
-# General Notification Template
-# -------------------------------------------------------------------
 def generate_general_template(subject: str, message: str) -> str:
-    content = f"""
-        <h2 style="color:#FF5B00;">{subject}</h2>
-        <p>{message}</p>
-        <p><em>Please log in to your account for more details.</em></p>
-    """
-    return generate_base_template("Gov-Portal Notification 📩", content)
+    return template_renderer.render("general.html", subject=subject, message=message)
+
+
+def digest_context(notifications: List[Any]) -> Dict[str, Any]:
+    entries = []
+    for notification in notifications:
+        notification_type = getattr(notification.type, "value", notification.type)
+        title, color = DIGEST_TYPE_STYLES.get(notification_type, ("Notification", "#FF5B00"))
+        entries.append({"title": title, "color": color, "message": notification.message})
+    return {"notifications": entries}
+
+
+def render_notification_digests(groups: List[List[Any]]) -> List[Tuple[str, str]]:
+    """Subject and HTML body of one digest email per group of notifications, rendered as a batch"""
+    bodies = template_renderer.render_many("digest.html", [digest_context(group) for group in groups])
+    return [
+        (f"Gov-Portal: You have {len(group)} new notifications", body)
+        for group, body in zip(groups, bodies)
+    ]
 
 
 # -------------------------------------------------------------------
@@ -138,4 +338,7 @@ def get_status_color(status: str) -> str:
         "Completed": "#27ae60",   # Dark Green
         "Cancelled": "#e74c3c",   # Red
     }
-    return colors.get(status, "#7f8c8d")  # Default gray
\ No newline at end of file
+    return colors.get(status, "#7f8c8d")  # Default gray
+
+
+template_renderer = EmailTemplateRenderer(EMAIL_TEMPLATES)
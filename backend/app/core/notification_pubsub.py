@@ -0,0 +1,191 @@
+# backend/app/core/notification_pubsub.py
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict
+
+from app.core.config import settings
+from app.core.websocket_manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 1000  # Recent deliveries kept for latency percentiles
+
+
+class NotificationBus(ABC):
+    """
+    Fans real-time notifications out to every API worker.
+
+    publish() sends {citizen_id, message} to all workers; each worker's subscriber
+    delivers it to the sockets of that citizen connected to it. signal() wakes the
+    background jobs waiting on signal_event() in every process, e.g. the dispatcher of
+    events committed by another process. Subclasses provide the transport; this base
+    class delivers and keeps the metrics.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self.published = 0
+        self.publish_failures = 0
+        self.received = 0
+        self.delivered = 0  # Messages that found at least one local socket
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._signals: Dict[str, asyncio.Event] = {}
+        self.signals_sent = 0
+        self.signals_received = 0
+
+    @abstractmethod
+    async def publish(self, citizen_id: str, message: Dict[str, Any]):
+        """Send a message to the sockets of citizen_id on every worker"""
+
+    @abstractmethod
+    async def run(self):
+        """Subscriber loop; run as a background worker in every process"""
+
+    @abstractmethod
+    async def signal(self, name: str):
+        """Set signal_event(name) in every process; best effort, like publish()"""
+
+    @abstractmethod
+    async def run_signals(self):
+        """Signal subscriber loop; run in every process with background jobs"""
+
+    def signal_event(self, name: str) -> asyncio.Event:
+        """Event set whenever any process signals name"""
+        return self._signals.setdefault(name, asyncio.Event())
+
+    def _set_signal(self, name: str):
+        self.signals_received += 1
+        self.signal_event(name).set()
+
+    async def close(self):
+        pass
+
+    def _envelope(self, citizen_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        return {"citizen_id": citizen_id, "message": message, "published_at": time.time()}
+
+    async def _deliver(self, envelope: Dict[str, Any]):
+        self.received += 1
+        citizen_id = envelope["citizen_id"]
+        if citizen_id not in websocket_manager.active_connections:
+            return
+        await websocket_manager.send_personal_message(envelope["message"], citizen_id)
+        self.delivered += 1
+        self._latencies.append(time.time() - envelope["published_at"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "backend": self.backend,
+            "published": self.published,
+            "publish_failures": self.publish_failures,
+            "received": self.received,
+            "delivered": self.delivered,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": percentile(1.0),
+            "signals_sent": self.signals_sent,
+            "signals_received": self.signals_received,
+        }
+
+
+class LocalNotificationBus(NotificationBus):
+    """Delivers within this process only; for single-worker runs and tests"""
+
+    backend = "local"
+
+    async def publish(self, citizen_id: str, message: Dict[str, Any]):
+        self.published += 1
+        await self._deliver(self._envelope(citizen_id, message))
+
+    async def run(self):
+        await asyncio.Event().wait()  # Nothing to subscribe to
+
+    async def signal(self, name: str):
+        self.signals_sent += 1
+        self._set_signal(name)
+
+    async def run_signals(self):
+        await asyncio.Event().wait()
+
+
+class RedisNotificationBus(NotificationBus):
+    """Redis pub/sub channel shared by all API workers and pods"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, channel: str):
+        super().__init__()
+        import redis.asyncio as redis  # Only needed when this backend is configured
+
+        self.channel = channel
+        self.signal_channel = f"{channel}:signals"
+        self.redis = redis.from_url(url)
+
+    async def publish(self, citizen_id: str, message: Dict[str, Any]):
+        try:
+            await self.redis.publish(self.channel, json.dumps(self._envelope(citizen_id, message)))
+            self.published += 1
+        except Exception as e:
+            # Real-time delivery is best effort; the notification is already stored
+            self.publish_failures += 1
+            logger.warning(f"Notification publish failed for user {citizen_id}: {str(e)}")
+
+    async def run(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") != "message":
+                    continue
+                try:
+                    await self._deliver(json.loads(item["data"]))
+                except Exception as e:
+                    logger.warning(f"Dropping malformed notification message: {str(e)}")
+        finally:
+            await pubsub.aclose()
+
+    async def signal(self, name: str):
+        try:
+            await self.redis.publish(self.signal_channel, name)
+            self.signals_sent += 1
+        except Exception as e:
+            # The waiting job still finds the work on its fallback poll
+            logger.warning(f"Signal {name} publish failed: {str(e)}")
+
+    async def run_signals(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.signal_channel)
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") == "message":
+                    data = item["data"]
+                    self._set_signal(data.decode() if isinstance(data, bytes) else data)
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_notification_bus() -> NotificationBus:
+    if settings.NOTIFICATION_PUBSUB_BACKEND == "redis":
+        return RedisNotificationBus(
+            settings.NOTIFICATION_PUBSUB_URL or settings.CELERY_BROKER_URL,
+            settings.NOTIFICATION_PUBSUB_CHANNEL,
+        )
+    return LocalNotificationBus()
+
+
+# Create a global instance
+notification_bus = create_notification_bus()
@@ -0,0 +1,124 @@
+# backend/app/core/response_cache.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_caches: List["ResponseCache"] = []
+
+
+class ResponseCache:
+    """
+    In-process cache for expensive read responses, keyed by scope (e.g. a department id)
+    and an optional variant of the same response.
+
+    Entries younger than ttl_seconds are served as-is. Until stale_seconds past the TTL
+    the old entry is still served while one background task recomputes it; after that
+    callers wait for a fresh computation. Concurrent misses for the same entry share a
+    single computation. invalidate(scope) drops every variant of a scope, and a
+    computation that started before the invalidation is not stored.
+
+    Invalidation is local to this process; in multi-process deployments the TTL bounds
+    how stale another process can be.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, stale_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._generations: Dict[str, int] = {}
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._flight = SingleFlight(name)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self.invalidations = 0
+        _caches.append(self)
+
+    async def get(
+        self, scope: str, loader: Callable[[], Awaitable[Any]], variant: str = ""
+    ) -> Tuple[Any, float]:
+        """Return (value, age in seconds) for scope/variant, computing it with loader() when needed"""
+        key = (scope, variant)
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return value, age
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+                return value, age
+
+        self.misses += 1
+        value = await self._load(key, loader)
+        return value, 0.0
+
+    async def _load(self, key: Tuple[str, str], loader: Callable[[], Awaitable[Any]]) -> Any:
+        scope, variant = key
+        generation = self._generations.get(scope, 0)
+        # The generation is part of the flight key, so callers arriving after an
+        # invalidation never join a computation that started before it
+        value = await self._flight.do(f"{scope}|{variant}|{generation}", loader)
+        if self._generations.get(scope, 0) == generation:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def _refresh_in_background(self, key: Tuple[str, str], loader: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"{self.name} cache refresh failed for {key[0]}: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        asyncio.ensure_future(refresh())
+
+    def invalidate(self, scope: str):
+        """Drop every cached variant of scope"""
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+        for key in [key for key in self._entries if key[0] == scope]:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for this cache"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_failures": self.refresh_failures,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "computations": self._flight.get_stats(),
+        }
+
+
+def invalidate_scope(scope: str):
+    """Invalidate scope in every response cache (e.g. after a write to a department's data)"""
+    for cache in _caches:
+        cache.invalidate(scope)
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    """Get counters for every response cache"""
+    return [cache.get_stats() for cache in _caches]
@@ -0,0 +1,58 @@
+# backend/app/core/single_flight.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts the computation; every caller that arrives
+    while it is still running awaits the same task. Nothing is kept once the
+    task finishes, so results are never stale.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.total_calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() for key, or join the computation already running for key"""
+        self.total_calls += 1
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        else:
+            self.coalesced += 1
+
+        # shield() so a caller that disconnects does not cancel the shared task
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters for this group"""
+        return {
+            "name": self.name,
+            "total_calls": self.total_calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.coalesced / self.total_calls, 4) if self.total_calls else 0.0,
+        }
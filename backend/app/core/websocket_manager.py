@@ -1,35 +1,173 @@
 # backend/app/core/websocket_manager.py
-from fastapi import WebSocket
-from typing import Dict, List
+from fastapi import WebSocket, status
+from typing import Any, Dict, List, Optional
 import asyncio
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Connection:
+    """One accepted socket with its bounded send queue and writer task"""
+
+    def __init__(self, citizen_id: str, websocket: WebSocket, queue_size: int):
+        self.citizen_id = citizen_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.closing = False
+
+    def touch(self):
+        """Record activity: a frame received from the client or a send that went through"""
+        self.last_seen = time.monotonic()
+
 
 class WebSocketManager:
-    def _init_(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    """
+    Tracks notification sockets per citizen.
+
+    Sending never awaits a socket: messages go onto each connection's bounded queue and a
+    per-connection writer task drains it, so a slow client only delays itself. A client
+    whose queue is full, or whose send times out, is disconnected and can reload missed
+    notifications over REST. The heartbeat worker queues a ping for every connection, so a
+    listen-only client stays active as long as the pings reach it; connections with no
+    successful send or received frame within the idle timeout (a writer wedged on a dead
+    socket) are evicted.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        heartbeat_interval: float = settings.WS_HEARTBEAT_INTERVAL_SECONDS,
+        idle_timeout: float = settings.WS_IDLE_TIMEOUT_SECONDS,
+    ):
+        # citizen_id -> {id(websocket): Connection}; dicts keep connect/disconnect O(1)
+        self.active_connections: Dict[str, Dict[int, Connection]] = {}
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.connection_count = 0
+        self.messages_queued = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.send_failures = 0
+        self.slow_evictions = 0
+        self.idle_evictions = 0
 
-    async def connect(self, citizen_id: str, websocket: WebSocket):
+    async def connect(self, citizen_id: str, websocket: WebSocket) -> Connection:
         await websocket.accept()
-        if citizen_id not in self.active_connections:
-            self.active_connections[citizen_id] = []
-        self.active_connections[citizen_id].append(websocket)
+        connection = Connection(citizen_id, websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._write_loop(connection))
+        self.active_connections.setdefault(citizen_id, {})[id(websocket)] = connection
+        self.connection_count += 1
+        return connection
 
     def disconnect(self, citizen_id: str, websocket: WebSocket):
-        if citizen_id in self.active_connections:
-            self.active_connections[citizen_id].remove(websocket)
-            if not self.active_connections[citizen_id]:
-                del self.active_connections[citizen_id]
+        connections = self.active_connections.get(citizen_id)
+        if not connections:
+            return
+        connection = connections.pop(id(websocket), None)
+        if not connections:
+            del self.active_connections[citizen_id]
+        if connection is None:
+            return
+
+        self.connection_count -= 1
+        connection.closing = True
+        if connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    def _enqueue(self, connection: Connection, message: Any):
+        if connection.closing:
+            return
+        try:
+            connection.queue.put_nowait(message)
+            self.messages_queued += 1
+        except asyncio.QueueFull:
+            # The client is not keeping up; drop it rather than buffer without bound
+            self.messages_dropped += 1
+            self.slow_evictions += 1
+            logger.warning(f"WebSocket send queue full for user {connection.citizen_id}, disconnecting")
+            self._evict(connection, status.WS_1013_TRY_AGAIN_LATER)
+
+    def _evict(self, connection: Connection, code: int):
+        """Disconnect a connection and close its socket without waiting on it"""
+        self.disconnect(connection.citizen_id, connection.websocket)
+        asyncio.create_task(self._close(connection.websocket, code))
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            pass
+
+    async def _write_loop(self, connection: Connection):
+        """Drain one connection's queue; runs until the connection is closed or fails"""
+        websocket = connection.websocket
+        try:
+            while True:
+                message = await connection.queue.get()
+                await asyncio.wait_for(websocket.send_json(message), timeout=self.send_timeout)
+                self.messages_sent += 1
+                connection.touch()
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            self.send_failures += 1
+            logger.info(f"WebSocket send failed for user {connection.citizen_id}: {str(e)}")
+
+        self.disconnect(connection.citizen_id, websocket)
+        await self._close(websocket, status.WS_1011_INTERNAL_ERROR)
 
     async def send_personal_message(self, message: dict, citizen_id: str):
-        if citizen_id in self.active_connections:
-            for connection in self.active_connections[citizen_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    self.disconnect(citizen_id, connection)
+        for connection in list(self.active_connections.get(citizen_id, {}).values()):
+            self._enqueue(connection, message)
 
     async def broadcast(self, message: dict):
-        for citizen_id in self.active_connections:
-            await self.send_personal_message(message, citizen_id)
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections.values()):
+                self._enqueue(connection, message)
+
+    async def heartbeat_worker(self):
+        """Ping every connection and evict the ones with no traffic past the idle timeout"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            ping = {"type": "ping", "timestamp": time.time()}
+            for connections in list(self.active_connections.values()):
+                for connection in list(connections.values()):
+                    if now - connection.last_seen > self.idle_timeout:
+                        self.idle_evictions += 1
+                        self._evict(connection, status.WS_1001_GOING_AWAY)
+                    else:
+                        self._enqueue(connection, ping)
+
+    def get_stats(self) -> Dict[str, Any]:
+        queue_depths: List[int] = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
+        return {
+            "connections": self.connection_count,
+            "citizens": len(self.active_connections),
+            "queue_capacity": self.queue_size,
+            "queued_now": sum(queue_depths),
+            "max_queue_depth": max(queue_depths, default=0),
+            "messages_queued": self.messages_queued,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "send_failures": self.send_failures,
+            "slow_evictions": self.slow_evictions,
+            "idle_evictions": self.idle_evictions,
+        }
 
 # Create a global instance
-websocket_manager = WebSocketManager()
\ No newline at end of file
+websocket_manager = WebSocketManager()
@@ -0,0 +1,312 @@
+# backend/app/core/worker_supervisor.py
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from prisma import Prisma
+
+from app.core.config import settings
+from app.core.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Where a job runs
+API = "api"  # In every API process, e.g. jobs serving that process's WebSockets
+SHARED = "shared"  # In every process running background jobs; the job coordinates through the database
+LEADER = "leader"  # In one process per cluster, the holder of the leader lease
+
+LEADER_LEASE = "background-jobs"
+
+# Takes the lease when it is free or expired, or extends it when we already hold it.
+# Returns a row only to the holder.
+ACQUIRE_LEASE_SQL = """
+INSERT INTO "WorkerLease" (name, holder, acquired_at, expires_at)
+VALUES ($1, $2, NOW(), NOW() + make_interval(secs => $3::double precision))
+ON CONFLICT (name) DO UPDATE
+SET holder = EXCLUDED.holder,
+    acquired_at = CASE WHEN "WorkerLease".holder = EXCLUDED.holder
+                       THEN "WorkerLease".acquired_at ELSE EXCLUDED.acquired_at END,
+    expires_at = EXCLUDED.expires_at
+WHERE "WorkerLease".holder = EXCLUDED.holder OR "WorkerLease".expires_at < NOW()
+RETURNING holder
+"""
+
+RELEASE_LEASE_SQL = """
+DELETE FROM "WorkerLease" WHERE name = $1 AND holder = $2
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Job:
+    """A background job and its run metrics in this process"""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    scope: str
+    interval_seconds: Optional[float] = None  # None for long-running services
+    retry_seconds: Optional[float] = None  # Periodic jobs: delay after a failed run
+
+    state: str = "stopped"
+    runs: int = 0
+    errors: int = 0
+    restarts: int = 0
+    last_error: Optional[str] = None
+    last_error_at: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None
+    max_duration_seconds: float = 0.0
+    last_lag_seconds: Optional[float] = None
+    max_lag_seconds: float = 0.0
+
+    @property
+    def periodic(self) -> bool:
+        return self.interval_seconds is not None
+
+    def record_error(self, error: Exception):
+        self.errors += 1
+        self.last_error = str(error)
+        self.last_error_at = _now()
+
+    def record_duration(self, seconds: float):
+        self.last_duration_seconds = round(seconds, 3)
+        self.max_duration_seconds = max(self.max_duration_seconds, self.last_duration_seconds)
+
+    def record_lag(self, seconds: float):
+        self.last_lag_seconds = round(max(0.0, seconds), 3)
+        self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+
+    @property
+    def healthy(self) -> bool:
+        if self.state == "stopped":
+            return True
+        if not self.periodic:
+            return self.state == "running"
+        # The last periodic run succeeded and the next one is not overdue
+        if self.last_error_at and (self.last_success_at is None or self.last_error_at > self.last_success_at):
+            return False
+        if self.last_success_at is None:
+            return True
+        return (_now() - self.last_success_at).total_seconds() < 2 * self.interval_seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "scope": self.scope,
+            "kind": "periodic" if self.periodic else "service",
+            "interval_seconds": self.interval_seconds,
+            "state": self.state,
+            "healthy": self.healthy,
+            "runs": self.runs,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "last_started_at": self.last_started_at,
+            "last_success_at": self.last_success_at,
+            "last_duration_seconds": self.last_duration_seconds,
+            "max_duration_seconds": self.max_duration_seconds,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+
+class WorkerSupervisor:
+    """
+    Runs the background jobs of this process. Services (long-running loops) are restarted
+    after a failure; periodic jobs run every interval_seconds with their duration and start
+    lag recorded. LEADER jobs run only while this process holds the leader lease, a
+    WorkerLease row renewed every third of WORKER_LEASE_SECONDS, so each cluster-wide
+    sweep runs once however many API or worker processes are up. All LEADER jobs share one
+    lease to keep jobs that talk in-process (event dispatch and the reminder heap) together.
+    """
+
+    def __init__(self):
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.scopes: List[str] = []
+        self.is_leader = False
+        self.leader_since: Optional[datetime] = None
+        self.leadership_changes = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lease_task: Optional[asyncio.Task] = None
+        self._lease_valid_until = 0.0
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        scope: str,
+        interval_seconds: Optional[float] = None,
+        retry_seconds: Optional[float] = None,
+    ):
+        self.jobs[name] = Job(
+            name=name,
+            func=func,
+            scope=scope,
+            interval_seconds=interval_seconds,
+            retry_seconds=retry_seconds if retry_seconds is not None else interval_seconds,
+        )
+
+    async def start(self, scopes: Iterable[str]):
+        """Start the jobs of the given scopes; LEADER jobs wait for the lease"""
+        self.scopes = list(scopes)
+        for job in self.jobs.values():
+            if job.scope in self.scopes and job.scope != LEADER:
+                self._start_job(job)
+
+        if LEADER in self.scopes and any(job.scope == LEADER for job in self.jobs.values()):
+            self._lease_task = asyncio.create_task(self._hold_leader_lease())
+        logger.info(f"Worker supervisor {self.instance_id} started with scopes {self.scopes}")
+
+    async def stop(self):
+        """Stop all jobs and hand the leader lease over"""
+        if self._lease_task:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
+
+        await self._stop_jobs(list(self._tasks))
+
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                await get_db().execute_raw(RELEASE_LEASE_SQL, LEADER_LEASE, self.instance_id)
+            except Exception as e:
+                logger.warning(f"Could not release the leader lease: {str(e)}")
+
+    def _start_job(self, job: Job):
+        runner = self._run_periodic if job.periodic else self._run_service
+        self._tasks[job.name] = asyncio.create_task(runner(job))
+
+    async def _stop_jobs(self, names: List[str]):
+        tasks = [self._tasks.pop(name) for name in names if name in self._tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for name in names:
+            self.jobs[name].state = "stopped"
+
+    async def _run_service(self, job: Job):
+        logger.info(f"Starting {job.name} worker")
+        while True:
+            job.state = "running"
+            job.runs += 1
+            job.last_started_at = _now()
+            started = time.monotonic()
+            try:
+                await job.func()
+                logger.warning(f"{job.name} worker exited, restarting")
+            except asyncio.CancelledError:
+                logger.info(f"{job.name} worker cancelled")
+                raise
+            except Exception as e:
+                job.record_error(e)
+                logger.error(f"{job.name} worker failed: {str(e)}")
+            job.record_duration(time.monotonic() - started)
+
+            job.state = "restarting"
+            job.restarts += 1
+            await asyncio.sleep(settings.WORKER_RESTART_DELAY_SECONDS)
+
+    async def _run_periodic(self, job: Job):
+        logger.info(f"Starting {job.name} job every {job.interval_seconds}s")
+        scheduled = time.monotonic()
+        while True:
+            job.state = "idle"
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started = time.monotonic()
+            job.record_lag(started - scheduled)
+            job.state = "running"
+            job.runs += 1
+            job.last_started_at = _now()
+            try:
+                await job.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.record_error(e)
+                job.record_duration(time.monotonic() - started)
+                logger.error(f"{job.name} job failed: {str(e)}")
+                scheduled = time.monotonic() + job.retry_seconds
+                continue
+
+            job.record_duration(time.monotonic() - started)
+            job.last_success_at = _now()
+            # Fixed rate; runs missed while this one overran are skipped, not queued
+            scheduled = max(scheduled + job.interval_seconds, time.monotonic())
+
+    async def _renew_lease(self, db: Prisma) -> bool:
+        ttl = settings.WORKER_LEASE_SECONDS
+        requested = time.monotonic()
+        try:
+            rows = await db.query_raw(ACQUIRE_LEASE_SQL, LEADER_LEASE, self.instance_id, ttl)
+        except Exception as e:
+            logger.error(f"Leader lease renewal failed: {str(e)}")
+            # Keep leading through a blip while the last renewal is safely unexpired
+            return self.is_leader and time.monotonic() < self._lease_valid_until - ttl / 3
+
+        if rows:
+            self._lease_valid_until = requested + ttl
+        return bool(rows)
+
+    async def _hold_leader_lease(self):
+        db = get_db()
+        leader_jobs = [job.name for job in self.jobs.values() if job.scope == LEADER]
+        while True:
+            held = await self._renew_lease(db)
+            if held and not self.is_leader:
+                self.is_leader = True
+                self.leader_since = _now()
+                self.leadership_changes += 1
+                logger.info(f"{self.instance_id} is now the background job leader")
+                for name in leader_jobs:
+                    self._start_job(self.jobs[name])
+            elif not held and self.is_leader:
+                self.is_leader = False
+                self.leader_since = None
+                self.leadership_changes += 1
+                logger.warning(f"{self.instance_id} lost the background job leader lease")
+                await self._stop_jobs(leader_jobs)
+
+            await asyncio.sleep(settings.WORKER_LEASE_SECONDS / 3)
+
+    async def get_leases(self, db: Prisma) -> List[Dict[str, Any]]:
+        """Lease holders across the cluster, for health checks from any process"""
+        leases = await db.workerlease.find_many()
+        return [
+            {
+                "name": lease.name,
+                "holder": lease.holder,
+                "acquired_at": lease.acquired_at,
+                "expires_at": lease.expires_at,
+            }
+            for lease in leases
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        jobs = {name: job.get_stats() for name, job in self.jobs.items() if job.scope in self.scopes}
+        return {
+            "instance": self.instance_id,
+            "scopes": self.scopes,
+            "is_leader": self.is_leader,
+            "leader_since": self.leader_since,
+            "leadership_changes": self.leadership_changes,
+            "status": "ok" if all(job["healthy"] for job in jobs.values()) else "degraded",
+            "jobs": jobs,
+        }
+
+
+# Create a global instance
+worker_supervisor = WorkerSupervisor()
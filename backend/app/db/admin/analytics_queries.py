@@ -0,0 +1,120 @@
+from prisma import Prisma
+from typing import List, Dict, Any
+
+# Business hours shown on the analytics charts (8 AM to 5 PM = hours 8-17)
+BUSINESS_HOURS = range(8, 18)
+
+# Analytics read from AppointmentRollup (see app/db/admin/db_rollup.py), so a query
+# touches O(days x services) bucket rows instead of the department's appointment history.
+#
+# One pass over the department's buckets produces every breakdown the analytics page
+# needs: GROUPING SETS returns the hour histogram, the status counts, the per-service
+# counts and the grand total as separate row groups of the same result.
+# The g_* columns are 0 for the dimensions a row is grouped by.
+DEPARTMENT_APPOINTMENT_AGGREGATES_SQL = """
+WITH department_buckets AS (
+    SELECT
+        r.hour,
+        r.status::text AS status,
+        r.service_id,
+        s.name AS service_name,
+        r.count
+    FROM "AppointmentRollup" r
+    JOIN "Service" s ON s.service_id = r.service_id
+    WHERE r.department_id = $1
+)
+SELECT
+    GROUPING(hour) AS g_hour,
+    GROUPING(status) AS g_status,
+    GROUPING(service_id, service_name) AS g_service,
+    hour,
+    status,
+    service_id,
+    service_name,
+    SUM(count)::int AS count
+FROM department_buckets
+GROUP BY GROUPING SETS ((hour), (status), (service_id, service_name), ())
+HAVING SUM(count) > 0
+ORDER BY count DESC
+"""
+
+
+async def fetch_department_appointment_aggregates(db: Prisma, department_id: str) -> Dict[str, Any]:
+    """
+    Hour histogram, status counts, per-service counts and totals for a department,
+    computed in the database with a single grouped query.
+    """
+    rows = await db.query_raw(DEPARTMENT_APPOINTMENT_AGGREGATES_SQL, department_id)
+
+    hourly = {hour: 0 for hour in BUSINESS_HOURS}
+    statuses: Dict[str, int] = {}
+    services: List[Dict[str, Any]] = []
+    total = 0
+
+    for row in rows:
+        count = int(row["count"])
+        if row["g_hour"] == 0:
+            if row["hour"] in hourly:
+                hourly[row["hour"]] = count
+        elif row["g_status"] == 0:
+            statuses[row["status"]] = count
+        elif row["g_service"] == 0:
+            services.append({
+                "service_id": row["service_id"],
+                "name": row["service_name"],
+                "appointments": count
+            })
+        else:
+            total = count
+
+    return {
+        "hourly": hourly,
+        "statuses": statuses,
+        "services": services,  # Already ordered by appointment count, highest first
+        "total": total,
+        "no_show": statuses.get("NoShow", 0)
+    }
+
+
+# (service, hour) appointment counts for every service in a department. The LEFT JOIN
+# keeps services with no business-hour appointments as a single row with a NULL hour.
+SERVICES_HOURLY_MATRIX_SQL = """
+SELECT
+    s.service_id,
+    s.name AS service_name,
+    r.hour,
+    COALESCE(SUM(r.count), 0)::int AS count
+FROM "Service" s
+LEFT JOIN "AppointmentRollup" r
+    ON r.service_id = s.service_id
+    AND r.department_id = s.department_id
+    AND r.hour BETWEEN 8 AND 17
+WHERE s.department_id = $1
+GROUP BY s.service_id, s.name, r.hour
+ORDER BY s.name, s.service_id
+"""
+
+
+async def fetch_services_hourly_matrix(db: Prisma, department_id: str) -> Dict[str, Any]:
+    """
+    Business-hour appointment counts for every service in a department as a
+    services x hours matrix, in one round-trip however many services there are.
+    """
+    rows = await db.query_raw(SERVICES_HOURLY_MATRIX_SQL, department_id)
+
+    hours = list(BUSINESS_HOURS)
+    hour_index = {hour: idx for idx, hour in enumerate(hours)}
+    services: List[Dict[str, str]] = []
+    counts: List[List[int]] = []
+    row_index: Dict[str, int] = {}
+
+    for row in rows:
+        service_id = row["service_id"]
+        if service_id not in row_index:
+            row_index[service_id] = len(services)
+            services.append({"service_id": service_id, "name": row["service_name"]})
+            counts.append([0] * len(hours))
+        if row["hour"] is not None:
+            counts[row_index[service_id]][hour_index[row["hour"]]] = int(row["count"])
+
+    return {"hours": hours, "services": services, "counts": counts}
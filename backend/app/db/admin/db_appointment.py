@@ -1,7 +1,9 @@
 from prisma import Prisma
 from app.schemas.admin import appointment_schema
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from datetime import datetime
 from prisma.enums import AppointmentStatus
+from app.db.repositories.appointment_events import update_appointment_with_event
 
 
 async def get_appointment_by_id(db: Prisma, appointment_id: str):
@@ -18,22 +20,47 @@ async def get_appointment_by_id(db: Prisma, appointment_id: str):
     )
 
 
+APPOINTMENT_PAGE_ORDER = [{"appointment_datetime": "desc"}, {"appointment_id": "desc"}]
+
+
+def keyset_where(where: dict, after: Optional[Tuple[datetime, str]]) -> dict:
+    """
+    Restrict where to rows after (appointment_datetime, appointment_id) in page order,
+    so deep pages seek on the index instead of skipping rows.
+    """
+    if not after:
+        return where
+    after_datetime, after_id = after
+    return {
+        **where,
+        "OR": [
+            {"appointment_datetime": {"lt": after_datetime}},
+            {"appointment_datetime": after_datetime, "appointment_id": {"lt": after_id}},
+        ],
+    }
+
+
 async def get_appointments_by_department(
-    db: Prisma, department_id: str, skip: int = 0, limit: int = 100
+    db: Prisma,
+    department_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, str]] = None,
 ):
     """
     Get all appointments for a specific department with pagination.
+    Pass after (from the last row of the previous page) for keyset pagination.
     """
     return await db.appointment.find_many(
-        where={"service": {"department_id": department_id}},
+        where=keyset_where({"service": {"department_id": department_id}}, after),
         include={
             "citizen": True,
             "service": {"include": {"department": True}},
             "assigned_admin": True,
         },
-        skip=skip,
+        skip=0 if after else skip,
         take=limit,
-        order={"appointment_datetime": "desc"},
+        order=APPOINTMENT_PAGE_ORDER,
     )
 
 
@@ -62,20 +89,24 @@ async def get_appointments_by_status(
     status: AppointmentStatus,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[Tuple[datetime, str]] = None,
 ):
     """
     Get appointments by status for a specific department.
+    Pass after (from the last row of the previous page) for keyset pagination.
     """
     return await db.appointment.find_many(
-        where={"status": status, "service": {"department_id": department_id}},
+        where=keyset_where(
+            {"status": status, "service": {"department_id": department_id}}, after
+        ),
         include={
             "citizen": True,
             "service": {"include": {"department": True}},
             "assigned_admin": True,
         },
-        skip=skip,
+        skip=0 if after else skip,
         take=limit,
-        order={"appointment_datetime": "desc"},
+        order=APPOINTMENT_PAGE_ORDER,
     )
 
 
@@ -83,21 +114,30 @@ async def update_appointment(
     db: Prisma,
     appointment_id: str,
     appointment_update: appointment_schema.AppointmentUpdate,
+    before=None,
 ):
     """
     Update an appointment.
+    A status change or reschedule is recorded as an appointment event for the citizen's
+    notification; pass the appointment as loaded before the update to save a lookup.
     """
+    if before is None:
+        before = await db.appointment.find_unique(where={"appointment_id": appointment_id})
+
     update_data = {}
 
     if appointment_update.appointment_datetime is not None:
         update_data["appointment_datetime"] = appointment_update.appointment_datetime
+        if appointment_update.appointment_datetime != before.appointment_datetime:
+            update_data["reminder_sent_at"] = None  # The new time gets its own reminder
     if appointment_update.status is not None:
         update_data["status"] = appointment_update.status
     if appointment_update.assigned_admin_id is not None:
         update_data["assigned_admin_id"] = appointment_update.assigned_admin_id
 
-    return await db.appointment.update(
-        where={"appointment_id": appointment_id},
+    return await update_appointment_with_event(
+        db,
+        before,
         data=update_data,
         include={
             "citizen": True,
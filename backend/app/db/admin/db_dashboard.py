@@ -1,31 +1,49 @@
+import asyncio
 from prisma import Prisma
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
 
+# Counters come from the rollup tables maintained by app/db/admin/db_rollup.py
+APPOINTMENT_STATUS_COUNTS_SQL = """
+SELECT status::text AS status, SUM(count)::int AS count
+FROM "AppointmentRollup"
+WHERE department_id = $1
+GROUP BY status
+"""
+
+APPOINTMENT_HOURLY_COUNTS_SQL = """
+SELECT hour, SUM(count)::int AS count
+FROM "AppointmentRollup"
+WHERE department_id = $1 AND day = $2::date
+GROUP BY hour
+HAVING SUM(count) > 0
+ORDER BY hour
+"""
+
+FEEDBACK_RATING_COUNTS_SQL = """
+SELECT rating, SUM(count)::int AS count
+FROM "FeedbackRollup"
+WHERE department_id = $1
+GROUP BY rating
+"""
+
+
 async def get_appointment_stats_by_department(
     db: Prisma, department_id: str
 ) -> Dict[str, int]:
     """Get appointment statistics for a department"""
 
-    # Get all appointments for the department through services
-    appointments = await db.appointment.find_many(
-        where={"service": {"department_id": department_id}}, include={"service": True}
-    )
+    rows = await db.query_raw(APPOINTMENT_STATUS_COUNTS_SQL, department_id)
+    status_counts = {row["status"]: int(row["count"]) for row in rows}
 
     stats = {
-        "total_appointments": len(appointments),
-        "confirmed_appointments": len(
-            [a for a in appointments if a.status == "Confirmed"]
-        ),
-        "completed_appointments": len(
-            [a for a in appointments if a.status == "Completed"]
-        ),
-        "cancelled_appointments": len(
-            [a for a in appointments if a.status == "Cancelled"]
-        ),
-        "no_show_appointments": len([a for a in appointments if a.status == "NoShow"]),
-        "booked_appointments": len([a for a in appointments if a.status == "Booked"]),
+        "total_appointments": sum(status_counts.values()),
+        "confirmed_appointments": status_counts.get("Confirmed", 0),
+        "completed_appointments": status_counts.get("Completed", 0),
+        "cancelled_appointments": status_counts.get("Cancelled", 0),
+        "no_show_appointments": status_counts.get("NoShow", 0),
+        "booked_appointments": status_counts.get("Booked", 0),
     }
 
     return stats
@@ -36,34 +54,15 @@ async def get_hourly_distribution_by_department(
 ) -> List[Dict[str, Any]]:
     """Get hourly appointment distribution for today"""
 
-    # Get today's date range
     today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-
-    # Get today's appointments for the department
-    appointments = await db.appointment.find_many(
-        where={
-            "service": {"department_id": department_id},
-            "appointment_datetime": {"gte": start_of_day, "lte": end_of_day},
-        },
-        include={"service": True},
+    rows = await db.query_raw(
+        APPOINTMENT_HOURLY_COUNTS_SQL, department_id, today.isoformat()
     )
 
-    # Group by hour
-    hourly_counts = {}
-    for hour in range(24):
-        hourly_counts[f"{hour:02d}:00"] = 0
-
-    for appointment in appointments:
-        hour_key = f"{appointment.appointment_datetime.hour:02d}:00"
-        hourly_counts[hour_key] += 1
-
-    # Convert to list format
+    # Only hours with appointments are included
     hourly_data = [
-        {"hour": hour, "appointments": count}
-        for hour, count in hourly_counts.items()
-        if count > 0  # Only include hours with appointments
+        {"hour": f"{row['hour']:02d}:00", "appointments": int(row["count"])}
+        for row in rows
     ]
 
     return hourly_data
@@ -102,31 +101,19 @@ async def get_feedback_stats_by_department(
 ) -> Dict[str, Any]:
     """Get feedback statistics for a department"""
 
-    # Get all feedback for appointments in this department
-    feedback_records = await db.feedback.find_many(
-        where={"appointment": {"service": {"department_id": department_id}}},
-        include={"appointment": {"include": {"service": True}}},
-    )
+    rows = await db.query_raw(FEEDBACK_RATING_COUNTS_SQL, department_id)
 
-    if not feedback_records:
-        return {
-            "total_feedback": 0,
-            "average_rating": 0.0,
-            "rating_distribution": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
-        }
+    # Rating distribution
+    rating_distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+    for row in rows:
+        rating_distribution[str(row["rating"])] = int(row["count"])
 
-    # Calculate statistics
-    total_feedback = len(feedback_records)
-    total_rating = sum(fb.rating for fb in feedback_records)
+    total_feedback = sum(rating_distribution.values())
+    total_rating = sum(int(rating) * count for rating, count in rating_distribution.items())
     average_rating = (
         round(total_rating / total_feedback, 1) if total_feedback > 0 else 0.0
     )
 
-    # Rating distribution
-    rating_distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-    for feedback in feedback_records:
-        rating_distribution[str(feedback.rating)] += 1
-
     return {
         "total_feedback": total_feedback,
         "average_rating": average_rating,
@@ -146,11 +133,19 @@ async def get_dashboard_overview_data(db: Prisma, department_id: str) -> Dict[st
     """Get all dashboard overview data for a department"""
 
     # Get all data concurrently for better performance
-    appointment_stats = await get_appointment_stats_by_department(db, department_id)
-    hourly_distribution = await get_hourly_distribution_by_department(db, department_id)
-    recent_appointments = await get_recent_appointments_by_department(db, department_id)
-    feedback_stats = await get_feedback_stats_by_department(db, department_id)
-    department_name = await get_department_name(db, department_id)
+    (
+        appointment_stats,
+        hourly_distribution,
+        recent_appointments,
+        feedback_stats,
+        department_name,
+    ) = await asyncio.gather(
+        get_appointment_stats_by_department(db, department_id),
+        get_hourly_distribution_by_department(db, department_id),
+        get_recent_appointments_by_department(db, department_id),
+        get_feedback_stats_by_department(db, department_id),
+        get_department_name(db, department_id),
+    )
 
     # Calculate performance metrics
     total = appointment_stats["total_appointments"]
@@ -0,0 +1,158 @@
+from prisma import Prisma
+from prisma.enums import AppointmentStatus
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.db.admin.feedback_aggregates import FEEDBACK_SCOPE_SQL, build_feedback_filter
+from app.utils.sql_params import cursor_timestamp, timestamp_param
+
+# Export queries walk a department's rows newest first in fixed-size keyset batches,
+# so memory stays constant and every batch is an index seek, however deep the export.
+
+FEEDBACK_EXPORT_COLUMNS = [
+    ("feedback_id", "string"),
+    ("submitted_at", "timestamp"),
+    ("rating", "int"),
+    ("comment", "string"),
+    ("citizen_id", "string"),
+    ("citizen_name", "string"),
+    ("citizen_email", "string"),
+    ("service_id", "string"),
+    ("service_name", "string"),
+    ("appointment_id", "string"),
+    ("appointment_reference", "string"),
+    ("appointment_datetime", "timestamp"),
+]
+
+APPOINTMENT_EXPORT_COLUMNS = [
+    ("appointment_id", "string"),
+    ("reference_number", "string"),
+    ("appointment_datetime", "timestamp"),
+    ("status", "string"),
+    ("created_at", "timestamp"),
+    ("service_id", "string"),
+    ("service_name", "string"),
+    ("citizen_id", "string"),
+    ("citizen_name", "string"),
+    ("citizen_email", "string"),
+    ("citizen_phone", "string"),
+    ("assigned_admin_id", "string"),
+    ("assigned_admin_name", "string"),
+]
+
+
+async def iter_feedback_export_batches(
+    db: Prisma,
+    department_id: str,
+    batch_size: int = 1000,
+    rating_filter: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    service_filter: Optional[str] = None,
+    search: Optional[str] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the department's feedback in batches, with the same filters as get_feedback_list"""
+    where_sql, params = build_feedback_filter(
+        department_id,
+        rating_filter=rating_filter,
+        date_from=date_from,
+        date_to=date_to,
+        service_filter=service_filter,
+        search=search,
+    )
+    after_param, after_id_param, limit_param = (f"${len(params) + i}" for i in (1, 2, 3))
+    sql = f"""
+        SELECT
+            f.feedback_id,
+            f.submitted_at,
+            f.rating,
+            f.comment,
+            f.citizen_id,
+            c.full_name AS citizen_name,
+            c.email AS citizen_email,
+            s.service_id,
+            s.name AS service_name,
+            f.appointment_id,
+            a.reference_number AS appointment_reference,
+            a.appointment_datetime
+        {FEEDBACK_SCOPE_SQL}
+        {where_sql}
+          AND ({after_param}::timestamp IS NULL
+               OR (f.submitted_at, f.feedback_id) < ({after_param}::timestamp, {after_id_param}))
+        ORDER BY f.submitted_at DESC, f.feedback_id DESC
+        LIMIT {limit_param}
+    """
+
+    after, after_id = None, ""
+    while True:
+        rows = await db.query_raw(sql, *params, after, after_id, batch_size)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after, after_id = cursor_timestamp(rows[-1]["submitted_at"]), rows[-1]["feedback_id"]
+
+
+async def iter_appointment_export_batches(
+    db: Prisma,
+    department_id: str,
+    batch_size: int = 1000,
+    status: Optional[AppointmentStatus] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    service_filter: Optional[str] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the department's appointments in batches, optionally filtered by status, date and service"""
+    conditions = ["s.department_id = $1"]
+    params: List[Any] = [department_id]
+
+    def add(condition: str, value: Any):
+        params.append(value)
+        conditions.append(condition.format(p=f"${len(params)}"))
+
+    if status:
+        add('a.status = {p}::"AppointmentStatus"', AppointmentStatus(status).value)
+    if date_from:
+        add("a.appointment_datetime >= {p}::timestamp", timestamp_param(date_from))
+    if date_to:
+        add("a.appointment_datetime <= {p}::timestamp", timestamp_param(date_to))
+    if service_filter:
+        add("a.service_id = {p}", service_filter)
+
+    after_param, after_id_param, limit_param = (f"${len(params) + i}" for i in (1, 2, 3))
+    sql = f"""
+        SELECT
+            a.appointment_id,
+            a.reference_number,
+            a.appointment_datetime,
+            a.status::text AS status,
+            a.created_at,
+            s.service_id,
+            s.name AS service_name,
+            a.citizen_id,
+            c.full_name AS citizen_name,
+            c.email AS citizen_email,
+            c.phone_no AS citizen_phone,
+            a.assigned_admin_id,
+            ad.full_name AS assigned_admin_name
+        FROM "Appointment" a
+        JOIN "Service" s ON s.service_id = a.service_id
+        JOIN "Citizen" c ON c.citizen_id = a.citizen_id
+        LEFT JOIN "Admin" ad ON ad.admin_id = a.assigned_admin_id
+        WHERE {" AND ".join(conditions)}
+          AND ({after_param}::timestamp IS NULL
+               OR (a.appointment_datetime, a.appointment_id) < ({after_param}::timestamp, {after_id_param}))
+        ORDER BY a.appointment_datetime DESC, a.appointment_id DESC
+        LIMIT {limit_param}
+    """
+
+    after, after_id = None, ""
+    while True:
+        rows = await db.query_raw(sql, *params, after, after_id, batch_size)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after, after_id = cursor_timestamp(rows[-1]["appointment_datetime"]), rows[-1]["appointment_id"]
@@ -1,7 +1,15 @@
 from prisma import Prisma
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from app.schemas.admin.feedback_schema import FeedbackResponse
+from app.utils.cursor import encode_cursor
+from app.utils.sql_params import like_pattern, timestamp_param
+from app.db.admin.feedback_aggregates import (
+    build_feedback_filter,
+    fetch_feedback_summary,
+    fetch_monthly_trend,
+    fetch_service_rating_stats,
+)
 
 
 async def get_feedback_list(
@@ -14,8 +22,13 @@ async def get_feedback_list(
     date_to: Optional[datetime] = None,
     service_filter: Optional[str] = None,
     search: Optional[str] = None,
+    after: Optional[Tuple[datetime, str]] = None,
 ) -> Dict[str, Any]:
-    """Get paginated feedback list with filters for a specific department"""
+    """
+    Get paginated feedback list with filters for a specific department.
+    after = (submitted_at, feedback_id) of the last row already seen switches from
+    offset to keyset pagination; next_cursor in the result continues from this page.
+    """
 
     # Build where clause - always filter by department through appointment->service
     where_clause = {"appointment": {"service": {"department_id": department_id}}}
@@ -45,35 +58,55 @@ async def get_feedback_list(
             },
         ]
 
-    # Get feedback with related data
+    # Keyset pagination: rows strictly after the cursor in (submitted_at, feedback_id) order
+    page_where = where_clause
+    if after:
+        after_submitted_at, after_id = after
+        page_where = {
+            **where_clause,
+            "AND": [
+                {
+                    "OR": [
+                        {"submitted_at": {"lt": after_submitted_at}},
+                        {"submitted_at": after_submitted_at, "feedback_id": {"lt": after_id}},
+                    ]
+                }
+            ],
+        }
+
+    # Get feedback with related data (one extra row tells whether there is a next page)
     feedback_list = await db.feedback.find_many(
-        where=where_clause,
-        skip=skip,
-        take=limit,
-        order={"submitted_at": "desc"},
+        where=page_where,
+        skip=0 if after else skip,
+        take=limit + 1,
+        order=[{"submitted_at": "desc"}, {"feedback_id": "desc"}],
         include={"citizen": True, "appointment": {"include": {"service": True}}},
     )
+    has_more = len(feedback_list) > limit
+    feedback_list = feedback_list[:limit]
+    next_cursor = (
+        encode_cursor(feedback_list[-1].submitted_at, feedback_list[-1].feedback_id)
+        if has_more
+        else None
+    )
 
-    # Get total count
-    total = await db.feedback.count(where=where_clause)
-
-    # Calculate average rating manually (since aggregate is not available)
-    if total > 0:
-        all_feedback = await db.feedback.find_many(where=where_clause)
-        total_rating = sum([f.rating for f in all_feedback])
-        average_rating = total_rating / total
-    else:
-        average_rating = 0.0
-
-    # Get rating distribution
-    rating_distribution = {}
-    for rating in range(1, 6):
-        count = await db.feedback.count(where={**where_clause, "rating": rating})
-        rating_distribution[str(rating)] = count
-
-    # Calculate satisfaction rate (4-5 stars)
-    satisfied_count = rating_distribution["4"] + rating_distribution["5"]
-    satisfaction_rate = (satisfied_count / total * 100) if total > 0 else 0.0
+    # Total, average, rating distribution and satisfaction rate (4-5 stars)
+    # for the same filters, in one grouped query
+    where_sql, params = build_feedback_filter(
+        department_id,
+        rating_filter=rating_filter,
+        date_from=date_from,
+        date_to=date_to,
+        service_filter=service_filter,
+        search=search,
+    )
+    summary = await fetch_feedback_summary(db, where_sql, params)
+    total = summary["total"]
+    average_rating = summary["average_rating"]
+    satisfaction_rate = summary["satisfaction_rate"]
+    rating_distribution = {
+        str(rating): count for rating, count in summary["rating_distribution"].items()
+    }
 
     # Format response
     formatted_feedback = []
@@ -119,9 +152,70 @@ async def get_feedback_list(
         "average_rating": average_rating,
         "rating_distribution": rating_distribution,
         "satisfaction_rate": satisfaction_rate,
+        "next_cursor": next_cursor,
     }
 
 
+# Keyword search over comments (full-text) and citizen names (trigram), newest first.
+# Backed by the GIN indexes in app/prisma/scripts/feedback_search_indexes.sql.
+FEEDBACK_SEARCH_SQL = """
+SELECT
+    f.feedback_id,
+    f.appointment_id,
+    f.citizen_id,
+    f.rating,
+    f.comment,
+    f.submitted_at,
+    c.full_name AS citizen_name,
+    c.email AS citizen_email,
+    s.name AS service_name,
+    s.description AS service_description,
+    a.appointment_datetime,
+    a.reference_number AS appointment_reference
+FROM "Feedback" f
+JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+JOIN "Service" s ON s.service_id = a.service_id
+JOIN "Citizen" c ON c.citizen_id = f.citizen_id
+WHERE s.department_id = $1
+  AND (
+      to_tsvector('simple', coalesce(f.comment, '')) @@ websearch_to_tsquery('simple', $2)
+      OR c.full_name ILIKE $3
+  )
+  AND ($4::timestamp IS NULL OR (f.submitted_at, f.feedback_id) < ($4::timestamp, $5))
+ORDER BY f.submitted_at DESC, f.feedback_id DESC
+LIMIT $6
+"""
+
+
+async def search_feedback(
+    db: Prisma,
+    department_id: str,
+    query: str,
+    limit: int = 20,
+    after: Optional[Tuple[datetime, str]] = None,
+) -> Dict[str, Any]:
+    """Search a department's feedback comments and citizen names, with keyset pagination"""
+
+    after_submitted_at, after_id = after if after else (None, "")
+    rows = await db.query_raw(
+        FEEDBACK_SEARCH_SQL,
+        department_id,
+        query,
+        like_pattern(query),
+        timestamp_param(after_submitted_at) if after_submitted_at else None,
+        after_id,
+        limit + 1,
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (
+        encode_cursor(rows[-1]["submitted_at"], rows[-1]["feedback_id"]) if has_more else None
+    )
+
+    return {"feedback": rows, "next_cursor": next_cursor}
+
+
 async def get_feedback_by_id(
     db: Prisma, feedback_id: str
 ) -> Optional[FeedbackResponse]:
@@ -166,68 +260,17 @@ async def get_feedback_by_id(
 async def get_feedback_stats(db: Prisma, department_id: str) -> Dict[str, Any]:
     """Get feedback statistics for a specific department"""
 
-    # Department filter for all queries
-    department_filter = {"appointment": {"service": {"department_id": department_id}}}
-
-    # Total feedback count
-    total_count = await db.feedback.count(where=department_filter)
-
-    # Calculate average rating manually
-    if total_count > 0:
-        all_feedback = await db.feedback.find_many(where=department_filter)
-        total_rating = sum([f.rating for f in all_feedback])
-        average_rating = total_rating / total_count
-    else:
-        average_rating = 0.0
-
-    # Rating distribution
-    rating_distribution = {}
-    for rating in range(1, 6):
-        count = await db.feedback.count(where={**department_filter, "rating": rating})
-        rating_distribution[rating] = count
-
-    # Satisfaction rate (4-5 stars)
-    satisfied_count = rating_distribution[4] + rating_distribution[5]
-    satisfaction_rate = (
-        (satisfied_count / total_count * 100) if total_count > 0 else 0.0
-    )
-
-    # Recent feedback (last 30 days)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_count = await db.feedback.count(
-        where={**department_filter, "submitted_at": {"gte": thirty_days_ago}}
-    )
+    # Count, average, rating distribution, satisfaction rate (4-5 stars) and
+    # the last 30 days in one query; the 12 calendar-month trend in a second
+    where_sql, params = build_feedback_filter(department_id)
+    summary = await fetch_feedback_summary(db, where_sql, params)
+    monthly_trend = await fetch_monthly_trend(db, department_id, months=12)
 
-    # Monthly trend (last 12 months)
-    monthly_trend = []
-    for i in range(12):
-        month_start = datetime.now().replace(day=1) - timedelta(days=30 * i)
-        month_end = (
-            month_start.replace(month=month_start.month + 1)
-            if month_start.month < 12
-            else month_start.replace(year=month_start.year + 1, month=1)
-        )
-
-        month_feedback = await db.feedback.find_many(
-            where={
-                **department_filter,
-                "submitted_at": {"gte": month_start, "lt": month_end},
-            }
-        )
-
-        month_count = len(month_feedback)
-        month_average = 0.0
-        if month_count > 0:
-            total_rating = sum([f.rating for f in month_feedback])
-            month_average = total_rating / month_count
-
-        monthly_trend.append(
-            {
-                "month": month_start.strftime("%Y-%m"),
-                "count": month_count,
-                "average": month_average,
-            }
-        )
+    total_count = summary["total"]
+    average_rating = summary["average_rating"]
+    rating_distribution = summary["rating_distribution"]
+    satisfaction_rate = summary["satisfaction_rate"]
+    recent_count = summary["recent_count"]
 
     return {
         "total_feedback": total_count,
@@ -244,36 +287,16 @@ async def get_feedback_rating_by_service_stats(
 ) -> Dict[str, Any]:
     """Get feedback rating statistics grouped by service/appointment type"""
 
-    # Get all feedback with service details for the department
-    feedback_with_services = await db.feedback.find_many(
-        where={"appointment": {"service": {"department_id": department_id}}},
-        include={
-            "appointment": {
-                "include": {
-                    "service": True
-                }
-            }
-        },
-    )
-
-    # Group by service and calculate stats
-    service_stats = {}
-    
-    for feedback in feedback_with_services:
-        service_name = feedback.appointment.service.name
-        rating = feedback.rating
-        
-        if service_name not in service_stats:
-            service_stats[service_name] = {
-                "service_name": service_name,
-                "total_feedback": 0,
-                "total_rating": 0,
-                "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            }
-        
-        service_stats[service_name]["total_feedback"] += 1
-        service_stats[service_name]["total_rating"] += rating
-        service_stats[service_name]["rating_distribution"][rating] += 1
+    # Count, rating sum and distribution per service from one grouped query
+    service_stats = {
+        stats["service_name"]: {
+            "service_name": stats["service_name"],
+            "total_feedback": stats["total"],
+            "total_rating": stats["rating_sum"],
+            "rating_distribution": stats["rating_distribution"],
+        }
+        for stats in await fetch_service_rating_stats(db, department_id)
+    }
     
     # Calculate averages and satisfaction rates
     result = []
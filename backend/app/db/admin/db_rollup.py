@@ -0,0 +1,198 @@
+from prisma import Prisma
+from datetime import datetime
+from typing import Any, Dict
+import logging
+from app.core.response_cache import invalidate_scope
+
+logger = logging.getLogger(__name__)
+
+# Rollup maintenance for the admin dashboard and analytics pages.
+#
+# AppointmentRollup holds appointment counts per (department, service, day, hour, status)
+# and FeedbackRollup a rating histogram per (department, service, day). The write paths
+# apply +1/-1 deltas as appointments and feedback are created or change bucket; the
+# reconciliation job recomputes both tables from source rows to repair any drift
+# (failed hooks, writes made outside the app, races with a running reconciliation).
+
+APPOINTMENT_DELTA_SQL = """
+INSERT INTO "AppointmentRollup" (department_id, service_id, day, hour, status, count)
+SELECT
+    s.department_id,
+    s.service_id,
+    ($2::timestamp)::date,
+    EXTRACT(HOUR FROM $2::timestamp)::int,
+    $3::"AppointmentStatus",
+    $4
+FROM "Service" s
+WHERE s.service_id = $1
+ON CONFLICT (department_id, service_id, day, hour, status)
+DO UPDATE SET count = "AppointmentRollup".count + EXCLUDED.count
+RETURNING department_id
+"""
+
+FEEDBACK_DELTA_SQL = """
+INSERT INTO "FeedbackRollup" (department_id, service_id, day, rating, count)
+SELECT
+    s.department_id,
+    s.service_id,
+    ($2::timestamp)::date,
+    $3,
+    $4
+FROM "Appointment" a
+JOIN "Service" s ON s.service_id = a.service_id
+WHERE a.appointment_id = $1
+ON CONFLICT (department_id, service_id, day, rating)
+DO UPDATE SET count = "FeedbackRollup".count + EXCLUDED.count
+RETURNING department_id
+"""
+
+APPOINTMENT_RECONCILE_UPSERT_SQL = """
+INSERT INTO "AppointmentRollup" (department_id, service_id, day, hour, status, count)
+SELECT
+    s.department_id,
+    a.service_id,
+    a.appointment_datetime::date,
+    EXTRACT(HOUR FROM a.appointment_datetime)::int,
+    a.status,
+    COUNT(*)::int
+FROM "Appointment" a
+JOIN "Service" s ON s.service_id = a.service_id
+GROUP BY 1, 2, 3, 4, 5
+ON CONFLICT (department_id, service_id, day, hour, status)
+DO UPDATE SET count = EXCLUDED.count
+WHERE "AppointmentRollup".count <> EXCLUDED.count
+"""
+
+APPOINTMENT_RECONCILE_DELETE_SQL = """
+DELETE FROM "AppointmentRollup" r
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM "Appointment" a
+    JOIN "Service" s ON s.service_id = a.service_id
+    WHERE s.department_id = r.department_id
+      AND a.service_id = r.service_id
+      AND a.appointment_datetime >= r.day + make_interval(hours => r.hour)
+      AND a.appointment_datetime < r.day + make_interval(hours => r.hour + 1)
+      AND a.status = r.status
+)
+"""
+
+FEEDBACK_RECONCILE_UPSERT_SQL = """
+INSERT INTO "FeedbackRollup" (department_id, service_id, day, rating, count)
+SELECT
+    s.department_id,
+    a.service_id,
+    f.submitted_at::date,
+    f.rating,
+    COUNT(*)::int
+FROM "Feedback" f
+JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+JOIN "Service" s ON s.service_id = a.service_id
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (department_id, service_id, day, rating)
+DO UPDATE SET count = EXCLUDED.count
+WHERE "FeedbackRollup".count <> EXCLUDED.count
+"""
+
+FEEDBACK_RECONCILE_DELETE_SQL = """
+DELETE FROM "FeedbackRollup" r
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM "Feedback" f
+    JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+    JOIN "Service" s ON s.service_id = a.service_id
+    WHERE s.department_id = r.department_id
+      AND a.service_id = r.service_id
+      AND f.submitted_at >= r.day
+      AND f.submitted_at < r.day + 1
+      AND f.rating = r.rating
+)
+"""
+
+
+def _status_value(status: Any) -> str:
+    """AppointmentStatus enum member or plain string -> enum label"""
+    return str(getattr(status, "value", status))
+
+
+def _invalidate_departments(rows) -> None:
+    """Drop cached dashboard/analytics responses of the departments a delta touched"""
+    for row in rows:
+        invalidate_scope(row["department_id"])
+
+
+async def record_appointment(
+    db: Prisma, service_id: str, appointment_datetime: datetime, status: Any, delta: int
+) -> None:
+    """Add delta to the rollup bucket of one appointment. Best effort: reconciliation repairs misses."""
+    try:
+        rows = await db.query_raw(
+            APPOINTMENT_DELTA_SQL,
+            service_id,
+            appointment_datetime.isoformat(),
+            _status_value(status),
+            delta,
+        )
+        _invalidate_departments(rows)
+    except Exception as e:
+        logger.warning(f"Appointment rollup update failed for service {service_id}: {str(e)}")
+
+
+async def record_appointment_created(db: Prisma, appointment) -> None:
+    """Count a newly created appointment"""
+    await record_appointment(
+        db, appointment.service_id, appointment.appointment_datetime, appointment.status, 1
+    )
+
+
+async def record_appointment_deleted(db: Prisma, appointment) -> None:
+    """Remove a deleted appointment from its bucket"""
+    await record_appointment(
+        db, appointment.service_id, appointment.appointment_datetime, appointment.status, -1
+    )
+
+
+async def record_appointment_changed(db: Prisma, before, after) -> None:
+    """Move an appointment between buckets when its status, time or service changed"""
+    if (
+        before.service_id == after.service_id
+        and before.appointment_datetime == after.appointment_datetime
+        and _status_value(before.status) == _status_value(after.status)
+    ):
+        return
+    await record_appointment_deleted(db, before)
+    await record_appointment_created(db, after)
+
+
+async def record_feedback_created(db: Prisma, feedback) -> None:
+    """Count a new feedback rating. Best effort: reconciliation repairs misses."""
+    try:
+        rows = await db.query_raw(
+            FEEDBACK_DELTA_SQL,
+            feedback.appointment_id,
+            feedback.submitted_at.isoformat(),
+            feedback.rating,
+            1,
+        )
+        _invalidate_departments(rows)
+    except Exception as e:
+        logger.warning(f"Feedback rollup update failed for appointment {feedback.appointment_id}: {str(e)}")
+
+
+async def reconcile_rollups(db: Prisma) -> Dict[str, int]:
+    """
+    Recompute both rollup tables from Appointment and Feedback.
+    Only buckets whose count differs are written; returns the number of rows corrected.
+    """
+    # Each statement is atomic on its own; no long transaction is held over the scans
+    appointment_upserts = await db.execute_raw(APPOINTMENT_RECONCILE_UPSERT_SQL)
+    appointment_deletes = await db.execute_raw(APPOINTMENT_RECONCILE_DELETE_SQL)
+    feedback_upserts = await db.execute_raw(FEEDBACK_RECONCILE_UPSERT_SQL)
+    feedback_deletes = await db.execute_raw(FEEDBACK_RECONCILE_DELETE_SQL)
+
+    return {
+        "appointment_rows_upserted": appointment_upserts,
+        "appointment_rows_deleted": appointment_deletes,
+        "feedback_rows_upserted": feedback_upserts,
+        "feedback_rows_deleted": feedback_deletes,
+    }
@@ -0,0 +1,166 @@
+from prisma import Prisma
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.sql_params import like_pattern, timestamp_param
+
+# Feedback statistics computed in the database. Each function is a single grouped
+# query over the department's feedback; nothing is loaded row by row.
+
+FEEDBACK_SCOPE_SQL = """
+FROM "Feedback" f
+JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+JOIN "Service" s ON s.service_id = a.service_id
+JOIN "Citizen" c ON c.citizen_id = f.citizen_id
+"""
+
+
+def build_feedback_filter(
+    department_id: str,
+    rating_filter: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    service_filter: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    SQL WHERE clause and parameters equivalent to the Prisma filters of
+    db_feedback.get_feedback_list, for use with FEEDBACK_SCOPE_SQL.
+    """
+    conditions = ["s.department_id = $1"]
+    params: List[Any] = [department_id]
+
+    def add(condition: str, value: Any):
+        params.append(value)
+        conditions.append(condition.format(p=f"${len(params)}"))
+
+    if rating_filter:
+        add("f.rating = {p}", rating_filter)
+    if date_from:
+        add("f.submitted_at >= {p}::timestamp", timestamp_param(date_from))
+    if date_to:
+        add("f.submitted_at <= {p}::timestamp", timestamp_param(date_to))
+    if service_filter:
+        add("s.service_id = {p}", service_filter)
+    if search:
+        add("(f.comment ILIKE {p} OR c.full_name ILIKE {p} OR s.name ILIKE {p})", like_pattern(search))
+
+    return "WHERE " + " AND ".join(conditions), params
+
+
+async def fetch_feedback_summary(
+    db: Prisma, where_sql: str, params: List[Any], now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Count, rating sum, rating histogram and 30-day count for the feedback matching
+    where_sql, in one query.
+    """
+    now = now or datetime.now()
+    params = [*params, timestamp_param(now)]
+    now_param = f"${len(params)}"
+
+    rows = await db.query_raw(
+        f"""
+        SELECT
+            COUNT(*)::int AS total,
+            COALESCE(SUM(f.rating), 0)::int AS rating_sum,
+            COUNT(*) FILTER (WHERE f.rating = 1)::int AS rating_1,
+            COUNT(*) FILTER (WHERE f.rating = 2)::int AS rating_2,
+            COUNT(*) FILTER (WHERE f.rating = 3)::int AS rating_3,
+            COUNT(*) FILTER (WHERE f.rating = 4)::int AS rating_4,
+            COUNT(*) FILTER (WHERE f.rating = 5)::int AS rating_5,
+            COUNT(*) FILTER (
+                WHERE f.submitted_at >= {now_param}::timestamp - INTERVAL '30 days'
+            )::int AS recent_count
+        {FEEDBACK_SCOPE_SQL}
+        {where_sql}
+        """,
+        *params,
+    )
+    row = rows[0] if rows else {}
+
+    total = int(row.get("total") or 0)
+    rating_sum = int(row.get("rating_sum") or 0)
+    rating_distribution = {rating: int(row.get(f"rating_{rating}") or 0) for rating in range(1, 6)}
+    satisfied_count = rating_distribution[4] + rating_distribution[5]
+
+    return {
+        "total": total,
+        "average_rating": rating_sum / total if total > 0 else 0.0,
+        "rating_distribution": rating_distribution,
+        "satisfaction_rate": (satisfied_count / total * 100) if total > 0 else 0.0,
+        "recent_count": int(row.get("recent_count") or 0),
+    }
+
+
+async def fetch_monthly_trend(
+    db: Prisma, department_id: str, months: int = 12, now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Feedback count and average rating for each of the last `months` calendar months,
+    current month first, including months without feedback.
+    """
+    now = now or datetime.now()
+    rows = await db.query_raw(
+        f"""
+        WITH department_feedback AS (
+            SELECT f.rating, f.submitted_at
+            {FEEDBACK_SCOPE_SQL}
+            WHERE s.department_id = $1
+              AND f.submitted_at >= date_trunc('month', $2::timestamp) - make_interval(months => $3 - 1)
+        )
+        SELECT
+            to_char(m.month_start, 'YYYY-MM') AS month,
+            COUNT(df.rating)::int AS count,
+            COALESCE(AVG(df.rating), 0)::float AS average
+        FROM generate_series(
+            date_trunc('month', $2::timestamp) - make_interval(months => $3 - 1),
+            date_trunc('month', $2::timestamp),
+            INTERVAL '1 month'
+        ) AS m(month_start)
+        LEFT JOIN department_feedback df
+            ON df.submitted_at >= m.month_start
+            AND df.submitted_at < m.month_start + INTERVAL '1 month'
+        GROUP BY m.month_start
+        ORDER BY m.month_start DESC
+        """,
+        department_id,
+        timestamp_param(now),
+        months,
+    )
+
+    return [
+        {"month": row["month"], "count": int(row["count"]), "average": float(row["average"])}
+        for row in rows
+    ]
+
+
+async def fetch_service_rating_stats(db: Prisma, department_id: str) -> List[Dict[str, Any]]:
+    """Per-service feedback count, rating sum and histogram, most reviewed service first"""
+    rows = await db.query_raw(
+        f"""
+        SELECT
+            s.name AS service_name,
+            COUNT(*)::int AS total,
+            SUM(f.rating)::int AS rating_sum,
+            COUNT(*) FILTER (WHERE f.rating = 1)::int AS rating_1,
+            COUNT(*) FILTER (WHERE f.rating = 2)::int AS rating_2,
+            COUNT(*) FILTER (WHERE f.rating = 3)::int AS rating_3,
+            COUNT(*) FILTER (WHERE f.rating = 4)::int AS rating_4,
+            COUNT(*) FILTER (WHERE f.rating = 5)::int AS rating_5
+        {FEEDBACK_SCOPE_SQL}
+        WHERE s.department_id = $1
+        GROUP BY s.name
+        ORDER BY total DESC
+        """,
+        department_id,
+    )
+
+    return [
+        {
+            "service_name": row["service_name"],
+            "total": int(row["total"]),
+            "rating_sum": int(row["rating_sum"]),
+            "rating_distribution": {rating: int(row[f"rating_{rating}"]) for rating in range(1, 6)},
+        }
+        for row in rows
+    ]
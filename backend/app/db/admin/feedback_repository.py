@@ -1,23 +1,164 @@
 from app.core.database import db
-from typing import Dict, Any
+from prisma import Prisma
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+RECENT_COMMENTS_LIMIT = 5  # Size of the recent comments ring kept per service
+
+# ServiceFeedbackSummary keeps one row per service: totals, the rating distribution and
+# the latest non-empty comments. New feedback is folded in with a single upsert, so the
+# summary endpoint reads one row instead of every feedback of the service.
+
+RECORD_FEEDBACK_SQL = f"""
+INSERT INTO "ServiceFeedbackSummary" (
+    service_id, total_feedback, rating_sum, star_1, star_2, star_3, star_4, star_5, recent_comments, updated_at
+)
+SELECT
+    a.service_id,
+    1,
+    $2::int,
+    ($2::int = 1)::int,
+    ($2::int = 2)::int,
+    ($2::int = 3)::int,
+    ($2::int = 4)::int,
+    ($2::int = 5)::int,
+    CASE
+        WHEN $3::text IS NULL THEN '[]'::jsonb
+        ELSE jsonb_build_array(jsonb_build_object(
+            'rating', $2::int, 'comment', $3::text, 'date', to_char($4::timestamp, 'YYYY-MM-DD')
+        ))
+    END,
+    NOW()
+FROM "Appointment" a
+WHERE a.appointment_id = $1
+ON CONFLICT (service_id) DO UPDATE SET
+    total_feedback = "ServiceFeedbackSummary".total_feedback + 1,
+    rating_sum = "ServiceFeedbackSummary".rating_sum + EXCLUDED.rating_sum,
+    star_1 = "ServiceFeedbackSummary".star_1 + EXCLUDED.star_1,
+    star_2 = "ServiceFeedbackSummary".star_2 + EXCLUDED.star_2,
+    star_3 = "ServiceFeedbackSummary".star_3 + EXCLUDED.star_3,
+    star_4 = "ServiceFeedbackSummary".star_4 + EXCLUDED.star_4,
+    star_5 = "ServiceFeedbackSummary".star_5 + EXCLUDED.star_5,
+    recent_comments = (
+        SELECT COALESCE(jsonb_agg(t.entry ORDER BY t.position), '[]'::jsonb)
+        FROM jsonb_array_elements(EXCLUDED.recent_comments || "ServiceFeedbackSummary".recent_comments)
+             WITH ORDINALITY AS t(entry, position)
+        WHERE t.position <= {RECENT_COMMENTS_LIMIT}
+    ),
+    updated_at = NOW()
+"""
+
+REBUILD_SUMMARIES_SQL = f"""
+WITH totals AS (
+    SELECT
+        a.service_id,
+        COUNT(*)::int AS total_feedback,
+        SUM(f.rating)::int AS rating_sum,
+        COUNT(*) FILTER (WHERE f.rating = 1)::int AS star_1,
+        COUNT(*) FILTER (WHERE f.rating = 2)::int AS star_2,
+        COUNT(*) FILTER (WHERE f.rating = 3)::int AS star_3,
+        COUNT(*) FILTER (WHERE f.rating = 4)::int AS star_4,
+        COUNT(*) FILTER (WHERE f.rating = 5)::int AS star_5
+    FROM "Feedback" f
+    JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+    WHERE ($1::text IS NULL OR a.service_id = $1::text)
+    GROUP BY a.service_id
+)
+INSERT INTO "ServiceFeedbackSummary" (
+    service_id, total_feedback, rating_sum, star_1, star_2, star_3, star_4, star_5, recent_comments, updated_at
+)
+SELECT
+    t.service_id,
+    t.total_feedback,
+    t.rating_sum,
+    t.star_1,
+    t.star_2,
+    t.star_3,
+    t.star_4,
+    t.star_5,
+    COALESCE((
+        SELECT jsonb_agg(
+            jsonb_build_object('rating', r.rating, 'comment', r.comment, 'date', to_char(r.submitted_at, 'YYYY-MM-DD'))
+            ORDER BY r.submitted_at DESC, r.feedback_id DESC
+        )
+        FROM (
+            SELECT f.feedback_id, f.rating, f.comment, f.submitted_at
+            FROM "Feedback" f
+            JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+            WHERE a.service_id = t.service_id AND f.comment <> ''
+            ORDER BY f.submitted_at DESC, f.feedback_id DESC
+            LIMIT {RECENT_COMMENTS_LIMIT}
+        ) r
+    ), '[]'::jsonb),
+    NOW()
+FROM totals t
+ON CONFLICT (service_id) DO UPDATE SET
+    total_feedback = EXCLUDED.total_feedback,
+    rating_sum = EXCLUDED.rating_sum,
+    star_1 = EXCLUDED.star_1,
+    star_2 = EXCLUDED.star_2,
+    star_3 = EXCLUDED.star_3,
+    star_4 = EXCLUDED.star_4,
+    star_5 = EXCLUDED.star_5,
+    recent_comments = EXCLUDED.recent_comments,
+    updated_at = NOW()
+WHERE (
+    "ServiceFeedbackSummary".total_feedback, "ServiceFeedbackSummary".rating_sum,
+    "ServiceFeedbackSummary".star_1, "ServiceFeedbackSummary".star_2, "ServiceFeedbackSummary".star_3,
+    "ServiceFeedbackSummary".star_4, "ServiceFeedbackSummary".star_5, "ServiceFeedbackSummary".recent_comments
+) IS DISTINCT FROM (
+    EXCLUDED.total_feedback, EXCLUDED.rating_sum,
+    EXCLUDED.star_1, EXCLUDED.star_2, EXCLUDED.star_3,
+    EXCLUDED.star_4, EXCLUDED.star_5, EXCLUDED.recent_comments
+)
+"""
+
+DELETE_EMPTY_SUMMARIES_SQL = """
+DELETE FROM "ServiceFeedbackSummary" sfs
+WHERE ($1::text IS NULL OR sfs.service_id = $1::text)
+  AND NOT EXISTS (
+      SELECT 1
+      FROM "Feedback" f
+      JOIN "Appointment" a ON a.appointment_id = f.appointment_id
+      WHERE a.service_id = sfs.service_id
+  )
+"""
+
+
+async def record_service_feedback(db: Prisma, feedback) -> None:
+    """Fold a new feedback into its service's summary. Best effort: a rebuild repairs misses."""
+    try:
+        await db.execute_raw(
+            RECORD_FEEDBACK_SQL,
+            feedback.appointment_id,
+            feedback.rating,
+            feedback.comment or None,
+            feedback.submitted_at.isoformat(),
+        )
+    except Exception as e:
+        logger.warning(f"Feedback summary update failed for appointment {feedback.appointment_id}: {str(e)}")
+
+
+async def rebuild_service_feedback_summaries(db: Prisma, service_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Recompute service feedback summaries from Feedback, for one service or all of them.
+    Only summaries that differ are written; returns the number of rows corrected.
+    """
+    upserted = await db.execute_raw(REBUILD_SUMMARIES_SQL, service_id)
+    deleted = await db.execute_raw(DELETE_EMPTY_SUMMARIES_SQL, service_id)
+    return {"summaries_upserted": upserted, "summaries_deleted": deleted}
 
 
 async def get_feedback_summary_for_service(service_id: str) -> Dict[str, Any]:
     """
-    Fetch feedback summary for all appointments of the given service_id.
+    Fetch the feedback summary of the given service_id from its summary row.
     """
 
-    feedbacks = await db.feedback.find_many(
-        where={
-            "appointment": {
-                "service_id": service_id
-            }
-        },
-        include={"appointment": True},
-        order={"submitted_at": "desc"}
-    )
+    summary = await db.servicefeedbacksummary.find_unique(where={"service_id": service_id})
 
-    if not feedbacks:
+    if not summary or not summary.total_feedback:
         return {
             "total_feedback": 0,
             "average_rating": 0.0,
@@ -31,32 +172,15 @@ async def get_feedback_summary_for_service(service_id: str) -> Dict[str, Any]:
             "recent_comments": []
         }
 
-    total_feedback = len(feedbacks)
-    average_rating = sum(f.rating for f in feedbacks) / total_feedback
-
-    distribution = {
-        "star_5": 0,
-        "star_4": 0,
-        "star_3": 0,
-        "star_2": 0,
-        "star_1": 0
-    }
-    for f in feedbacks:
-        distribution[f"star_{f.rating}"] += 1
-
-    # Take only latest 5 comments that are non-empty
-    recent_comments = [
-        {
-            "rating": f.rating,
-            "comment": f.comment,
-            "date": f.submitted_at.date().isoformat()
-        }
-        for f in feedbacks if f.comment
-    ][:5]
-
     return {
-        "total_feedback": total_feedback,
-        "average_rating": round(average_rating, 1),
-        "rating_distribution": distribution,
-        "recent_comments": recent_comments
+        "total_feedback": summary.total_feedback,
+        "average_rating": round(summary.rating_sum / summary.total_feedback, 1),
+        "rating_distribution": {
+            "star_5": summary.star_5,
+            "star_4": summary.star_4,
+            "star_3": summary.star_3,
+            "star_2": summary.star_2,
+            "star_1": summary.star_1
+        },
+        "recent_comments": summary.recent_comments or []
     }
@@ -0,0 +1,106 @@
+from prisma import Prisma
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.sql_params import timestamp_param
+
+class SlotUnavailableError(ValueError):
+    """The requested time slot is full or no longer bookable"""
+
+
+# Takes one place in a slot if it has room (and, for new bookings, has not started yet).
+# The row lock taken by the UPDATE serialises concurrent bookings of the same slot; the
+# condition is re-checked against the committed count, so a full slot is never overbooked.
+RESERVE_SLOT_SQL = """
+UPDATE "TimeSlot"
+SET booked_count = booked_count + 1
+WHERE timeslot_id = $1
+  AND booked_count < max_appointments
+  AND ($2::timestamp IS NULL OR slot_datetime > $2::timestamp)
+RETURNING timeslot_id, slot_datetime, assigned_admin_id
+"""
+
+RELEASE_SLOT_SQL = """
+UPDATE "TimeSlot"
+SET booked_count = GREATEST(booked_count - 1, 0)
+WHERE timeslot_id = $1
+"""
+
+# Bookable slots of a service at a location in [$3, $4), with the officer's name joined
+# in, in (slot_datetime, timeslot_id) order. Backed by TimeSlot(service_id, location_id,
+# slot_datetime).
+AVAILABLE_SLOTS_SQL = """
+SELECT
+    t.timeslot_id,
+    t.slot_datetime,
+    t.assigned_admin_id,
+    a.full_name AS officer_name
+FROM "TimeSlot" t
+LEFT JOIN "Admin" a ON a.admin_id = t.assigned_admin_id
+WHERE t.service_id = $1
+  AND t.location_id = $2
+  AND t.slot_datetime >= $3::timestamp
+  AND t.slot_datetime < $4::timestamp
+  AND t.booked_count < t.max_appointments
+  AND ($5::timestamp IS NULL OR (t.slot_datetime, t.timeslot_id) > ($5::timestamp, $6))
+ORDER BY t.slot_datetime, t.timeslot_id
+LIMIT $7::int
+"""
+
+
+async def get_available_slots(
+    db: Prisma,
+    service_id: str,
+    location_id: str,
+    start: datetime,
+    end: datetime,
+    limit: Optional[int],
+    after: Optional[Tuple[datetime, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Up to limit (None: all) slots with free capacity between start and end, after the keyset cursor"""
+    after_datetime, after_id = after if after else (None, "")
+    return await db.query_raw(
+        AVAILABLE_SLOTS_SQL,
+        service_id,
+        location_id,
+        timestamp_param(start),
+        timestamp_param(end),
+        timestamp_param(after_datetime) if after_datetime else None,
+        after_id,
+        limit,
+    )
+
+
+async def reserve_slot(
+    db: Prisma, slot_id: str, not_before: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """Take a place in the slot; None when it is full, unknown or starts before not_before"""
+    rows = await db.query_raw(
+        RESERVE_SLOT_SQL, slot_id, timestamp_param(not_before) if not_before else None
+    )
+    return rows[0] if rows else None
+
+
+async def release_slot(db: Prisma, slot_id: str) -> None:
+    await db.execute_raw(RELEASE_SLOT_SQL, slot_id)
+
+
+def _holds_slot(appointment) -> Optional[str]:
+    """The slot an appointment takes a place in, if any"""
+    if appointment is None or getattr(appointment.status, "value", appointment.status) == "Cancelled":
+        return None
+    return getattr(appointment, "timeSlotTimeslot_id", None)
+
+
+async def move_slot_booking(db: Prisma, before, after) -> None:
+    """
+    Bring booked_count in line with an appointment change (cancellation, reschedule,
+    deletion when after is None). Pass the transaction the change is made in, so that
+    SlotUnavailableError for a full new slot rolls the change back.
+    """
+    old_slot, new_slot = _holds_slot(before), _holds_slot(after)
+    if old_slot == new_slot:
+        return
+    if new_slot and not await reserve_slot(db, new_slot):
+        raise SlotUnavailableError("The selected time slot is fully booked")
+    if old_slot:
+        await release_slot(db, old_slot)
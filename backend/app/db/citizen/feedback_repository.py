@@ -1,4 +1,6 @@
 from app.core.database import db  # Shared Prisma client
+from app.db.admin.db_rollup import record_feedback_created
+from app.db.admin.feedback_repository import record_service_feedback
 
 
 async def create_feedback(citizen_id: str, data: dict):
@@ -6,7 +8,7 @@ async def create_feedback(citizen_id: str, data: dict):
     Create a new feedback entry for the given citizen and appointment.
     Uses relation connect to satisfy Prisma's required relation inputs.
     """
-    return await db.feedback.create(
+    feedback = await db.feedback.create(
         data={
             "rating": data["rating"],
             "comment": data.get("comment"),
@@ -18,6 +20,9 @@ async def create_feedback(citizen_id: str, data: dict):
             }
         }
     )
+    await record_feedback_created(db, feedback)
+    await record_service_feedback(db, feedback)
+    return feedback
 
 
 async def get_feedback_by_appointment_id(appointment_id: str):
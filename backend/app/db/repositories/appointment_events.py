@@ -0,0 +1,124 @@
+from prisma import Prisma
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.core.notification_pubsub import notification_bus
+from app.db.citizen.db_timeslot import SlotUnavailableError, move_slot_booking, reserve_slot
+
+# Appointment writes that citizens should hear about record an AppointmentEvent in the
+# same transaction, then signal the dispatcher. The dispatcher runs only on the background
+# job leader; the signal reaches it over the notification bus from any process.
+
+STATUS_CHANGED = "StatusChanged"
+RESCHEDULED = "Rescheduled"
+
+APPOINTMENT_EVENTS_SIGNAL = "appointment_events"
+
+# Set after an event is committed in any process; awaited by the dispatcher
+events_available = notification_bus.signal_event(APPOINTMENT_EVENTS_SIGNAL)
+
+CLAIM_EVENTS_SQL = """
+WITH batch AS (
+    SELECT event_id
+    FROM "AppointmentEvent"
+    WHERE processed_at IS NULL AND locked_until <= NOW() AND attempts < $3
+    ORDER BY created_at
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE "AppointmentEvent" e
+SET attempts = e.attempts + 1,
+    locked_until = NOW() + make_interval(secs => $2::double precision)
+FROM batch
+WHERE e.event_id = batch.event_id
+RETURNING e.event_id, e.appointment_id, e.event_type, e.old_status::text AS old_status, e.new_status::text AS new_status,
+          e.attempts
+"""
+
+# Events that used up their attempts without being processed; the dispatcher no longer claims them
+EXHAUSTED_EVENTS_SQL = """
+SELECT COUNT(*)::int AS count
+FROM "AppointmentEvent"
+WHERE processed_at IS NULL AND attempts >= $1 AND locked_until <= NOW()
+"""
+
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+def appointment_event(before, after) -> Optional[Dict[str, Any]]:
+    """Event data for a change from before to after (before is None for a new booking), or None"""
+    if before is None or _status_value(before.status) != _status_value(after.status):
+        event_type = STATUS_CHANGED
+    elif before.appointment_datetime != after.appointment_datetime:
+        event_type = RESCHEDULED
+    else:
+        return None
+
+    return {
+        "appointment_id": after.appointment_id,
+        "event_type": event_type,
+        "old_status": _status_value(before.status) if before else None,
+        "new_status": _status_value(after.status),
+    }
+
+
+async def update_appointment_with_event(
+    db: Prisma, before, data: Dict[str, Any], include: Optional[Dict[str, Any]] = None
+):
+    """
+    Update an appointment and record the resulting status change or reschedule atomically,
+    moving its place between time slots (SlotUnavailableError if the new slot is full)
+    """
+    async with db.tx() as transaction:
+        kwargs = {"include": include} if include else {}
+        updated = await transaction.appointment.update(
+            where={"appointment_id": before.appointment_id}, data=data, **kwargs
+        )
+        await move_slot_booking(transaction, before, updated)
+        event = appointment_event(before, updated)
+        if event:
+            await transaction.appointmentevent.create(data=event)
+
+    if event:
+        await notification_bus.signal(APPOINTMENT_EVENTS_SIGNAL)
+    return updated
+
+
+async def create_appointment_with_event(
+    db: Prisma, data: Dict[str, Any], not_before: Optional[datetime] = None
+):
+    """
+    Create an appointment together with its booking event, taking its place in the time
+    slot in the same transaction (SlotUnavailableError if the slot is full or starts
+    before not_before)
+    """
+    async with db.tx() as transaction:
+        slot_id = data.get("timeSlotTimeslot_id")
+        if slot_id and not await reserve_slot(transaction, slot_id, not_before):
+            raise SlotUnavailableError("The selected time slot is fully booked")
+        appointment = await transaction.appointment.create(data=data)
+        await transaction.appointmentevent.create(data=appointment_event(None, appointment))
+
+    await notification_bus.signal(APPOINTMENT_EVENTS_SIGNAL)
+    return appointment
+
+
+async def claim_appointment_events(
+    db: Prisma, limit: int, lease_seconds: float, max_attempts: int
+) -> List[Dict[str, Any]]:
+    """Lease up to limit unprocessed events; concurrent dispatchers get disjoint batches"""
+    return await db.query_raw(CLAIM_EVENTS_SQL, limit, lease_seconds, max_attempts)
+
+
+async def count_exhausted_appointment_events(db: Prisma, max_attempts: int) -> int:
+    rows = await db.query_raw(EXHAUSTED_EVENTS_SQL, max_attempts)
+    return rows[0]["count"] if rows else 0
+
+
+async def mark_appointment_events_processed(db: Prisma, event_ids: List[str]) -> None:
+    if event_ids:
+        await db.appointmentevent.update_many(
+            where={"event_id": {"in": event_ids}},
+            data={"processed_at": datetime.now(timezone.utc)},
+        )
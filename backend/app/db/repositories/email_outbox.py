@@ -0,0 +1,92 @@
+from prisma import Prisma
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# EmailOutbox rows move Pending -> Sending -> Sent, or back to Pending with a later
+# next_attempt_at after a failure, and to Failed once retries are exhausted. A Sending
+# row whose lease (next_attempt_at) has passed belongs to a sender that died mid-batch
+# and is claimed again.
+
+CLAIM_EMAILS_SQL = """
+WITH batch AS (
+    SELECT email_id
+    FROM "EmailOutbox"
+    WHERE status IN ('Pending', 'Sending') AND next_attempt_at <= NOW()
+    ORDER BY next_attempt_at
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE "EmailOutbox" e
+SET status = 'Sending',
+    attempts = e.attempts + 1,
+    next_attempt_at = NOW() + make_interval(secs => $2::double precision)
+FROM batch
+WHERE e.email_id = batch.email_id
+RETURNING e.email_id, e.to_email, e.subject, e.body, e.attempts
+"""
+
+RESCHEDULE_EMAIL_SQL = """
+UPDATE "EmailOutbox"
+SET status = $2::"EmailStatus",
+    last_error = $3,
+    next_attempt_at = NOW() + make_interval(secs => $4::double precision)
+WHERE email_id = $1
+"""
+
+STATUS_COUNTS_SQL = """
+SELECT status::text AS status, COUNT(*)::int AS count
+FROM "EmailOutbox"
+GROUP BY status
+"""
+
+
+async def enqueue_email(
+    db: Prisma, to_email: str, subject: str, body: str, notification_id: Optional[str] = None
+):
+    """Add a rendered email to the outbox; pass a transaction to write it with its notification"""
+    return await db.emailoutbox.create(data=outbox_row(to_email, subject, body, notification_id))
+
+
+def outbox_row(to_email: str, subject: str, body: str, notification_id: Optional[str] = None) -> Dict[str, Any]:
+    """create_many data for one outbox email"""
+    return {
+        "to_email": to_email,
+        "subject": subject,
+        "body": body,
+        "notification_id": notification_id,
+    }
+
+
+async def enqueue_emails(db: Prisma, rows: List[Dict[str, Any]]) -> int:
+    """Add many rendered emails (outbox_row dicts) with one insert"""
+    if not rows:
+        return 0
+    return await db.emailoutbox.create_many(data=rows)
+
+
+async def claim_emails(db: Prisma, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+    """Lease up to limit due emails to this sender; concurrent senders get disjoint batches"""
+    return await db.query_raw(CLAIM_EMAILS_SQL, limit, lease_seconds)
+
+
+async def mark_emails_sent(db: Prisma, email_ids: List[str]) -> None:
+    if email_ids:
+        await db.emailoutbox.update_many(
+            where={"email_id": {"in": email_ids}},
+            data={"status": "Sent", "sent_at": datetime.now(timezone.utc), "last_error": None},
+        )
+
+
+async def reschedule_email(db: Prisma, email_id: str, error: str, retry_in_seconds: Optional[float]) -> None:
+    """Record a failed attempt: retry after retry_in_seconds, or give up when it is None"""
+    if retry_in_seconds is None:
+        await db.execute_raw(RESCHEDULE_EMAIL_SQL, email_id, "Failed", error, 0)
+    else:
+        await db.execute_raw(RESCHEDULE_EMAIL_SQL, email_id, "Pending", error, retry_in_seconds)
+
+
+async def get_email_status_counts(db: Prisma) -> Dict[str, int]:
+    rows = await db.query_raw(STATUS_COUNTS_SQL)
+    counts = {status: 0 for status in ("Pending", "Sending", "Sent", "Failed")}
+    counts.update({row["status"]: row["count"] for row in rows})
+    return counts
@@ -1,10 +1,8 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, status
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import asyncio
 import logging
-from typing import List
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,7 +12,7 @@ logging.basicConfig(
 )
 
 # Database
-from app.core.database import connect_db, disconnect_db
+from app.core.database import connect_db, disconnect_db, get_db
 
 # Routers
 from app.routes.citizen import citizen_route
@@ -38,45 +36,21 @@ from app.routes.citizen.search_route import router as search_router
 from app.routes.citizen.notifications import router as notification_router
 
 # Workers
-from app.services.citizen.appointment_reminder import appointment_reminder_worker
-from app.services.citizen.appointment_status_monitor import appointment_status_monitor
-from app.services.citizen.document_expiry_monitor import document_expiry_monitor
+from app.core.config import settings
+from app.core.worker_supervisor import API, LEADER, SHARED, worker_supervisor
+from app.services.background_jobs import register_background_jobs, require_shared_notification_bus
+from app.services.email_outbox_worker import email_sender
+from app.services.citizen.notification_repository import get_delivery_stats
+from app.services.citizen.appointment_event_dispatcher import get_dispatcher_stats
+from app.core.email_service import template_renderer
 
 # WebSocket
 from app.core.websocket_manager import websocket_manager
-from app.core.auth import get_current_user_ws
+from app.core.notification_pubsub import notification_bus
+from app.core.auth import get_current_admin, get_current_user_ws
+from app.schemas.admin import admin_schema
 from app.schemas.citizen import citizen_schema
 
-class WorkerManager:
-    def __init__(self):
-        self.tasks: List[asyncio.Task] = []
-        self.should_stop = False
-
-    async def run_worker(self, name, worker_func):
-        """Run a worker with automatic retry on failure"""
-        logger.info(f"Starting {name} worker")
-        while not self.should_stop:
-            try:
-                await worker_func()
-            except asyncio.CancelledError:
-                logger.info(f"{name} worker cancelled")
-                break
-            except Exception as e:
-                logger.error(f"{name} worker failed: {str(e)}")
-                await asyncio.sleep(10)  # Wait before restarting
-
-    async def stop_all(self):
-        """Stop all workers gracefully"""
-        self.should_stop = True
-        for task in self.tasks:
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-
-worker_manager = WorkerManager()
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
@@ -85,12 +59,13 @@ async def lifespan(app: FastAPI):
         await connect_db()
         logger.info("Database connected successfully")
 
-        # Start background workers
-        worker_manager.tasks = [
-            asyncio.create_task(worker_manager.run_worker("Appointment Reminder", appointment_reminder_worker)),
-            asyncio.create_task(worker_manager.run_worker("Status Monitor", appointment_status_monitor)),
-            asyncio.create_task(worker_manager.run_worker("Document Expiry", document_expiry_monitor))
-        ]
+        # Start background workers; with RUN_BACKGROUND_WORKERS off they run in
+        # app.tasks.run_workers and this process keeps only its WebSocket jobs
+        if not settings.RUN_BACKGROUND_WORKERS:
+            require_shared_notification_bus()
+        register_background_jobs(worker_supervisor)
+        scopes = [API, SHARED, LEADER] if settings.RUN_BACKGROUND_WORKERS else [API]
+        await worker_supervisor.start(scopes)
 
         yield
 
@@ -100,7 +75,8 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup
         logger.info("Shutting down workers...")
-        await worker_manager.stop_all()
+        await worker_supervisor.stop()
+        await notification_bus.close()
         
         logger.info("Disconnecting from database...")
         await disconnect_db()
@@ -150,9 +126,33 @@ app.include_router(search_router, prefix="/api")
 async def root():
     return {"status": "ok", "message": "Welcome to the Gov-Portal API"}
 
+@app.get("/ws/stats", tags=["Health Check"])
+async def websocket_stats(current_admin: admin_schema.Admin = Depends(get_current_admin)):
+    """Connection counts, send-queue backpressure and pub/sub delivery metrics for /ws/notifications"""
+    return {
+        **websocket_manager.get_stats(),
+        "pubsub": notification_bus.get_stats(),
+        "digests": get_delivery_stats(),
+    }
+
+@app.get("/email/stats", tags=["Health Check"])
+async def email_stats(current_admin: admin_schema.Admin = Depends(get_current_admin)):
+    """Email outbox rows per status, this worker's send counters and template render times"""
+    return {**await email_sender.get_stats(get_db()), "templates": template_renderer.get_stats()}
+
+@app.get("/workers/health", tags=["Health Check"])
+async def workers_health(current_admin: admin_schema.Admin = Depends(get_current_admin)):
+    """This process's background jobs (run counts, durations, lag, errors) and the cluster's lease holders"""
+    return {
+        **worker_supervisor.get_stats(),
+        "leases": await worker_supervisor.get_leases(get_db()),
+        "appointment_events": await get_dispatcher_stats(get_db()),
+    }
+
 @app.websocket("/ws/notifications")
 async def websocket_notifications(websocket: WebSocket, token: str):
     """WebSocket endpoint for real-time notifications"""
+    user = None
     try:
         # Authenticate user
         user = await get_current_user_ws(token)
@@ -161,12 +161,13 @@ async def websocket_notifications(websocket: WebSocket, token: str):
             return
         
         # Connect to WebSocket manager
-        await websocket_manager.connect(user.citizen_id, websocket)
+        connection = await websocket_manager.connect(user.citizen_id, websocket)
         logger.info(f"WebSocket connected for user {user.citizen_id}")
         
-        # Keep connection alive
+        # Clients only listen; the writer task keeps the connection alive while sends succeed
         while True:
             await websocket.receive_text()
+            connection.touch()
             
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for user {user.citizen_id}")
@@ -177,5 +178,5 @@ async def websocket_notifications(websocket: WebSocket, token: str):
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
         except:
             pass
-        if 'user' in locals():
+        if user:
             websocket_manager.disconnect(user.citizen_id, websocket)
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- Search indexes that cannot be expressed in schema.prisma.
+-- Run after `prisma db push`; safe to re-run. Not a Prisma migration: the schema is deployed with db push.
+-- Apply with: prisma db execute --file app/prisma/scripts/feedback_search_indexes.sql --schema app/prisma/schema.prisma
+
+-- Trigram operator classes so ILIKE '%term%' (Prisma `contains` with mode insensitive) can use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS "Feedback_comment_trgm_idx" ON "public"."Feedback" USING GIN ("comment" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "Citizen_full_name_trgm_idx" ON "public"."Citizen" USING GIN ("full_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "Service_name_trgm_idx" ON "public"."Service" USING GIN ("name" gin_trgm_ops);
+
+-- Full-text index for the feedback search API (must match the expression in db_feedback.FEEDBACK_SEARCH_SQL)
+CREATE INDEX IF NOT EXISTS "Feedback_comment_fts_idx" ON "public"."Feedback" USING GIN (to_tsvector('simple', coalesce("comment", '')));
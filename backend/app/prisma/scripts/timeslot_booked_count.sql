@@ -0,0 +1,28 @@
+-- Adds TimeSlot.booked_count and counts the appointments holding each slot (every status
+-- but Cancelled), replacing the retired appointment_ids array. Run it BEFORE `prisma db push`
+-- so the counter is filled when the push drops appointment_ids, and once more after the new
+-- code is live to count bookings the old code made in between. Safe to re-run at any time:
+-- the table lock holds off concurrent reservations while the counts are taken.
+-- Not a Prisma migration: the schema is deployed with db push.
+-- Apply with: prisma db execute --file app/prisma/scripts/timeslot_booked_count.sql --schema app/prisma/schema.prisma
+
+-- On a fresh database (no TimeSlot table yet) it does nothing.
+
+DO $$
+BEGIN
+    IF to_regclass('"public"."TimeSlot"') IS NULL THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE "public"."TimeSlot" ADD COLUMN IF NOT EXISTS "booked_count" INTEGER NOT NULL DEFAULT 0;
+
+    LOCK TABLE "public"."TimeSlot" IN SHARE ROW EXCLUSIVE MODE;
+
+    UPDATE "public"."TimeSlot" t
+    SET "booked_count" = (
+        SELECT COUNT(*)
+        FROM "public"."Appointment" a
+        WHERE a."timeSlotTimeslot_id" = t."timeslot_id"
+          AND a."status" <> 'Cancelled'
+    );
+END $$;
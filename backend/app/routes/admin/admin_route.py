@@ -15,6 +15,9 @@ from fastapi import HTTPException
 
 from app.core.database import get_db
 from app.core.database import db
+from app.db.admin.db_rollup import record_appointment_changed, record_appointment_deleted
+from app.db.citizen.db_timeslot import move_slot_booking
+from app.db.repositories.appointment_events import update_appointment_with_event
 from app.schemas.admin import admin_schema
 from app.schemas import token_schema
 from app.core import auth
@@ -107,16 +110,6 @@ async def delete_appointment_endpoint(
         appointment = await db.appointment.find_unique(where={"appointment_id": appointment_id})
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        slot_id = getattr(appointment, "timeSlotTimeslot_id", None)
-        if slot_id:
-            slot = await db.timeslot.find_unique(where={"timeslot_id": slot_id})
-            if slot:
-                appointment_ids = getattr(slot, "appointment_ids", [])
-                appointment_ids = [aid for aid in appointment_ids if aid != appointment_id]
-                await db.timeslot.update(
-                    where={"timeslot_id": slot_id},
-                    data={"appointment_ids": appointment_ids}
-                )
         from app.core.supabase_client import supabase
         BUCKET_NAME = "appointment-documents"
         folder = f"{appointment_id}/"
@@ -126,7 +119,10 @@ async def delete_appointment_endpoint(
         docs = await db.appointmentdocument.find_many(where={"appointment_id": appointment_id})
         for doc in docs:
             await db.appointmentdocument.delete(where={"appointment_doc_id": doc.appointment_doc_id})
-        await db.appointment.delete(where={"appointment_id": appointment_id})
+        async with db.tx() as transaction:
+            await transaction.appointment.delete(where={"appointment_id": appointment_id})
+            await move_slot_booking(transaction, appointment, None)  # Free its place in the slot
+        await record_appointment_deleted(db, appointment)
         return JSONResponse(content={"status": "success", "message": "Appointment permanently deleted."})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -143,10 +139,12 @@ async def update_appointment_status_admin(
         appointment = await db.appointment.find_unique(where={"appointment_id": appointment_id})
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
-        await db.appointment.update(
-            where={"appointment_id": appointment_id},
+        updated = await update_appointment_with_event(
+            db,
+            appointment,
             data={"status": status}
         )
+        await record_appointment_changed(db, appointment, updated)
         return JSONResponse(content={"status": "success", "message": f"Appointment status updated to {status}."})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from app.core.auth import get_current_admin
 from app.schemas.admin.analytics_schema import AnalyticsResponse
 from app.services.admin.analytics_service import get_analytics_overview
@@ -8,6 +8,7 @@ router = APIRouter()
 
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_analytics_data_endpoint(
+    layout: str = Query("nested", pattern="^(nested|columnar)$"),
     current_admin=Depends(get_current_admin)
 ):
     """
@@ -16,7 +17,8 @@ async def get_analytics_data_endpoint(
     Returns:
         AnalyticsResponse: Complete analytics data including:
         - Overall hourly distribution (all appointments)
-        - Hourly distribution for each service (for client-side filtering)
+        - Hourly distribution for each service (for client-side filtering);
+          with layout=columnar it is returned as services_hourly_matrix arrays
         - Most popular services
         - Status distribution for pie charts
         - Peak hour information
@@ -25,7 +27,7 @@ async def get_analytics_data_endpoint(
     """
     try:
         # Get analytics data for the admin's department (includes all services data)
-        analytics_data = await get_analytics_overview(current_admin.department_id)
+        analytics_data = await get_analytics_overview(current_admin.department_id, layout)
         return analytics_data
         
     except Exception as e:
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional, List
+from prisma.enums import AppointmentStatus
 from app.core.auth import get_current_admin
 from app.services.admin.appointment_service import (
     get_appointments_by_department,
@@ -7,6 +8,7 @@ from app.services.admin.appointment_service import (
     update_appointment,
     get_appointment_documents,
 )
+from app.services.admin.export_service import export_appointments
 from app.schemas.admin.appointment_schema import (
     AppointmentListResponse,
     AppointmentResponse,
@@ -23,6 +25,9 @@ async def list_appointments(
     status: Optional[str] = Query(None, description="Filter by appointment status"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page (keyset pagination; skip is ignored)"
+    ),
     current_admin=Depends(get_current_admin),
 ):
     """
@@ -30,7 +35,42 @@ async def list_appointments(
     Supports filtering by status and pagination.
     """
     return await get_appointments_by_department(
-        department_id=current_admin.department_id, status=status, skip=skip, limit=limit
+        department_id=current_admin.department_id,
+        status=status,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.get("/export")
+async def export_appointments_endpoint(
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv or parquet"),
+    status: Optional[str] = Query(
+        None, description=f"Filter by appointment status: all, {', '.join(s.value for s in AppointmentStatus)}"
+    ),
+    date_from: Optional[str] = Query(None, description="Appointments from date (ISO format)"),
+    date_to: Optional[str] = Query(None, description="Appointments to date (ISO format)"),
+    service_filter: Optional[str] = Query(None, description="Filter by service ID"),
+    current_admin=Depends(get_current_admin),
+):
+    """
+    Stream all of the department's matching appointments as a file download, newest first.
+    Rows are read in keyset batches, so memory use does not grow with the export size.
+    """
+    # Checked here: once the stream has started, a query error can no longer become a 400
+    try:
+        status_filter = AppointmentStatus(status) if status and status != "all" else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid appointment status: {status}")
+
+    return export_appointments(
+        current_admin.department_id,
+        export_format=format,
+        status=status_filter,
+        date_from=date_from,
+        date_to=date_to,
+        service_filter=service_filter,
     )
 
 
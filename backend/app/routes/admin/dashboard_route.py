@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.auth import get_current_admin
 from app.schemas.admin.dashboard_schema import DashboardOverviewResponse
 from app.services.admin.dashboard_service import get_dashboard_overview
+from app.core.response_cache import get_cache_stats
 
 router = APIRouter()
 
@@ -24,3 +25,9 @@ async def get_dashboard_overview_endpoint(current_admin=Depends(get_current_admi
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching dashboard overview: {str(e)}",
         )
+
+
+@router.get("/cache-stats")
+async def get_dashboard_cache_stats(current_admin=Depends(get_current_admin)):
+    """Hit/miss counters for the dashboard and analytics response caches"""
+    return get_cache_stats()
@@ -6,11 +6,14 @@ from app.services.admin.feedback_service import (
     get_feedback_details,
     get_feedback_statistics,
     get_feedback_rating_by_service,
+    search_department_feedback,
 )
+from app.services.admin.export_service import export_feedback
 from app.schemas.admin.feedback_schema import (
     FeedbackListResponse,
     FeedbackResponse,
     FeedbackStatsResponse,
+    FeedbackSearchResponse,
 )
 
 router = APIRouter()
@@ -29,6 +32,9 @@ async def get_feedback_list(
     search: Optional[str] = Query(
         None, description="Search in comments, citizen names, service names"
     ),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page (keyset pagination; page is ignored)"
+    ),
     current_admin=Depends(get_current_admin),
 ):
     """
@@ -46,9 +52,12 @@ async def get_feedback_list(
             date_to=date_to,
             service_filter=service_filter,
             search=search,
+            cursor=cursor,
         )
         return result
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error fetching feedback: {str(e)}"
@@ -91,6 +100,62 @@ async def get_feedback_rating_by_service_endpoint(
         )
 
 
+@router.get("/feedback/export")
+async def export_feedback_endpoint(
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv or parquet"),
+    rating_filter: Optional[int] = Query(
+        None, ge=1, le=5, description="Filter by rating"
+    ),
+    date_from: Optional[str] = Query(None, description="Filter from date (ISO format)"),
+    date_to: Optional[str] = Query(None, description="Filter to date (ISO format)"),
+    service_filter: Optional[str] = Query(None, description="Filter by service ID"),
+    search: Optional[str] = Query(
+        None, description="Search in comments, citizen names, service names"
+    ),
+    current_admin=Depends(get_current_admin),
+):
+    """
+    Stream all matching feedback as a file download, newest first.
+    Takes the same filters as the feedback list; rows are read in keyset batches.
+    Accessible by all authenticated admin users.
+    """
+
+    return export_feedback(
+        current_admin.department_id,
+        export_format=format,
+        rating_filter=rating_filter,
+        date_from=date_from,
+        date_to=date_to,
+        service_filter=service_filter,
+        search=search,
+    )
+
+
+@router.get("/feedback/search", response_model=FeedbackSearchResponse)
+async def search_feedback_endpoint(
+    q: str = Query(..., min_length=2, description="Words to find in comments or a citizen name"),
+    limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_admin=Depends(get_current_admin),
+):
+    """
+    Full-text search over feedback comments and trigram search over citizen names, newest first.
+    Accessible by all authenticated admin users.
+    """
+
+    try:
+        return await search_department_feedback(
+            current_admin.department_id, q, limit=limit, cursor=cursor
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error searching feedback: {str(e)}"
+        )
+
+
 @router.get("/feedback/{feedback_id}", response_model=FeedbackResponse)
 async def get_feedback_details_endpoint(
     feedback_id: str, current_admin=Depends(get_current_admin)
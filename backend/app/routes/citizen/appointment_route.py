@@ -1,11 +1,22 @@
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Header, Query
 from fastapi.responses import JSONResponse
 from app.core.database import db
+from app.db.admin.db_rollup import record_appointment_changed
+from app.db.citizen.db_timeslot import SlotUnavailableError
+from app.db.repositories.appointment_events import update_appointment_with_event
 from app.core.auth import get_current_user
 from app.schemas.citizen import citizen_schema
 from app.schemas.citizen.appointment_schema import AppointmentBookingRequest
-from app.services.citizen.citizen_service import get_available_slots, book_appointment, get_user_appointments
+from app.services.citizen.citizen_service import (
+    MAX_SLOT_PAGE_SIZE,
+    SLOT_PAGE_SIZE,
+    SLOT_WINDOW_DAYS,
+    get_available_slots,
+    book_appointment,
+    get_user_appointments,
+)
 
 router = APIRouter(
     prefix="/appointments",
@@ -16,13 +27,21 @@ router = APIRouter(
 async def get_available_slots_endpoint(
     service_id: str,
     location_id: str,
+    from_date: Optional[date] = Query(None, description="First day to list (default: today)"),
+    to_date: Optional[date] = Query(None, description=f"Last day to list (default: {SLOT_WINDOW_DAYS} days ahead)"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_SLOT_PAGE_SIZE,
+        description=f"Slots per page (default: the whole date range, or {SLOT_PAGE_SIZE} with a cursor)"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: citizen_schema.Citizen = Depends(get_current_user)
 ):
     try:
-        slots = await get_available_slots(service_id, location_id)
+        page = await get_available_slots(service_id, location_id, from_date, to_date, limit, cursor)
         return JSONResponse(content={
             "status": "success",
-            "available_slots": slots
+            "available_slots": page["slots"],
+            "next_cursor": page["next_cursor"]
         })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -47,6 +66,7 @@ async def book_appointment_endpoint(
     service_id: str,
     slot_id: str,
     files: list[UploadFile] = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: citizen_schema.Citizen = Depends(get_current_user)
 ):
     try:
@@ -59,13 +79,16 @@ async def book_appointment_endpoint(
             service_id=service_id,
             slot_id=slot_id,
             citizen_id=current_user.citizen_id,
-            uploaded_documents=uploaded_documents
+            uploaded_documents=uploaded_documents,
+            idempotency_key=idempotency_key
         )
         booking_response = await book_appointment(booking_request)
         return JSONResponse(content={
             "status": "success",
             "appointment": booking_response
         })
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -115,15 +138,20 @@ async def reschedule_appointment_endpoint(
         slot = await db.timeslot.find_unique(where={"timeslot_id": slot_id})
         if not slot:
             raise HTTPException(status_code=404, detail="New slot not found")
-        await db.appointment.update(
-            where={"appointment_id": appointment_id},
+        rescheduled = await update_appointment_with_event(
+            db,
+            appointment,
             data={
                 "timeSlotTimeslot_id": slot_id,
                 "appointment_datetime": slot.slot_datetime,
-                "assigned_admin_id": slot.assigned_admin_id
+                "assigned_admin_id": slot.assigned_admin_id,
+                "reminder_sent_at": None  # The new time gets its own reminder
             }
         )
+        await record_appointment_changed(db, appointment, rescheduled)
         return JSONResponse(content={"status": "success", "message": "Appointment rescheduled."})
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -144,10 +172,12 @@ async def cancel_appointment_endpoint(
                 "status": "failed",
                 "message": "Cancellation only allowed more than 48 hours before appointment"
             }, status_code=400)
-        await db.appointment.update(
-            where={"appointment_id": appointment_id},
+        cancelled = await update_appointment_with_event(
+            db,
+            appointment,
             data={"status": "Cancelled"}
         )
+        await record_appointment_changed(db, appointment, cancelled)
         return JSONResponse(content={"status": "success", "message": "Appointment cancelled."})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,18 +1,18 @@
 import json
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from typing import List
 from pydantic import BaseModel
 import logging
 import google.generativeai as genai
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import KnowledgeBaseService, get_knowledge_base_service
 import os
 from app.core.config import settings
 from app.services.citizen.citizen_service import  get_form_template
 from app.schemas.citizen import citizen_schema
 from fastapi import APIRouter, HTTPException, Depends
-from app.core.auth import get_current_user
+from app.core.auth import get_current_admin, get_current_user
 from app.services.message_log import log_message
-from app.services.chatbot_services import search_Answer, update_trigger, answer_search_secured, answer_search_for_help, services_get_latest_messages, services_get_latest_message_by_id 
+from app.services.chatbot_services import search_Answer, update_trigger, answer_search_secured, answer_search_for_help, services_get_latest_messages, services_get_latest_message_by_id, get_coalescing_stats, answer_search_batch, SearchQuery, SearchQueryForHelp, BatchSearchQuery, BatchSearchResponse
 from prisma import Prisma
 
 db = Prisma()
@@ -24,32 +24,19 @@ router = APIRouter(
     tags=["Knowledge Base"]
 )
 
-class SearchQuery(BaseModel):
-    text: str
-    limit: int = 5
-
-class SearchQueryForHelp(BaseModel):
-    text: str
-    page: str
-    limit: int = 5
-
-class SearchResult(BaseModel):
-    content: str
-    source: str
-    relevance_score: float
-    title: str = ""
-
-class SearchResponse(BaseModel):
-    query: str
-    results: List[SearchResult]
-    total_results: int
-
-
 @router.post("/search")
 async def search_government_services(query: SearchQuery):
     """Search government services using natural language"""
     return await search_Answer(query)  
     
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_government_services_batch(
+    query: BatchSearchQuery,
+    current_user: citizen_schema.Citizen = Depends(get_current_user)
+):
+    """Search many queries in one request; set use_llm to also generate answers"""
+    return await answer_search_batch(query)
+    
 @router.post("/update")
 async def trigger_knowledge_update(): # type: ignore
     """Trigger knowledge base update from government sources"""
@@ -73,3 +60,46 @@ async def get_latest_messages():
 @router.get("/latest-messages/me")
 async def get_latest_messages_for_user(current_user: citizen_schema.Citizen = Depends(get_current_user)):
     return await services_get_latest_message_by_id(current_user)
+
+@router.get("/metrics")
+async def get_knowledge_base_metrics(current_admin=Depends(get_current_admin)):
+    """Request coalescing counters for the chatbot search endpoints"""
+    return get_coalescing_stats()
+
+@router.get("/index")
+async def get_knowledge_base_index(current_admin=Depends(get_current_admin)):
+    """Active collection version, HNSW configuration and rebuild status"""
+    return get_knowledge_base_service().get_collection_stats()
+
+@router.post("/reindex", status_code=202)
+async def trigger_knowledge_base_reindex(
+    background_tasks: BackgroundTasks,
+    source: str = Query("collection", pattern="^(collection|scraped_data)$"),
+    keep_search_ef: bool = Query(True),
+    current_admin=Depends(get_current_admin)
+):
+    """
+    Rebuild into the next collection version in the background, then swap it in.
+    keep_search_ef=false drops the runtime search_ef for CHROMADB_HNSW_SEARCH_EF.
+    """
+    kb_service = get_knowledge_base_service()
+    if kb_service.is_rebuilding():
+        raise HTTPException(status_code=409, detail="A knowledge base rebuild is already running")
+    background_tasks.add_task(kb_service.rebuild_in_background, source, keep_search_ef)
+    return {
+        "status": "Knowledge base rebuild started",
+        "active_collection": kb_service.collection.name,
+        "source": source,
+        "keep_search_ef": keep_search_ef
+    }
+
+@router.put("/index/search-ef")
+async def update_knowledge_base_search_ef(
+    value: int = Query(..., ge=1, le=2048),
+    current_admin=Depends(get_current_admin)
+):
+    """Tune query-time HNSW ef on the active collection (recall vs latency)"""
+    try:
+        return get_knowledge_base_service().set_search_ef(value)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -29,6 +29,13 @@ class ServiceHourlyDistributionSchema(BaseModel):
     service_name: str
     hourly_data: List[HourlyDataSchema]
 
+class ServicesHourlyMatrixSchema(BaseModel):
+    # counts[i][j] = appointments for service_ids[i] in hours[j]
+    hours: List[str]
+    service_ids: List[str]
+    service_names: List[str]
+    counts: List[List[int]]
+
 class AnalyticsMetricsSchema(BaseModel):
     total_appointments: int
     total_workload: int
@@ -40,7 +47,10 @@ class AnalyticsResponse(BaseModel):
     overall_hourly_distribution: List[HourlyDataSchema]
     
     # Hourly distribution for each service (for dropdown filtering)
-    services_hourly_distribution: List[ServiceHourlyDistributionSchema]
+    services_hourly_distribution: List[ServiceHourlyDistributionSchema] = []
+    
+    # Same data as compact arrays, returned instead when layout=columnar
+    services_hourly_matrix: Optional[ServicesHourlyMatrixSchema] = None
     
     # Most popular services
     popular_services: List[ServicePopularitySchema]
@@ -59,3 +69,6 @@ class AnalyticsResponse(BaseModel):
     
     # Department info
     department_name: str
+    
+    # How old the cached data is; 0 when freshly computed
+    cache_age_seconds: float = 0.0
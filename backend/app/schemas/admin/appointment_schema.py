@@ -48,6 +48,7 @@ class AppointmentResponse(BaseModel):
 class AppointmentListResponse(BaseModel):
     appointments: List[AppointmentResponse]
     total: int
+    next_cursor: Optional[str] = None  # Pass as cursor to get the next page
 
     class Config:
         from_attributes = True
@@ -45,3 +45,4 @@ class DashboardOverviewResponse(BaseModel):
     feedback_stats: FeedbackStatsSchema
     performance_metrics: PerformanceMetricsSchema
     department_name: str
+    cache_age_seconds: float = 0.0  # How old the cached data is; 0 when freshly computed
@@ -32,6 +32,12 @@ class FeedbackListResponse(BaseModel):
     average_rating: float
     rating_distribution: dict
     satisfaction_rate: float  # Percentage of 4-5 star ratings
+    next_cursor: Optional[str] = None  # Pass as cursor to get the next page
+
+
+class FeedbackSearchResponse(BaseModel):
+    feedback: List[FeedbackResponse]
+    next_cursor: Optional[str] = None
 
 
 class FeedbackStatsResponse(BaseModel):
@@ -19,6 +19,7 @@ class AppointmentBookingRequest(BaseModel):
     slot_id: str
     citizen_id: str
     uploaded_documents: Dict[str, Any]
+    idempotency_key: Optional[str] = None  # Same key on a retry returns the first booking
 
 class AppointmentBookingResponse(BaseModel):
     appointment_id: str
@@ -1,14 +1,23 @@
 from app.db.admin.db_analytics import get_analytics_data
 from app.schemas.admin.analytics_schema import AnalyticsResponse
 from app.core.database import db
+from app.core.config import settings
+from app.core.response_cache import ResponseCache
 
+analytics_cache = ResponseCache(
+    "analytics",
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    stale_seconds=settings.DASHBOARD_CACHE_STALE_SECONDS,
+)
 
-async def get_analytics_overview(department_id: str) -> AnalyticsResponse:
+
+async def get_analytics_overview(department_id: str, layout: str = "nested") -> AnalyticsResponse:
     """
     Get complete analytics data for a department including all services hourly distributions
     
     Args:
         department_id: The department ID to get analytics for
+        layout: "nested" (default) or "columnar" for the per-service hourly data
         
     Returns:
         AnalyticsResponse: Complete analytics data including all services for client-side filtering
@@ -17,11 +26,14 @@ async def get_analytics_overview(department_id: str) -> AnalyticsResponse:
         Exception: If there's an error fetching the data
     """
     try:
-        # Get all analytics data (includes hourly distribution for all services)
-        analytics_data = await get_analytics_data(db, department_id)
+        # Get all analytics data (includes hourly distribution for all services),
+        # cached per department and layout
+        analytics_data, cache_age = await analytics_cache.get(
+            department_id, lambda: get_analytics_data(db, department_id, layout), variant=layout
+        )
         
         # Return structured response
-        return AnalyticsResponse(**analytics_data)
+        return AnalyticsResponse(**analytics_data, cache_age_seconds=round(cache_age, 1))
         
     except Exception as e:
         raise Exception(f"Error fetching analytics data: {str(e)}")
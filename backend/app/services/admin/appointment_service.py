@@ -1,6 +1,6 @@
 from typing import List, Optional
 from app.core.database import db
-from app.db.admin import db_appointment
+from app.db.admin import db_appointment, db_rollup
 from app.schemas.admin.appointment_schema import (
     AppointmentResponse,
     AppointmentListResponse,
@@ -9,14 +9,29 @@ from app.schemas.admin.appointment_schema import (
     AppointmentUpdate,
     AppointmentStatus,
 )
+from app.utils.cursor import decode_datetime_cursor, encode_cursor
 from fastapi import HTTPException
 
 
 async def get_appointments_by_department(
-    department_id: str, status: Optional[str] = None, skip: int = 0, limit: int = 100
+    department_id: str,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
 ) -> AppointmentListResponse:
-    """Get all appointments for a specific department"""
+    """
+    Get all appointments for a specific department.
+    With a cursor (next_cursor of the previous page) skip is ignored and pages are
+    read by keyset on (appointment_datetime, appointment_id).
+    """
     try:
+        after = decode_datetime_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        # One extra row tells whether there is a next page
         if status and status != "all":
             # Get appointments by status
             appointments = await db_appointment.get_appointments_by_status(
@@ -24,13 +39,24 @@ async def get_appointments_by_department(
                 department_id=department_id,
                 status=status,
                 skip=skip,
-                limit=limit,
+                limit=limit + 1,
+                after=after,
             )
         else:
             # Get all appointments for department
             appointments = await db_appointment.get_appointments_by_department(
-                db=db, department_id=department_id, skip=skip, limit=limit
+                db=db, department_id=department_id, skip=skip, limit=limit + 1, after=after
+            )
+
+        has_more = len(appointments) > limit
+        appointments = appointments[:limit]
+        next_cursor = (
+            encode_cursor(
+                appointments[-1].appointment_datetime, appointments[-1].appointment_id
             )
+            if has_more
+            else None
+        )
 
         # Count total appointments
         where_clause = {"service": {"department_id": department_id}}
@@ -71,7 +97,9 @@ async def get_appointments_by_department(
             )
             appointment_list.append(appointment_data)
 
-        return AppointmentListResponse(appointments=appointment_list, total=total)
+        return AppointmentListResponse(
+            appointments=appointment_list, total=total, next_cursor=next_cursor
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -164,8 +192,12 @@ async def update_appointment(
         )
 
         updated_appointment = await db_appointment.update_appointment(
-            db=db, appointment_id=appointment_id, appointment_update=appointment_update
+            db=db,
+            appointment_id=appointment_id,
+            appointment_update=appointment_update,
+            before=existing,
         )
+        await db_rollup.record_appointment_changed(db, existing, updated_appointment)
 
         return AppointmentResponse(
             appointment_id=updated_appointment.appointment_id,
@@ -1,8 +1,17 @@
 from app.db.admin.db_dashboard import get_dashboard_overview_data
 from app.schemas.admin.dashboard_schema import DashboardOverviewResponse
 from app.core.database import db
+from app.core.config import settings
+from app.core.response_cache import ResponseCache
 from typing import Dict, Any
 
+# One computation per department per TTL window, however many officers open the dashboard
+dashboard_cache = ResponseCache(
+    "dashboard_overview",
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    stale_seconds=settings.DASHBOARD_CACHE_STALE_SECONDS,
+)
+
 
 async def get_dashboard_overview(department_id: str) -> DashboardOverviewResponse:
     """
@@ -18,11 +27,15 @@ async def get_dashboard_overview(department_id: str) -> DashboardOverviewRespons
         Exception: If there's an error fetching the data
     """
     try:
-        # Get all dashboard data
-        dashboard_data = await get_dashboard_overview_data(db, department_id)
+        # Get all dashboard data (cached per department, invalidated by appointment/feedback writes)
+        dashboard_data, cache_age = await dashboard_cache.get(
+            department_id, lambda: get_dashboard_overview_data(db, department_id)
+        )
 
         # Return structured response
-        return DashboardOverviewResponse(**dashboard_data)
+        return DashboardOverviewResponse(
+            **dashboard_data, cache_age_seconds=round(cache_age, 1)
+        )
 
     except Exception as e:
         raise Exception(f"Error fetching dashboard overview: {str(e)}")
@@ -0,0 +1,188 @@
+import asyncio
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from prisma.enums import AppointmentStatus
+
+from app.core.database import db
+from app.db.admin.db_export import (
+    APPOINTMENT_EXPORT_COLUMNS,
+    FEEDBACK_EXPORT_COLUMNS,
+    iter_appointment_export_batches,
+    iter_feedback_export_batches,
+)
+
+EXPORT_BATCH_SIZE = 1000  # Rows per keyset query, CSV chunk and Parquet row group
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+Columns = List[Tuple[str, str]]
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """ISO date/datetime filter value; unparseable values are ignored like in get_all_feedback"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+async def stream_csv(batches: AsyncIterator[List[Dict[str, Any]]], columns: Columns) -> AsyncIterator[bytes]:
+    """Encode batches as CSV, one chunk per batch, header first"""
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(names)
+    async for rows in batches:
+        for row in rows:
+            writer.writerow([csv_value(row.get(name)) for name in names])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        # Header only: the export matched no rows
+        yield buffer.getvalue().encode("utf-8")
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object the Parquet writer fills; drain() hands the bytes written so far to the response"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_parquet(batches: AsyncIterator[List[Dict[str, Any]]], columns: Columns) -> AsyncIterator[bytes]:
+    """Encode batches as a Parquet file, one row group per batch"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {"string": pa.string(), "int": pa.int32(), "timestamp": pa.timestamp("ms", tz="UTC")}
+    schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+    timestamp_columns = [name for name, kind in columns if kind == "timestamp"]
+
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in batches:
+            for row in rows:
+                for name in timestamp_columns:
+                    row[name] = to_datetime(row.get(name))
+            table = pa.Table.from_pylist(rows, schema=schema)
+            # Encoding is CPU-bound; keep it off the event loop
+            await asyncio.to_thread(writer.write_table, table)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_response(
+    batches: AsyncIterator[List[Dict[str, Any]]], columns: Columns, export_format: str, filename: str
+) -> StreamingResponse:
+    """StreamingResponse for batches in the requested format"""
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=501, detail="Parquet export requires pyarrow to be installed on the server"
+            )
+        body = stream_parquet(batches, columns)
+    else:
+        body = stream_csv(batches, columns)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
+
+
+def export_feedback(
+    department_id: str,
+    export_format: str = "csv",
+    rating_filter: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    service_filter: Optional[str] = None,
+    search: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream a department's feedback, filtered like the feedback list"""
+    batches = iter_feedback_export_batches(
+        db,
+        department_id,
+        batch_size=EXPORT_BATCH_SIZE,
+        rating_filter=rating_filter,
+        date_from=parse_date(date_from),
+        date_to=parse_date(date_to),
+        service_filter=service_filter,
+        search=search,
+    )
+    filename = f"feedback_{department_id}_{datetime.now().strftime('%Y%m%d')}"
+    return export_response(batches, FEEDBACK_EXPORT_COLUMNS, export_format, filename)
+
+
+def export_appointments(
+    department_id: str,
+    export_format: str = "csv",
+    status: Optional[AppointmentStatus] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    service_filter: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream a department's appointments, optionally filtered by status, date and service"""
+    batches = iter_appointment_export_batches(
+        db,
+        department_id,
+        batch_size=EXPORT_BATCH_SIZE,
+        status=status,
+        date_from=parse_date(date_from),
+        date_to=parse_date(date_to),
+        service_filter=service_filter,
+    )
+    filename = f"appointments_{department_id}_{datetime.now().strftime('%Y%m%d')}"
+    return export_response(batches, APPOINTMENT_EXPORT_COLUMNS, export_format, filename)
@@ -6,11 +6,14 @@ from app.db.admin.db_feedback import (
     get_feedback_by_id,
     get_feedback_stats,
     get_feedback_rating_by_service_stats,
+    search_feedback,
 )
+from app.utils.cursor import decode_datetime_cursor
 from app.schemas.admin.feedback_schema import (
     FeedbackListResponse,
     FeedbackResponse,
     FeedbackStatsResponse,
+    FeedbackSearchResponse,
 )
 
 
@@ -23,10 +26,15 @@ async def get_all_feedback(
     date_to: Optional[str] = None,
     service_filter: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
 ) -> FeedbackListResponse:
-    """Get paginated feedback list with filters for a specific department"""
+    """
+    Get paginated feedback list with filters for a specific department.
+    A cursor (next_cursor of the previous page) takes precedence over page.
+    """
 
     skip = (page - 1) * page_size
+    after = decode_datetime_cursor(cursor)
 
     # Parse date strings if provided
     parsed_date_from = None
@@ -54,11 +62,23 @@ async def get_all_feedback(
         date_to=parsed_date_to,
         service_filter=service_filter,
         search=search,
+        after=after,
     )
 
     return FeedbackListResponse(**result)
 
 
+async def search_department_feedback(
+    department_id: str, query: str, limit: int = 20, cursor: Optional[str] = None
+) -> FeedbackSearchResponse:
+    """Keyword search over feedback comments and citizen names"""
+
+    result = await search_feedback(
+        db, department_id, query, limit=limit, after=decode_datetime_cursor(cursor)
+    )
+    return FeedbackSearchResponse(**result)
+
+
 async def get_feedback_details(feedback_id: str) -> Optional[FeedbackResponse]:
     """Get detailed feedback information"""
 
@@ -0,0 +1,19 @@
+import logging
+from prisma import Prisma
+from app.core.database import get_db
+from app.db.admin.db_rollup import reconcile_rollups
+from app.db.admin.feedback_repository import rebuild_service_feedback_summaries
+
+logger = logging.getLogger(__name__)
+RECONCILE_INTERVAL_SECONDS = 60 * 60  # Rebuild the dashboard rollups and feedback summaries hourly
+RETRY_SECONDS = 60
+
+
+async def run_rollup_reconciliation():
+    """Recomputes the rollups and service feedback summaries from source rows"""
+    db: Prisma = get_db()
+
+    corrections = await reconcile_rollups(db)
+    corrections.update(await rebuild_service_feedback_summaries(db))
+    if any(corrections.values()):
+        logger.info(f"Rollup reconciliation corrected rows: {corrections}")
@@ -0,0 +1,54 @@
+# backend/app/services/background_jobs.py
+from app.core.config import settings
+from app.core.worker_supervisor import API, LEADER, SHARED, WorkerSupervisor
+from app.core.websocket_manager import websocket_manager
+from app.core.notification_pubsub import notification_bus
+from app.services.citizen.appointment_reminder import appointment_reminder_worker
+from app.services.citizen.appointment_event_dispatcher import appointment_event_dispatcher
+from app.services.citizen import document_expiry_monitor
+from app.services.admin import rollup_reconciler
+from app.services.email_outbox_worker import email_outbox_worker
+
+
+def register_background_jobs(supervisor: WorkerSupervisor):
+    """Every background job and where it runs"""
+    # Serve this process's WebSocket connections
+    supervisor.add_job("WebSocket Heartbeat", websocket_manager.heartbeat_worker, API)
+    supervisor.add_job("Notification Subscriber", notification_bus.run, API)
+
+    # Wake-ups for the jobs below from writes committed in other processes
+    supervisor.add_job("Signal Subscriber", notification_bus.run_signals, SHARED)
+
+    # Claims rows with SKIP LOCKED, so every worker process adds sending capacity
+    supervisor.add_job("Email Outbox", email_outbox_worker, SHARED)
+
+    # Once per cluster
+    supervisor.add_job("Appointment Events", appointment_event_dispatcher, LEADER)
+    supervisor.add_job("Appointment Reminder", appointment_reminder_worker, LEADER)
+    supervisor.add_job(
+        "Document Expiry",
+        document_expiry_monitor.run_document_expiry_sweep,
+        LEADER,
+        interval_seconds=document_expiry_monitor.CHECK_INTERVAL_HOURS * 3600,
+        retry_seconds=document_expiry_monitor.RETRY_SECONDS,
+    )
+    supervisor.add_job(
+        "Rollup Reconciliation",
+        rollup_reconciler.run_rollup_reconciliation,
+        LEADER,
+        interval_seconds=rollup_reconciler.RECONCILE_INTERVAL_SECONDS,
+        retry_seconds=rollup_reconciler.RETRY_SECONDS,
+    )
+
+
+def require_shared_notification_bus():
+    """
+    Jobs in a separate process from the API reach its WebSockets only through a shared
+    pub/sub backend; with the local one their notifications would silently go nowhere.
+    """
+    if settings.NOTIFICATION_PUBSUB_BACKEND == "local":
+        raise RuntimeError(
+            "Background jobs running outside the API processes need "
+            "NOTIFICATION_PUBSUB_BACKEND=redis; the local backend cannot deliver their "
+            "notifications to the API's WebSockets"
+        )
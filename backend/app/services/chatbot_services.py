@@ -1,10 +1,13 @@
+import asyncio
+import hashlib
 import json
+import re
 from fastapi import APIRouter, HTTPException
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 import logging
 import google.generativeai as genai
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import get_knowledge_base_service
 import os
 from app.core.config import settings
 from app.services.citizen.citizen_service import  get_form_template
@@ -12,6 +15,8 @@ from app.schemas.citizen import citizen_schema
 from fastapi import APIRouter, HTTPException, Depends
 from app.core.auth import get_current_user
 from app.services.message_log import log_message
+from app.core.single_flight import SingleFlight
+from app.utils.kb_metadata import build_where, detect_language
 from prisma import Prisma
 
 db = Prisma()
@@ -22,6 +27,10 @@ logger = logging.getLogger(__name__)
 class SearchQuery(BaseModel):
     text: str
     limit: int = 5
+    # Optional scope, pushed down to ChromaDB as a metadata filter
+    department: Optional[List[str]] = None
+    language: Optional[str] = None
+    content_type: Optional[List[str]] = None
 
 class SearchQueryForHelp(BaseModel):
     text: str
@@ -39,51 +48,153 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
     total_results: int
 
+class BatchSearchQuery(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=1000)
+    limit: int = 5
+    use_llm: bool = False
+    department: Optional[List[str]] = None
+    language: Optional[str] = None
+    content_type: Optional[List[str]] = None
+
+class BatchSearchItem(BaseModel):
+    query: str
+    results: List[SearchResult]
+    total_results: int
+    answer: Optional[str] = None
+    error: Optional[str] = None  # Set when the answer for this query could not be generated
+
+class BatchSearchResponse(BaseModel):
+    items: List[BatchSearchItem]
+    total_queries: int
+
+
+SYSTEM_FEATURES = ["driving license medical form filling"]
+ABOUT_SYSTEM = """This application provides information about government services, procedures, and related topics. It aims to assist users in finding relevant information quickly and efficiently."""
+
+# Departments whose content answers questions asked from each help page
+PAGE_DEPARTMENTS = {
+    "driving_license": ["motor_traffic", "transport"],
+    "license medical ": ["motor_traffic", "transport"],
+    # No immigration.gov.lk source is scraped yet; passport services are listed on the gov.lk portal
+    "passport application": ["immigration", "government_portal"],
+}
+
+# Identical questions that arrive while an answer is still being generated share one
+# Chroma query and one Gemini call instead of each running their own.
+answer_flight = SingleFlight("knowledge_base_answer")
+help_answer_flight = SingleFlight("knowledge_base_help_answer")
+
+# Upper bound on concurrent Gemini calls made by one batch search request
+BATCH_LLM_CONCURRENCY = 8
+# Most queries one batch search may answer with Gemini; retrieval alone allows 1000
+BATCH_LLM_MAX_QUERIES = 20
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query for coalescing: case and whitespace do not change the answer"""
+    return " ".join(text.lower().split())
+
+
+def history_fingerprint(history: List[dict]) -> str:
+    """Stable hash of the chat history that is fed into the prompt"""
+    return hashlib.sha256(json.dumps(history, sort_keys=True).encode()).hexdigest()
+
+
+def get_coalescing_stats() -> dict:
+    """Get single-flight counters for the chatbot endpoints"""
+    return {
+        "answer": answer_flight.get_stats(),
+        "help_answer": help_answer_flight.get_stats(),
+    }
+
+
+def query_scope(query_text: str, department=None, language: Optional[str] = None, content_type=None) -> Optional[dict]:
+    """Chroma where clause for a query; the language defaults to the script the query is written in"""
+    return build_where(
+        department=department,
+        language=language or detect_language(query_text),
+        content_type=content_type
+    )
+
+
+def scope_fingerprint(where: Optional[dict]) -> str:
+    """Stable string form of a where clause for coalescing keys"""
+    return json.dumps(where, sort_keys=True) if where else ""
+
+
+def to_search_results(results) -> List[SearchResult]:
+    """Convert ChromaDB results to API response"""
+    search_results = []
+
+    if results['documents'] and results['documents'][0]:
+        for doc, metadata, distance in zip(
+            results['documents'][0],
+            results['metadatas'][0],
+            results['distances'][0]
+        ):
+            search_results.append(SearchResult(
+                content=doc[:500] + "..." if len(doc) > 500 else doc,
+                source=metadata.get('url', 'Unknown'),
+                title=metadata.get('title', 'Government Service'),
+                relevance_score=max(0.0, 1.0 - distance)  # Convert distance to similarity
+            ))
+
+    return search_results
+
+
+def parse_gemini_json(response_text: str) -> dict:
+    """Parse Gemini's JSON answer, stripping Markdown code fences if present"""
+    response_text = response_text.strip()
+
+    if response_text.startswith("```"):
+        response_text = re.sub(r"^```(json)?\n", "", response_text)
+        response_text = re.sub(r"\n```$", "", response_text)
 
-async def search_Answer(query: SearchQuery):
     try:
-        await db.connect()
-        messages = await db.messagelog.find_many(
-            where={"citizen_id": "C0"},
-            order={"created_at": "desc"},
-            take=2
-        )
-        await db.disconnect()
+        return json.loads(response_text)
+    except Exception:
+        # fallback if Gemini doesn't return valid JSON
+        print("fallbacked")
+        return {
+            "response": response_text,
+            "bad_words": 0
+        }
+
 
-        history = [
+async def get_chat_history(citizen_id: str) -> List[dict]:
+    await db.connect()
+    messages = await db.messagelog.find_many(
+        where={"citizen_id": citizen_id},
+        order={"created_at": "desc"},
+        take=2
+    )
+    await db.disconnect()
+
+    return [
         {
             "message": msg.message,
             "response": msg.response
         }
-        for idx, msg in enumerate(messages)
-        ]
-        kb_service = KnowledgeBaseService()
-        results = await kb_service.search(query.text, query.limit)
-        system_features = ["driving license medical form filling"]
-        about="""This application provides information about government services, procedures, and related topics. It aims to assist users in finding relevant information quickly and efficiently."""
-        # Convert ChromaDB results to API response
-        search_results = []
-        
-        if results['documents'] and results['documents'][0]:
-            for doc, metadata, distance in zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            ):
-                search_results.append(SearchResult(
-                    content=doc[:500] + "..." if len(doc) > 500 else doc,
-                    source=metadata.get('url', 'Unknown'),
-                    title=metadata.get('title', 'Government Service'),
-                    relevance_score=max(0.0, 1.0 - distance)  # Convert distance to similarity
-                ))
-        
-        # send query.txt and search results to gemini and get final response
-        prompt = f"User query: {query.text}\n\nRelevant government services:\n"
-        for idx, result in enumerate(search_results, 1):
-            prompt += f"{idx}. Title: {result.title}\n   Source: {result.source}\n   Content: {result.content}\n\n"
-        prompt += f"""Based on the above, You are a helpful and respectful government service information assistant. Your job is to answer user queries about government services, procedures, and information in a clear, polite, and professional manner.
-        system features : {system_features}
-        about system : {about}
+        for msg in messages
+    ]
+
+
+async def generate_answer(query_text: str, limit: int, history: List[dict], where: Optional[dict] = None) -> dict:
+    """Retrieve relevant services and ask Gemini for an answer"""
+    kb_service = get_knowledge_base_service()
+    results = await kb_service.search(query_text, limit, where=where)
+    return await answer_from_results(query_text, to_search_results(results), history)
+
+
+async def answer_from_results(query_text: str, search_results: List[SearchResult], history: List[dict]) -> dict:
+    """Ask Gemini to answer a query from already retrieved search results"""
+    # send query.txt and search results to gemini and get final response
+    prompt = f"User query: {query_text}\n\nRelevant government services:\n"
+    for idx, result in enumerate(search_results, 1):
+        prompt += f"{idx}. Title: {result.title}\n   Source: {result.source}\n   Content: {result.content}\n\n"
+    prompt += f"""Based on the above, You are a helpful and respectful government service information assistant. Your job is to answer user queries about government services, procedures, and information in a clear, polite, and professional manner.
+        system features : {SYSTEM_FEATURES}
+        about system : {ABOUT_SYSTEM}
 
 Always:
 - Address the user respectfully.
@@ -98,32 +209,28 @@ Always:
 Do not use nested JSON objects in the response field. Instead, use plain text with \\n for new lines and Markdown formatting for structure.
 this is the recent chat history : {history} """
 
-        # Call Gemini
-        print("Gemini API Key:", settings.GEMINI_API_KEY)
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # print(list(genai.list_models()))
-        model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
-        gemini_response = model.generate_content(prompt)
-
-        import re
-
-        response_text = gemini_response.text.strip()
-
-        # Remove Markdown code fences if present
-        if response_text.startswith("```"):
-            response_text = re.sub(r"^```(json)?\n", "", response_text)
-            response_text = re.sub(r"\n```$", "", response_text)
-
-        try:
-            response_json = json.loads(response_text)
-        except Exception:
-            # fallback if Gemini doesn't return valid JSON
-            print("fallbacked")
-            response_json = {
-                "response": response_text,
-                "bad_words": 0
-            }
-        print("Gemini response:", response_json)
+    # Call Gemini without blocking the event loop, so identical requests can join this one
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
+    gemini_response = await model.generate_content_async(prompt)
+
+    response_json = parse_gemini_json(gemini_response.text)
+    print("Gemini response:", response_json)
+    return response_json
+
+
+async def coalesced_answer(query_text: str, limit: int, history: List[dict], where: Optional[dict] = None) -> dict:
+    """generate_answer() shared between concurrent identical requests"""
+    key = f"{normalize_query(query_text)}|{limit}|{history_fingerprint(history)}|{scope_fingerprint(where)}"
+    return await answer_flight.do(key, lambda: generate_answer(query_text, limit, history, where))
+
+
+async def search_Answer(query: SearchQuery):
+    try:
+        history = await get_chat_history("C0")
+        where = query_scope(query.text, query.department, query.language, query.content_type)
+        response_json = await coalesced_answer(query.text, query.limit, history, where)
+
         if response_json["bad_words"]==0:
             await log_message("C0", query.text, json.dumps(response_json["response"]))
         print("history:", history)
@@ -134,6 +241,58 @@ this is the recent chat history : {history} """
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
     
 
+async def answer_search_batch(query: BatchSearchQuery) -> BatchSearchResponse:
+    """Retrieve results for many queries with one embedding call and one ChromaDB query"""
+    if query.use_llm and len(query.queries) > BATCH_LLM_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"use_llm allows at most {BATCH_LLM_MAX_QUERIES} queries per request"
+        )
+
+    try:
+        kb_service = get_knowledge_base_service()
+        # One scope for the whole batch; the language is only filtered on when given explicitly
+        where = build_where(query.department, query.language, query.content_type)
+        results_per_query = await kb_service.search_many(query.queries, query.limit, where=where)
+        search_results = [to_search_results(results) for results in results_per_query]
+
+        answers: List[Optional[str]] = [None] * len(query.queries)
+        errors: List[Optional[str]] = [None] * len(query.queries)
+        if query.use_llm:
+            semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+            async def answer_one(idx: int):
+                if not search_results[idx]:
+                    return
+                try:
+                    async with semaphore:
+                        response_json = await answer_from_results(query.queries[idx], search_results[idx], [])
+                except Exception as e:
+                    # One failed Gemini call costs that query its answer, not the whole batch
+                    logger.error(f"Batch search answer failed for query {idx}: {str(e)}")
+                    errors[idx] = "Answer generation failed"
+                    return
+                answers[idx] = response_json["response"]
+
+            await asyncio.gather(*(answer_one(idx) for idx in range(len(query.queries))))
+
+        items = [
+            BatchSearchItem(
+                query=text,
+                results=results,
+                total_results=len(results),
+                answer=answer,
+                error=error
+            )
+            for text, results, answer, error in zip(query.queries, search_results, answers, errors)
+        ]
+        return BatchSearchResponse(items=items, total_queries=len(items))
+
+    except Exception as e:
+        logger.error(f"Error in knowledge base batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
+
 async def update_trigger():
     try:
         # This could trigger the web monitoring task
@@ -153,91 +312,11 @@ async def update_trigger():
     
 async def answer_search_secured(query: SearchQuery,current_user: citizen_schema.Citizen = Depends(get_current_user)):
     try:
-        await db.connect()
-        messages = await db.messagelog.find_many(
-            where={"citizen_id": current_user.citizen_id},
-            order={"created_at": "desc"},
-            take=2
-        )
-        await db.disconnect()
-
-        history = [
-        {
-            "message": msg.message,
-            "response": msg.response
-        }
-        for idx, msg in enumerate(messages)
-        ]
-        
-        kb_service = KnowledgeBaseService()
-        results = await kb_service.search(query.text, query.limit)
-        system_features = ["driving license medical form filling"]
-        about="""This application provides information about government services, procedures, and related topics. It aims to assist users in finding relevant information quickly and efficiently."""
-        # Convert ChromaDB results to API response
-        search_results = []
-        
-        if results['documents'] and results['documents'][0]:
-            for doc, metadata, distance in zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            ):
-                search_results.append(SearchResult(
-                    content=doc[:500] + "..." if len(doc) > 500 else doc,
-                    source=metadata.get('url', 'Unknown'),
-                    title=metadata.get('title', 'Government Service'),
-                    relevance_score=max(0.0, 1.0 - distance)  # Convert distance to similarity
-                ))
-        
-        # send query.txt and search results to gemini and get final response
-        prompt = f"User query: {query.text}\n\nRelevant government services:\n"
-        for idx, result in enumerate(search_results, 1):
-            prompt += f"{idx}. Title: {result.title}\n   Source: {result.source}\n   Content: {result.content}\n\n"
-        prompt += f"""Based on the above, You are a helpful and respectful government service information assistant. Your job is to answer user queries about government services, procedures, and information in a clear, polite, and professional manner.
-        system features : {system_features}
-        about system : {about}
-
-Always:
-- Address the user respectfully.
-- Provide accurate and concise information.
-- Format your response with headings, bullet points, and clear sections for readability.
-- If possible, include links or references to official sources but do it only if system not have that facility.
-- Please respond in the following JSON format:
-{{
-  "response": "<your respectful, well-formatted answer here, using \\n for new lines and Markdown for headings/lists>",
-  "bad_words": <1 if any inappropriate or offensive words are detected in the user's query, otherwise 0>
-}}
-Do not use nested JSON objects in the response field. Instead, use plain text with \\n for new lines and Markdown formatting for structure. 
-
-this is the recent chat history : {history}
-"""
+        history = await get_chat_history(current_user.citizen_id)
+        where = query_scope(query.text, query.department, query.language, query.content_type)
+        response_json = await coalesced_answer(query.text, query.limit, history, where)
 
-        # Call Gemini
-        print("Gemini API Key:", settings.GEMINI_API_KEY)
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # print(list(genai.list_models()))
-        model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
-        gemini_response = model.generate_content(prompt)
-
-        import re
-
-        response_text = gemini_response.text.strip()
-
-        # Remove Markdown code fences if present
-        if response_text.startswith("```"):
-            response_text = re.sub(r"^```(json)?\n", "", response_text)
-            response_text = re.sub(r"\n```$", "", response_text)
-
-        try:
-            response_json = json.loads(response_text)
-        except Exception:
-            # fallback if Gemini doesn't return valid JSON
-            print("fallbacked")
-            response_json = {
-                "response": response_text,
-                "bad_words": 0
-            }
-        print("Gemini response:", response_json)
+        # Logging stays per caller, so every coalesced request is still recorded
         if response_json["bad_words"]==0:
             await log_message(current_user.citizen_id, query.text, json.dumps(response_json["response"]))
         return response_json["response"]
@@ -247,50 +326,32 @@ this is the recent chat history : {history}
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
     
 
-async def answer_search_for_help(query: SearchQueryForHelp):
-    try:
-        form_id = "S001"
-        passport_form_template = await get_form_template(form_id) # type: ignore
-        form_id = "S002"
-        medical_form_template= await get_form_template(form_id)
-        page_info={
-            "home" : "this page contains a chatbot. press on text box at top to use chatbot.\n this page contains profile view option at the right top of the screen",
-            "driving_license" : "press arrow icon to send to chatbot",
-            "passport application" : f"this page has a passport application form of this template {passport_form_template} which contains required fields from the department of passport.",
-            "license medical " : f"this page has a medical license form of this template {medical_form_template} which contains required fields from the department of health.",
-        }
-        kb_service = KnowledgeBaseService()
-        results = await kb_service.search(query.text, query.limit)
-        system_features = ["driving license medical form filling","passport application filling"]
-        about="""This application provides information about government services, procedures, and related topics. It aims to assist users in finding relevant information quickly and efficiently."""
-        print("current page: ", query.page)
-        current=page_info[query.page]
-        print("current page info : ",current)
-        # Convert ChromaDB results to API response
-        search_results = []
-        
-        if results['documents'] and results['documents'][0]:
-            for doc, metadata, distance in zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            ):
-                search_results.append(SearchResult(
-                    content=doc[:500] + "..." if len(doc) > 500 else doc,
-                    source=metadata.get('url', 'Unknown'),
-                    title=metadata.get('title', 'Government Service'),
-                    relevance_score=max(0.0, 1.0 - distance)  # Convert distance to similarity
-                ))
-        
-        # send query.txt and search results to gemini and get final response
-        prompt = f"User query: {query.text}\n\nRelevant government services:\n"
-        for idx, result in enumerate(search_results, 1):
-            prompt += f"{idx}. Title: {result.title}\n   Source: {result.source}\n   Content: {result.content}\n\n"
-        prompt = f"""You are a helpful and respectful assistant of {query.page} page of a government service information system. user is currently on your page and ask for details. Your job is to answer user queries about page`s content , government services, procedures, and information in a clear, polite, and professional manner.
-        {query.page} page content using instructions : {current}.
-        system features : {system_features}
-        about system : {about}
-        user asked this : {query.text}
+async def generate_help_answer(query_text: str, page: str, limit: int) -> str:
+    """Answer a question asked from a specific app page"""
+    form_id = "S001"
+    passport_form_template = await get_form_template(form_id) # type: ignore
+    form_id = "S002"
+    medical_form_template= await get_form_template(form_id)
+    page_info={
+        "home" : "this page contains a chatbot. press on text box at top to use chatbot.\n this page contains profile view option at the right top of the screen",
+        "driving_license" : "press arrow icon to send to chatbot",
+        "passport application" : f"this page has a passport application form of this template {passport_form_template} which contains required fields from the department of passport.",
+        "license medical " : f"this page has a medical license form of this template {medical_form_template} which contains required fields from the department of health.",
+    }
+    kb_service = get_knowledge_base_service()
+    where = query_scope(query_text, department=PAGE_DEPARTMENTS.get(page))
+    results = await kb_service.search(query_text, limit, where=where)
+    system_features = ["driving license medical form filling","passport application filling"]
+    print("current page: ", page)
+    current=page_info[page]
+    print("current page info : ",current)
+    search_results = to_search_results(results)
+
+    prompt = f"""You are a helpful and respectful assistant of {page} page of a government service information system. user is currently on your page and ask for details. Your job is to answer user queries about page`s content , government services, procedures, and information in a clear, polite, and professional manner.
+    {page} page content using instructions : {current}.
+    system features : {system_features}
+    about system : {ABOUT_SYSTEM}
+    user asked this : {query_text}
 
 Always:
 - dont use Relevant government services contents if user ask for page content directly. if user ask for page content just answer using page content.
@@ -303,15 +364,19 @@ Always:
 - Relevant government services: {search_results}.
 """
 
-        # Call Gemini
-        print("Gemini API Key:", settings.GEMINI_API_KEY)
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # print(list(genai.list_models()))
-        model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
-        gemini_response = model.generate_content(prompt)
-        final_response = gemini_response.text if hasattr(gemini_response, "text") else str(gemini_response)
-        
-        return final_response
+    # Call Gemini without blocking the event loop, so identical requests can join this one
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
+    gemini_response = await model.generate_content_async(prompt)
+    return gemini_response.text if hasattr(gemini_response, "text") else str(gemini_response)
+
+
+async def answer_search_for_help(query: SearchQueryForHelp):
+    try:
+        key = f"{normalize_query(query.text)}|{query.page}|{query.limit}"
+        return await help_answer_flight.do(
+            key, lambda: generate_help_answer(query.text, query.page, query.limit)
+        )
     
     except Exception as e:
         logger.error(f"Error in knowledge base search: {str(e)}")
@@ -0,0 +1,133 @@
+# backend/app/services/citizen/appointment_event_dispatcher.py
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from prisma import Prisma
+from prisma.enums import NotificationType, NotificationPriority
+
+from app.core.database import get_db
+from app.db.repositories.appointment_events import (
+    RESCHEDULED,
+    claim_appointment_events,
+    count_exhausted_appointment_events,
+    events_available,
+    mark_appointment_events_processed,
+)
+from app.schemas.citizen.notification import NotificationCreate
+from app.services.citizen.notification_repository import create_notifications
+from app.services.citizen.appointment_reminder import reminder_scheduler
+
+logger = logging.getLogger(__name__)
+BATCH_SIZE = 200
+LEASE_SECONDS = 60  # Events a dispatcher claimed but did not finish are retried after this
+MAX_ATTEMPTS = 5
+# Writers in any process wake the dispatcher through a notification bus signal, so events
+# are normally picked up at once. The poll is only a fallback for retries after a lease
+# expires and for lost signals (pub/sub is best effort, and uvicorn workers sharing the
+# local bus cannot reach each other): those events wait up to this long.
+POLL_INTERVAL_SECONDS = 30
+
+# Per-process counters, reported by /workers/health
+dispatch_stats = {"dispatched": 0, "failed_batches": 0, "dead_lettered": 0}
+
+
+def status_notification(appointment, event: Dict[str, Any]) -> NotificationCreate:
+    """Notification for one appointment event"""
+    when = appointment.appointment_datetime.strftime('%Y-%m-%d at %H:%M')
+
+    if event["event_type"] == RESCHEDULED:
+        message = f"Your appointment for {appointment.service.name} has been rescheduled to {when}."
+        priority = NotificationPriority.High
+    else:
+        status = event["new_status"]
+        action_required = ""
+        if status == "Booked":
+            action_required = "Please prepare your documents as listed in your appointment details."
+        elif status == "Cancelled":
+            action_required = "You may reschedule this appointment at your convenience."
+
+        message = f"Your appointment for {appointment.service.name} on {when} is now {status}. {action_required}"
+        priority = (
+            NotificationPriority.High
+            if status in ["Cancelled", "Confirmed"]
+            else NotificationPriority.Medium
+        )
+
+    return NotificationCreate(
+        message=message,
+        priority=priority,
+        type=NotificationType.AppointmentStatusChange,
+        citizen_id=appointment.citizen_id,
+        appointment_id=appointment.appointment_id
+    )
+
+
+async def dispatch_appointment_events(db: Prisma) -> int:
+    """Turn one batch of pending events into notifications; returns the number claimed"""
+    events = await claim_appointment_events(db, BATCH_SIZE, LEASE_SECONDS, MAX_ATTEMPTS)
+    if not events:
+        return 0
+
+    appointments = {
+        appointment.appointment_id: appointment
+        for appointment in await db.appointment.find_many(
+            where={"appointment_id": {"in": list({event["appointment_id"] for event in events})}},
+            include={"service": True}
+        )
+    }
+
+    for appointment in appointments.values():
+        reminder_scheduler.on_appointment_changed(appointment)
+
+    batch: List[NotificationCreate] = []
+    for event in events:
+        appointment = appointments.get(event["appointment_id"])
+        if appointment is None or event["new_status"] == "NoShow":
+            continue  # Deleted since, or not something the citizen is notified about
+        batch.append(status_notification(appointment, event))
+
+    try:
+        await create_notifications(db, batch)
+        await mark_appointment_events_processed(db, [event["event_id"] for event in events])
+    except Exception:
+        dispatch_stats["failed_batches"] += 1
+        exhausted = [event["event_id"] for event in events if event["attempts"] >= MAX_ATTEMPTS]
+        if exhausted:
+            # Not claimed again; the citizens never get these notifications
+            dispatch_stats["dead_lettered"] += len(exhausted)
+            logger.error(
+                f"Dropping {len(exhausted)} appointment events after {MAX_ATTEMPTS} attempts: "
+                f"{', '.join(exhausted)}"
+            )
+        raise
+
+    dispatch_stats["dispatched"] += len(events)
+    return len(events)
+
+
+async def get_dispatcher_stats(db: Prisma) -> Dict[str, int]:
+    """
+    This process's dispatch counters and the cluster-wide count of exhausted events,
+    which also catches events whose last attempt died with its process
+    """
+    return {**dispatch_stats, "exhausted_pending": await count_exhausted_appointment_events(db, MAX_ATTEMPTS)}
+
+
+async def appointment_event_dispatcher():
+    """Delivers appointment status notifications as soon as changes are committed"""
+    db: Prisma = get_db()
+
+    while True:
+        try:
+            events_available.clear()
+            claimed = await dispatch_appointment_events(db)
+            if claimed < BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(events_available.wait(), timeout=POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+        except Exception as e:
+            logger.error(f"Appointment event dispatcher error: {str(e)}")
+            await asyncio.sleep(10)  # Wait longer on error
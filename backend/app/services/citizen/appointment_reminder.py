@@ -1,17 +1,45 @@
 import asyncio
-from datetime import datetime, timedelta
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from prisma import Prisma
 from app.core.database import get_db
-from app.services.citizen.notification_repository import create_notification
+from app.utils.sql_params import in_params, timestamp_param
+from app.services.citizen.notification_repository import create_notifications
 from app.schemas.citizen.notification import NotificationCreate
 from prisma.enums import NotificationType, NotificationPriority
 import json
 import logging
 
 logger = logging.getLogger(__name__)
-CHECK_INTERVAL_SECONDS = 60
+REMINDER_LEAD = timedelta(hours=24)  # Remind this long before the appointment
+LOAD_HORIZON = timedelta(hours=6)  # Reminders due within this window are kept in memory
+RELOAD_INTERVAL_SECONDS = 60 * 60  # Refill the horizon (and pick up other processes' bookings)
 MAX_RETRIES = 3
 RETRY_DELAY = 5
 
+# Marks reminders as sent, skipping appointments that were reminded, cancelled or moved
+# out of the reminder window since they were scheduled. Only the winning process sends.
+CLAIM_REMINDERS_SQL = """
+UPDATE "Appointment"
+SET reminder_sent_at = $1::timestamp
+WHERE appointment_id IN ({placeholders})
+  AND reminder_sent_at IS NULL
+  AND status = 'Booked'
+  AND appointment_datetime > $1::timestamp
+  AND appointment_datetime <= $2::timestamp
+RETURNING appointment_id
+"""
+
+# Only this claim's markers (same timestamp) are released, never another process's
+RELEASE_REMINDERS_SQL = """
+UPDATE "Appointment"
+SET reminder_sent_at = NULL
+WHERE reminder_sent_at = $1::timestamp
+  AND appointment_id IN ({placeholders})
+"""
+
 async def execute_db_query(db, query_func, *args, **kwargs):
     """Helper function to execute DB queries with retry logic"""
     for attempt in range(MAX_RETRIES):
@@ -24,80 +52,178 @@ async def execute_db_query(db, query_func, *args, **kwargs):
                 continue
             raise
 
-async def appointment_reminder_worker():
-    """Background worker to send appointment reminders."""
-    db = get_db()  # Get the global Prisma instance
-    
-    while True:
+
+def reminder_message(appt) -> str:
+    """Reminder text for an appointment loaded with its service and locations"""
+    docs_list = []
+    if appt.service.required_documents:
+        try:
+            docs_list = json.loads(appt.service.required_documents) \
+                if isinstance(appt.service.required_documents, str) \
+                else appt.service.required_documents
+        except json.JSONDecodeError:
+            docs_list = [str(appt.service.required_documents)]
+
+    location = appt.service.locations[0].address if appt.service.locations else "TBD"
+
+    appt_dt = appt.appointment_datetime
+    today = datetime.now(appt_dt.tzinfo).date()
+    if appt_dt.date() == today:
+        day = "today"
+    elif appt_dt.date() == today + timedelta(days=1):
+        day = "tomorrow"
+    else:
+        day = f"on {appt_dt.strftime('%Y-%m-%d')}"
+
+    return (
+        f"Reminder: Your appointment for {appt.service.name} is {day} at "
+        f"{appt_dt.strftime('%H:%M')}. "
+        f"Location: {location}. "
+        f"Required documents: {', '.join(docs_list) if docs_list else 'None'}"
+    )
+
+
+class ReminderScheduler:
+    """
+    Keeps the reminders due within LOAD_HORIZON in a heap ordered by due time and sleeps
+    until the next one. The horizon is loaded at startup, which also catches up on
+    reminders missed while the service was down, and refilled every RELOAD_INTERVAL_SECONDS.
+    Bookings, reschedules and cancellations update the heap as the appointment event
+    dispatcher, which runs alongside on the background job leader, processes them. Appointment.reminder_sent_at makes sending idempotent across restarts and
+    processes.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}  # appointment_id -> due time of its live heap entry
+        self._changed = asyncio.Event()
+        self.sent = 0
+
+    def schedule(self, appointment_id: str, appointment_datetime: datetime):
+        """(Re)schedule a reminder; appointments outside the horizon wait for a reload"""
+        due = (appointment_datetime - REMINDER_LEAD).timestamp()
+        if due > time.time() + LOAD_HORIZON.total_seconds():
+            self.unschedule(appointment_id)
+            return
+        if self._due.get(appointment_id) == due:
+            return
+        self._due[appointment_id] = due
+        heapq.heappush(self._heap, (due, appointment_id))
+        self._changed.set()
+
+    def unschedule(self, appointment_id: str):
+        # The heap entry stays and is skipped when popped
+        self._due.pop(appointment_id, None)
+
+    def on_appointment_changed(self, appointment):
+        """Keep the heap in step with a booked, rescheduled or cancelled appointment"""
+        status = getattr(appointment.status, "value", appointment.status)
+        if status == "Booked" and appointment.reminder_sent_at is None:
+            self.schedule(appointment.appointment_id, appointment.appointment_datetime)
+        else:
+            self.unschedule(appointment.appointment_id)
+
+    async def load(self, db: Prisma):
+        """Schedule every unsent reminder due before the end of the horizon"""
+        now = datetime.now(timezone.utc)
+        appointments = await execute_db_query(
+            db,
+            db.appointment.find_many,
+            where={
+                "status": "Booked",
+                "reminder_sent_at": None,
+                "appointment_datetime": {"gt": now, "lte": now + REMINDER_LEAD + LOAD_HORIZON}
+            }
+        )
+        for appt in appointments:
+            self.schedule(appt.appointment_id, appt.appointment_datetime)
+        logger.info(f"Reminder scheduler loaded {len(appointments)} upcoming reminders")
+
+    def pop_due(self) -> List[str]:
+        now = time.time()
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due, appointment_id = heapq.heappop(self._heap)
+            if self._due.get(appointment_id) == due:
+                del self._due[appointment_id]
+                due_ids.append(appointment_id)
+        return due_ids
+
+    def seconds_until_next(self) -> float:
+        # Drop entries superseded by a reschedule or cancellation
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] - time.time() if self._heap else float("inf")
+
+    async def send(self, db: Prisma, appointment_ids: List[str]):
+        """Claim and send the reminders of the given appointments"""
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # As stored (millisecond precision)
         try:
-            now = datetime.now()
-            reminder_time = now + timedelta(hours=24)
-            
-            # Use the helper function for DB queries
-            appointments = await execute_db_query(
-                db,
-                db.appointment.find_many,
-                where={
-                    "appointment_datetime": {
-                        "gte": reminder_time - timedelta(minutes=5),
-                        "lt": reminder_time + timedelta(minutes=5)
-                    },
-                    "status": "Booked"
-                },
-                include={
-                    "service": {"include": {"locations": True}},
-                    "citizen": True
-                }
+            claimed = await db.query_raw(
+                CLAIM_REMINDERS_SQL.format(placeholders=in_params(appointment_ids, 3)),
+                timestamp_param(now),
+                timestamp_param(now + REMINDER_LEAD),
+                *appointment_ids
+            )
+            claimed_ids = [row["appointment_id"] for row in claimed]
+            if not claimed_ids:
+                return
+
+            appointments = await db.appointment.find_many(
+                where={"appointment_id": {"in": claimed_ids}},
+                include={"service": {"include": {"locations": True}}}
             )
-            
-            for appt in appointments:
+            await create_notifications(db, [
+                NotificationCreate(
+                    message=reminder_message(appt),
+                    priority=NotificationPriority.Medium.name,
+                    type=NotificationType.Appointment.name,
+                    citizen_id=appt.citizen_id,
+                    appointment_id=appt.appointment_id
+                )
+                for appt in appointments
+            ])
+            self.sent += len(appointments)
+        except BaseException:
+            # Release the markers so the next load retries these reminders. This includes
+            # cancellation (leader lease lost, shutdown), which can land after the claim
+            # committed, so the release must not be cancelled itself.
+            await asyncio.shield(db.execute_raw(
+                RELEASE_REMINDERS_SQL.format(placeholders=in_params(appointment_ids, 2)),
+                timestamp_param(now),
+                *appointment_ids
+            ))
+            raise
+
+    async def run(self):
+        db = get_db()  # Get the global Prisma instance
+        await self.load(db)
+        next_reload = time.monotonic() + RELOAD_INTERVAL_SECONDS
+
+        while True:
+            timeout = min(self.seconds_until_next(), next_reload - time.monotonic())
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+            due_ids = self.pop_due()
+            if due_ids:
                 try:
-                    existing = await execute_db_query(
-                        db,
-                        db.notification.find_first,
-                        where={
-                            "appointment_id": appt.appointment_id,
-                            "type": NotificationType.Appointment.name
-                        }
-                    )
-                    if existing:
-                        continue
-
-                    # Document processing logic...
-                    docs_list = []
-                    if appt.service.required_documents:
-                        try:
-                            docs_list = json.loads(appt.service.required_documents) \
-                                if isinstance(appt.service.required_documents, str) \
-                                else appt.service.required_documents
-                        except json.JSONDecodeError:
-                            docs_list = [str(appt.service.required_documents)]
-
-                    location = appt.service.locations[0].address if appt.service.locations else "TBD"
-                    
-                    await execute_db_query(
-                        db,
-                        create_notification,
-                        db,
-                        NotificationCreate(
-                            message=(
-                                f"Reminder: Your appointment for {appt.service.name} is tomorrow at "
-                                f"{appt.appointment_datetime.strftime('%H:%M')}. "
-                                f"Location: {location}. "
-                                f"Required documents: {', '.join(docs_list) if docs_list else 'None'}"
-                            ),
-                            priority=NotificationPriority.Medium.name,
-                            type=NotificationType.Appointment.name,
-                            citizen_id=appt.citizen_id,
-                            appointment_id=appt.appointment_id
-                        )
-                    )
-                    
+                    await self.send(db, due_ids)
                 except Exception as e:
-                    logger.error(f"Failed to process appointment {appt.appointment_id}: {str(e)}")
-                    continue
+                    logger.error(f"Failed to send {len(due_ids)} reminders: {str(e)}")
 
-        except Exception as e:
-            logger.error(f"Error in reminder worker: {str(e)}")
-        finally:
-            await asyncio.sleep(CHECK_INTERVAL_SECONDS)
\ No newline at end of file
+            if time.monotonic() >= next_reload:
+                await self.load(db)
+                next_reload = time.monotonic() + RELOAD_INTERVAL_SECONDS
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+async def appointment_reminder_worker():
+    """Background worker to send appointment reminders."""
+    await reminder_scheduler.run()
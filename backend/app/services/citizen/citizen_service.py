@@ -1,8 +1,15 @@
 from app.schemas.citizen.filled_form_schema import FilledFormCreate
 from app.schemas.citizen.appointment_schema import AppointmentBookingRequest
 from app.core.database import db
+from app.db.admin.db_rollup import record_appointment_created
+from app.db.citizen import db_timeslot
+from app.db.citizen.db_timeslot import SlotUnavailableError
+from app.db.repositories.appointment_events import create_appointment_with_event
+from app.utils.cursor import decode_datetime_cursor, encode_cursor
 from prisma.enums import AppointmentStatus
-from datetime import datetime
+from prisma.errors import UniqueViolationError
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
 import requests
 from PyPDF2 import PdfReader, PdfWriter
 from PyPDF2.generic import NameObject, BooleanObject
@@ -13,6 +20,10 @@ import tempfile
 
 from app.core.supabase_client import supabase
 
+SLOT_WINDOW_DAYS = 90  # Default date range of the slots endpoint
+SLOT_PAGE_SIZE = 100  # Page size once a client pages with a cursor
+MAX_SLOT_PAGE_SIZE = 500
+
 async def get_form_template(form_id: str):
     form = await db.formtemplate.find_unique(where={"form_id": form_id})
     if not form:
@@ -124,56 +135,97 @@ async def create_filled_form(filled_form: FilledFormCreate):
     return new_filled.filled_form_id
 
 
-async def get_available_slots(service_id: str, location_id: str):
-    # Query TimeSlot table and fetch officer details using assigned_admin_id
-    slots = await db.timeslot.find_many(
-        where={"location_id": location_id, "service_id": service_id},
-        order={"slot_datetime": "asc"}
+def _slot_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+async def get_available_slots(
+    service_id: str,
+    location_id: str,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Future slots with free capacity from from_date through to_date (default: the next
+    SLOT_WINDOW_DAYS days). Without limit or cursor the whole range is returned, as
+    clients that do not page expect; otherwise one page of at most limit slots, with
+    next_cursor None on the last page.
+    """
+    after = decode_datetime_cursor(cursor)  # ValueError for a malformed cursor
+    if limit is None and after is not None:
+        limit = SLOT_PAGE_SIZE
+    now = datetime.now(timezone.utc)
+    start = now
+    if from_date:
+        start = max(now, datetime.combine(from_date, time.min, tzinfo=timezone.utc))
+    end = (
+        datetime.combine(to_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        if to_date
+        else now + timedelta(days=SLOT_WINDOW_DAYS)
+    )
+
+    # One extra row tells whether there is a next page
+    rows = await db_timeslot.get_available_slots(
+        db, service_id, location_id, start, end, limit + 1 if limit else None, after
     )
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+
     result = []
-    for slot in slots:
-        appointment_ids = slot.appointment_ids if hasattr(slot, "appointment_ids") and slot.appointment_ids else []
-        if len(appointment_ids) < slot.max_appointments:
-            officer = None
-            if slot.assigned_admin_id:
-                admin = await db.admin.find_unique(where={"admin_id": slot.assigned_admin_id})
-                if admin:
-                    officer = {"id": admin.admin_id, "name": admin.full_name}
-            result.append({
-                "slot_id": slot.timeslot_id,
-                "date": slot.slot_datetime.strftime("%Y-%m-%d"),
-                "time": slot.slot_datetime.strftime("%H:%M:%S"),
-                "available": True,
-                "officer": officer
-            })
-    return result
+    for row in rows:
+        slot_datetime = _slot_datetime(row["slot_datetime"])
+        officer = None
+        if row["assigned_admin_id"] and row["officer_name"] is not None:
+            officer = {"id": row["assigned_admin_id"], "name": row["officer_name"]}
+        result.append({
+            "slot_id": row["timeslot_id"],
+            "date": slot_datetime.strftime("%Y-%m-%d"),
+            "time": slot_datetime.strftime("%H:%M:%S"),
+            "available": True,
+            "officer": officer
+        })
+
+    next_cursor = encode_cursor(rows[-1]["slot_datetime"], rows[-1]["timeslot_id"]) if has_more else None
+    return {"slots": result, "next_cursor": next_cursor}
 
 async def book_appointment(booking_request: AppointmentBookingRequest):
-    # Save appointment and documents
+    # A retried request returns what its first attempt booked
+    if booking_request.idempotency_key:
+        existing = await find_booking(booking_request)
+        if existing:
+            return await booking_response(existing)
+
     # Fetch slot to get slot_datetime and assigned_admin_id
     slot = await db.timeslot.find_unique(where={"timeslot_id": booking_request.slot_id})
-    slot_datetime = getattr(slot, "slot_datetime", datetime.now()) if slot else datetime.now()
-    assigned_admin_id = getattr(slot, "assigned_admin_id", None) if slot else None
+    if not slot:
+        raise SlotUnavailableError("Time slot not found")
     reference_number = str(uuid.uuid4()).replace('-', '')[:10]  # Generate unique reference number
-    appointment = await db.appointment.create(
-        data={
-            "appointment_datetime": slot_datetime,
-            "service_id": booking_request.service_id,
-            "timeSlotTimeslot_id": booking_request.slot_id,
-            "citizen_id": booking_request.citizen_id,
-            "status": AppointmentStatus.Booked,
-            "reference_number": reference_number,
-            "assigned_admin_id": assigned_admin_id
-        }
-    )
-    # Update TimeSlot.appointment_ids
-    if slot:
-        appointment_ids = getattr(slot, "appointment_ids", [])
-        appointment_ids.append(appointment.appointment_id)
-        await db.timeslot.update(
-            where={"timeslot_id": booking_request.slot_id},
-            data={"appointment_ids": appointment_ids}
+    try:
+        # Takes a place in the slot and creates the appointment atomically
+        appointment = await create_appointment_with_event(
+            db,
+            data={
+                "appointment_datetime": slot.slot_datetime,
+                "service_id": booking_request.service_id,
+                "timeSlotTimeslot_id": booking_request.slot_id,
+                "citizen_id": booking_request.citizen_id,
+                "status": AppointmentStatus.Booked,
+                "reference_number": reference_number,
+                "assigned_admin_id": slot.assigned_admin_id,
+                "idempotency_key": booking_request.idempotency_key
+            },
+            not_before=datetime.now(timezone.utc)
         )
+    except UniqueViolationError:
+        # A concurrent retry with the same key won; its slot reservation stands, ours rolled back
+        existing = await find_booking(booking_request) if booking_request.idempotency_key else None
+        if not existing:
+            raise
+        return await booking_response(existing)
+    await record_appointment_created(db, appointment)
 
     # Upload files to Supabase bucket using appointment_id as folder name
     from app.core.supabase_client import supabase
@@ -196,10 +248,21 @@ async def book_appointment(booking_request: AppointmentBookingRequest):
             }
         )
 
-    service = await db.service.find_unique(where={"service_id": booking_request.service_id}, include={"department": True})
+    return await booking_response(appointment)
+
+async def find_booking(booking_request: AppointmentBookingRequest):
+    return await db.appointment.find_first(
+        where={
+            "citizen_id": booking_request.citizen_id,
+            "idempotency_key": booking_request.idempotency_key
+        }
+    )
+
+async def booking_response(appointment):
+    service = await db.service.find_unique(where={"service_id": appointment.service_id}, include={"department": True})
     return {
         "appointment_id": appointment.appointment_id,
-        "reference_number": reference_number,
+        "reference_number": appointment.reference_number,
         "service": {
             "name": service.name if service else "",
             "department": service.department.name if service and service.department else ""
@@ -1,88 +1,140 @@
 # backend/app/services/citizen/document_expiry_monitor.py
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
 from prisma import Prisma
 from app.core.database import get_db
-from app.services.citizen.notification_repository import create_notification
+from app.utils.sql_params import cursor_timestamp, in_params, timestamp_param
+from app.services.citizen.notification_repository import create_notifications
 from app.schemas.citizen.notification import NotificationCreate
 from prisma.enums import NotificationType, NotificationPriority
 import logging
 
 logger = logging.getLogger(__name__)
 CHECK_INTERVAL_HOURS = 6  # Check every 6 hours
+RETRY_SECONDS = 3600  # Wait 1 hour on error
+THRESHOLD_DAYS = [1, 7, 30]  # Notify this many days before expiry
+BATCH_SIZE = 500
 
-async def document_expiry_monitor():
-    """Monitors document expiry and sends notifications"""
+# Documents expiring within one threshold's day-long window that have no notice for it
+# yet, walked in (expiry_date, document_id) order over the matching index.
+DUE_DOCUMENTS_SQL = """
+SELECT d.document_id, d.document_type::text AS document_type, d.expiry_date, d.citizen_id
+FROM "DigitalVaultDocument" d
+WHERE d.expiry_date >= $1::timestamp
+  AND d.expiry_date < $2::timestamp
+  AND ($4::timestamp IS NULL OR (d.expiry_date, d.document_id) > ($4::timestamp, $5))
+  AND NOT EXISTS (
+      SELECT 1 FROM "DocumentExpiryNotice" n
+      WHERE n.document_id = d.document_id AND n.threshold_days = $3
+  )
+ORDER BY d.expiry_date, d.document_id
+LIMIT $6
+"""
+
+# Records notices; rows that already exist (another process got there first) are skipped
+CLAIM_NOTICES_SQL = """
+INSERT INTO "DocumentExpiryNotice" (document_id, threshold_days, sent_at)
+SELECT unnest(ARRAY[{placeholders}]::text[]), $1, $2::timestamp
+ON CONFLICT DO NOTHING
+RETURNING document_id
+"""
+
+# Only this claim's notices (same sent_at) are released, never another process's
+RELEASE_NOTICES_SQL = """
+DELETE FROM "DocumentExpiryNotice"
+WHERE threshold_days = $1 AND sent_at = $2::timestamp AND document_id IN ({placeholders})
+"""
+
+
+async def run_document_expiry_sweep():
+    """Sends the document expiry notifications that are due"""
     db: Prisma = get_db()
-    
-    while True:
-        try:
-            now = datetime.now()
-            
-            # Documents expiring soon
-            documents = await db.digitalvaultdocument.find_many(
-                where={
-                    "expiry_date": {
-                        "not": None,
-                        "gt": now  # Only future expiry dates
-                    }
-                },
-                include={
-                    "citizen": True
-                }
+
+    sent = await sweep_expiring_documents(db, datetime.now(timezone.utc))
+    if sent:
+        logger.info(f"Sent {sent} document expiry notifications")
+
+async def sweep_expiring_documents(db: Prisma, current_time: datetime) -> int:
+    """Notify every document entering a threshold window; returns the number notified"""
+    sent = 0
+    for days_remaining in THRESHOLD_DAYS:
+        window_start = current_time + timedelta(days=days_remaining)
+        window_end = window_start + timedelta(days=1)
+        after, after_id = None, ""
+
+        while True:
+            documents = await db.query_raw(
+                DUE_DOCUMENTS_SQL,
+                timestamp_param(window_start),
+                timestamp_param(window_end),
+                days_remaining,
+                after,
+                after_id,
+                BATCH_SIZE
             )
-            
-            for doc in documents:
-                await check_and_notify(db, doc, now)
-            
-            await asyncio.sleep(CHECK_INTERVAL_HOURS * 3600)
-            
-        except Exception as e:
-            logger.error(f"Document monitor error: {str(e)}")
-            await asyncio.sleep(3600)  # Wait 1 hour on error
-
-async def check_and_notify(db: Prisma, document, current_time: datetime):
-    """Check if notification should be sent and trigger it"""
-    if not document.expiry_date:
-        return
-    
-    days_remaining = (document.expiry_date - current_time).days
-    
-    # Notification thresholds (30, 7, and 1 days before expiry)
-    if days_remaining not in [1, 7, 30]:
-        return
-    
-    # Check if notification already sent for this threshold
-    existing = await db.notification.find_first(
-        where={
-            "document_id": document.document_id,
-            "type": "DocumentExpiry",
-            "message": {"contains": f"expire in {days_remaining} days"}
-        }
-    )
-    if existing:
-        return
-    
-    await send_expiry_notification(db, document, days_remaining)
+            if not documents:
+                break
+
+            sent += await notify_batch(db, documents, days_remaining)
+            if len(documents) < BATCH_SIZE:
+                break
+            after, after_id = cursor_timestamp(documents[-1]["expiry_date"]), documents[-1]["document_id"]
+
+    return sent
+
+async def notify_batch(db: Prisma, documents: List[Dict[str, Any]], days_remaining: int) -> int:
+    """Record the notices for a batch of documents and send the ones this process claimed"""
+    document_ids = [document["document_id"] for document in documents]
+    now = datetime.now(timezone.utc)
+    claimed_at = timestamp_param(now.replace(microsecond=now.microsecond // 1000 * 1000))  # As stored
+    try:
+        claimed = await db.query_raw(
+            CLAIM_NOTICES_SQL.format(placeholders=in_params(document_ids, 3)),
+            days_remaining,
+            claimed_at,
+            *document_ids
+        )
+        claimed_ids = {row["document_id"] for row in claimed}
+        if not claimed_ids:
+            return 0
+
+        await create_notifications(db, [
+            expiry_notification(document, days_remaining)
+            for document in documents if document["document_id"] in claimed_ids
+        ])
+    except BaseException:
+        # Release the notices so the next sweep retries them, also when the sweep is
+        # cancelled (leader lease lost, shutdown) after the claim committed
+        await asyncio.shield(db.execute_raw(
+            RELEASE_NOTICES_SQL.format(placeholders=in_params(document_ids, 3)),
+            days_remaining,
+            claimed_at,
+            *document_ids
+        ))
+        raise
+    return len(claimed_ids)
+
+def expiry_notification(document: Dict[str, Any], days_remaining: int) -> NotificationCreate:
+    """Expiry notification for a document row from DUE_DOCUMENTS_SQL"""
+    expiry_date = document["expiry_date"]
+    if not isinstance(expiry_date, datetime):
+        expiry_date = datetime.fromisoformat(str(expiry_date).replace("Z", "+00:00"))
 
-async def send_expiry_notification(db: Prisma, document, days_remaining: int):
-    """Create and send expiry notification"""
     message = (
-        f"Your {document.document_type.lower()} is going to expire "
-        f"on {document.expiry_date.strftime('%Y-%m-%d')} "
+        f"Your {document['document_type'].lower()} is going to expire "
+        f"on {expiry_date.strftime('%Y-%m-%d')} "
         f"(in {days_remaining} days). Kindly renew your document."
     )
-    
-    notification_data = NotificationCreate(
+
+    return NotificationCreate(
         message=message,
         priority=(
-            NotificationPriority.High if days_remaining <= 7 
+            NotificationPriority.High if days_remaining <= 7
             else NotificationPriority.Medium
         ),
         type=NotificationType.DocumentExpiry,
-        citizen_id=document.citizen_id,
-        document_id=document.document_id,
+        citizen_id=document["citizen_id"],
+        document_id=document["document_id"],
         appointment_id=None  # Explicitly set to None
     )
-    
-    await create_notification(db, notification_data)
\ No newline at end of file
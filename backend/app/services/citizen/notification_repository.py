@@ -1,57 +1,209 @@
 # backend/app/db/repositories/notification_repository.py
 from prisma import Prisma
 from app.core.database import get_db
-from app.core.websocket_manager import websocket_manager
-from app.core.email_service import send_notification_email
+from app.core.notification_pubsub import notification_bus
+from app.core.config import settings
+from app.core.email_service import render_notification_digests, render_notification_email
+from app.db.repositories.email_outbox import enqueue_emails, outbox_row
 from app.schemas.citizen.notification import NotificationCreate
-from typing import Optional, List, Any
+from app.utils.ids import cuid
+from prisma.models import Notification
+from datetime import datetime, timezone
+from typing import Optional, List, Any, Dict, Tuple
+import logging
+
+BULK_CHUNK_SIZE = 1000  # Rows per create_many and ids per IN query
+
+logger = logging.getLogger(__name__)
+
+# Per-process delivery counters. Coalescing happens per create_notifications call: the
+# workers hand over a whole claimed batch, which is stored with its emails in one
+# transaction, so nothing waits in memory where a crash could lose it after the claim.
+delivery_stats = {
+    "notifications": 0,
+    "citizens": 0,
+    "digest_emails": 0,
+    "single_emails": 0,
+    "batch_messages": 0,
+}
+
+
+def get_delivery_stats() -> Dict[str, int]:
+    return dict(delivery_stats)
 # backend/app/services/citizen/notification_repository.py
-async def create_notification(db: Prisma, notification_data: NotificationCreate) -> Optional[Any]:
-    """Create a new notification with type-specific handling"""
-    notification = await db.notification.create({
-        "message": notification_data.message,
-        "priority": notification_data.priority,
-        "type": notification_data.type,
-        "citizen_id": notification_data.citizen_id,
-        "appointment_id": notification_data.appointment_id,
-        "document_id": notification_data.document_id
-    })
-
-    citizen = await db.citizen.find_unique(where={"citizen_id": notification_data.citizen_id})
-    if not citizen:
-        return notification
-
-    # WebSocket notification
-    await websocket_manager.send_personal_message({
+def notification_payload(notification) -> dict:
+    """WebSocket message for one notification"""
+    return {
         "notification_id": notification.notification_id,
         "message": notification.message,
         "type": notification.type,
         "is_read": notification.is_read,
         "created_at": notification.created_at.isoformat(),
         "citizen_id": notification.citizen_id
-    }, notification_data.citizen_id)
+    }
 
-    # Email notification
-    appointment = None
-    if notification_data.appointment_id:
-        appointment = await db.appointment.find_unique(
-            where={"appointment_id": notification_data.appointment_id},
-            include={"service": True}
+
+async def create_notification(db: Prisma, notification_data: NotificationCreate) -> Optional[Any]:
+    """Create a single notification and deliver it right away"""
+    notifications = await create_notifications(db, [notification_data])
+    return notifications[0]
+
+
+def chunked(items: List[Any], size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def find_by_ids(model, id_field: str, ids, **kwargs) -> Dict[str, Any]:
+    """Fetch records by id with one IN query per chunk, keyed by id"""
+    records = {}
+    for chunk in chunked(list(ids)):
+        for record in await model.find_many(where={id_field: {"in": chunk}}, **kwargs):
+            records[getattr(record, id_field)] = record
+    return records
+
+
+def render_digests(groups: List[List[Any]]) -> List[Tuple[List[Any], str, str]]:
+    """Render the digests as one batch, falling back to one at a time so a bad group only loses its own email"""
+    try:
+        return [(group, *rendered) for group, rendered in zip(groups, render_notification_digests(groups))]
+    except Exception as e:
+        logger.warning(f"Digest batch render failed, rendering one at a time: {str(e)}")
+
+    digests = []
+    for group in groups:
+        try:
+            email_subject, body = render_notification_digests([group])[0]
+        except Exception as e:
+            logger.error(f"Could not render the digest email for citizen {group[0].citizen_id}: {str(e)}")
+            continue
+        digests.append((group, email_subject, body))
+    return digests
+
+
+async def create_notifications(db: Prisma, batch: List[NotificationCreate]) -> List[Any]:
+    """
+    Create a batch of notifications with a handful of queries and deliver them per citizen.
+
+    Citizens, appointments and documents for the whole batch are loaded with IN queries,
+    the Notification rows and their outbox emails are inserted with create_many in one
+    transaction, and each citizen then gets one email (a digest when they have several
+    notifications) and one WebSocket message (a notification_batch when they have several).
+    """
+    if not batch:
+        return []
+
+    created_at = datetime.now(timezone.utc)
+    notifications = [
+        Notification(
+            notification_id=cuid(),  # Known before create_many, for the outbox link and WebSocket payload
+            message=notification_data.message,
+            priority=notification_data.priority,
+            type=notification_data.type,
+            is_read=False,
+            created_at=created_at,
+            citizen_id=notification_data.citizen_id,
+            appointment_id=notification_data.appointment_id,
+            document_id=notification_data.document_id
         )
+        for notification_data in batch
+    ]
+
+    by_citizen: Dict[str, List[Any]] = {}
+    for notification in notifications:
+        by_citizen.setdefault(notification.citizen_id, []).append(notification)
 
-    email_subject = f"Gov-Portal Notification: {notification.type}"
-    if notification.type == "AppointmentStatusChange" and appointment:
-        email_subject = f"Appointment Status Update: {appointment.status}"
+    citizens = await find_by_ids(db.citizen, "citizen_id", by_citizen.keys())
 
-    await send_notification_email(
-        email=citizen.email,
-        subject=email_subject,
-        message=notification.message,
-        notification_type=notification.type,
-        appointment=appointment
+    # Single notifications keep their type-specific email, which needs the appointment or document
+    singles = [
+        group[0] for citizen_id, group in by_citizen.items()
+        if len(group) == 1 and citizen_id in citizens
+    ] if settings.EMAIL_ENABLED else []
+    appointments = await find_by_ids(
+        db.appointment, "appointment_id",
+        {n.appointment_id for n in singles if n.appointment_id},
+        include={"service": True}
+    )
+    documents = await find_by_ids(
+        db.digitalvaultdocument, "document_id",
+        {n.document_id for n in singles if n.document_id}
     )
 
-    return notification
+    # Email notification
+    emails = []
+    single_emails = 0
+    if settings.EMAIL_ENABLED:
+        for notification in singles:
+            appointment = appointments.get(notification.appointment_id)
+            email_subject = f"Gov-Portal Notification: {notification.type}"
+            if notification.type == "AppointmentStatusChange" and appointment:
+                email_subject = f"Appointment Status Update: {appointment.status}"
+
+            try:
+                body = render_notification_email(
+                    subject=email_subject,
+                    message=notification.message,
+                    notification_type=notification.type,
+                    appointment=appointment,
+                    document=documents.get(notification.document_id)
+                )
+            except Exception as e:
+                # The notification is still stored and pushed; only its email is lost
+                logger.error(f"Could not render the email for notification {notification.notification_id}: {str(e)}")
+                continue
+            emails.append(outbox_row(
+                citizens[notification.citizen_id].email,
+                email_subject,
+                body,
+                notification_id=notification.notification_id
+            ))
+
+        single_emails = len(emails)
+        digest_groups = [
+            group for citizen_id, group in by_citizen.items()
+            if len(group) > 1 and citizen_id in citizens
+        ]
+        for group, email_subject, body in render_digests(digest_groups):
+            emails.append(outbox_row(citizens[group[0].citizen_id].email, email_subject, body))
+
+    async with db.tx() as transaction:
+        for chunk in chunked(notifications):
+            await transaction.notification.create_many(data=[
+                {
+                    "notification_id": n.notification_id,
+                    "message": n.message,
+                    "priority": n.priority,
+                    "type": n.type,
+                    "created_at": n.created_at,
+                    "citizen_id": n.citizen_id,
+                    "appointment_id": n.appointment_id,
+                    "document_id": n.document_id
+                }
+                for n in chunk
+            ])
+        for chunk in chunked(emails):
+            await enqueue_emails(transaction, chunk)
+
+    delivery_stats["notifications"] += len(notifications)
+    delivery_stats["citizens"] += len(by_citizen)
+    delivery_stats["single_emails"] += single_emails
+    delivery_stats["digest_emails"] += len(emails) - single_emails
+
+    # WebSocket notification, delivered by whichever worker holds the citizen's sockets
+    for citizen_id, group in by_citizen.items():
+        if citizen_id not in citizens:
+            continue
+        if len(group) == 1:
+            await notification_bus.publish(citizen_id, notification_payload(group[0]))
+        else:
+            delivery_stats["batch_messages"] += 1
+            await notification_bus.publish(citizen_id, {
+                "type": "notification_batch",
+                "notifications": [notification_payload(n) for n in group]
+            })
+
+    return notifications
 
 async def mark_notification_as_read(db: Prisma, notification_id: str) -> Optional[Any]:
     """Mark a notification as read"""
@@ -4,8 +4,9 @@ from datetime import datetime
 from typing import List, Dict
 from dataclasses import dataclass
 
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import get_knowledge_base_service
 from app.db.repositories.web_monitor import WebMonitorRepository
+from app.utils.kb_metadata import build_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +21,7 @@ class ContentChange:
 
 class DocumentProcessor:
     def __init__(self):
-        self.kb_service = KnowledgeBaseService()
+        self.kb_service = get_knowledge_base_service()
         self.repo = WebMonitorRepository()
     
     async def process_content_change(self, change: ContentChange):
@@ -79,15 +80,15 @@ class DocumentProcessor:
                     for i, chunk in enumerate(chunks):
                         doc_id = f"webpage_{hashlib.sha256(f'{change.url}_{i}'.encode()).hexdigest()}"
                         
-                        metadata = {
-                            "url": change.url,
-                            "source_type": "government_website",
-                            "last_updated": change.timestamp.isoformat(),
-                            "content_type": "webpage",
-                            "chunk_index": i,
-                            "total_chunks": len(chunks),
-                            "change_type": change.change_type
-                        }
+                        metadata = build_metadata(
+                            url=change.url,
+                            content_type="webpage",
+                            text=chunk,
+                            last_updated=change.timestamp.isoformat(),
+                            chunk_index=i,
+                            total_chunks=len(chunks),
+                            change_type=change.change_type
+                        )
                         
                         documents.append(chunk)
                         metadatas.append(metadata)
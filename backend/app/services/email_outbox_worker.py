@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from prisma import Prisma
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.email_service import SMTPConnectionPool, build_message, is_permanent_failure
+from app.db.repositories.email_outbox import (
+    claim_emails,
+    get_email_status_counts,
+    mark_emails_sent,
+    reschedule_email,
+)
+
+logger = logging.getLogger(__name__)
+
+SEND_LEASE_SECONDS = 300  # A claimed batch not finished by then is picked up again
+
+
+class RateLimiter:
+    """Token bucket allowing rate_per_minute acquisitions, with bursts up to one second's worth"""
+
+    def __init__(self, rate_per_minute: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.updated_at = time.monotonic()
+                self.tokens = 1
+            self.tokens -= 1
+
+
+class EmailOutboxSender:
+    """Drains EmailOutbox in batches over a pool of persistent SMTP connections"""
+
+    def __init__(self):
+        self.pool = SMTPConnectionPool(settings.EMAIL_SMTP_POOL_SIZE)
+        self.rate_limiter = RateLimiter(settings.EMAIL_RATE_PER_MINUTE)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff after the given number of attempts"""
+        return min(
+            settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            settings.EMAIL_RETRY_MAX_SECONDS,
+        )
+
+    async def _send_one(self, db: Prisma, email: Dict[str, Any]) -> bool:
+        await self.rate_limiter.acquire()
+        try:
+            await self.pool.send(build_message(email["to_email"], email["subject"], email["body"]))
+            return True
+        except Exception as e:
+            error = str(e)[:500]
+            if is_permanent_failure(e) or email["attempts"] >= settings.EMAIL_MAX_ATTEMPTS:
+                self.failed += 1
+                logger.error(f"Giving up on email {email['email_id']} to {email['to_email']}: {error}")
+                await reschedule_email(db, email["email_id"], error, None)
+            else:
+                self.retried += 1
+                logger.warning(f"Email {email['email_id']} failed (attempt {email['attempts']}), retrying: {error}")
+                await reschedule_email(db, email["email_id"], error, self.retry_delay(email["attempts"]))
+            return False
+
+    async def send_batch(self, db: Prisma) -> int:
+        """Claim and send one batch; returns the number of emails claimed"""
+        emails = await claim_emails(db, settings.EMAIL_BATCH_SIZE, SEND_LEASE_SECONDS)
+        if not emails:
+            return 0
+
+        # Sends run concurrently, bounded by the SMTP pool size and the rate limiter
+        results = await asyncio.gather(*(self._send_one(db, email) for email in emails))
+        sent_ids: List[str] = [email["email_id"] for email, ok in zip(emails, results) if ok]
+        await mark_emails_sent(db, sent_ids)
+        self.sent += len(sent_ids)
+        return len(emails)
+
+    async def get_stats(self, db: Prisma) -> Dict[str, Any]:
+        return {
+            "outbox": await get_email_status_counts(db),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+email_sender = EmailOutboxSender()
+
+
+async def email_outbox_worker():
+    """Sends queued emails; polls while the outbox is empty"""
+    db: Prisma = get_db()
+
+    try:
+        while True:
+            try:
+                claimed = await email_sender.send_batch(db)
+                if claimed < settings.EMAIL_BATCH_SIZE:
+                    await asyncio.sleep(settings.EMAIL_POLL_INTERVAL_SECONDS)
+
+            except Exception as e:
+                logger.error(f"Email outbox error: {str(e)}")
+                await asyncio.sleep(30)  # Wait longer on error
+    finally:
+        await email_sender.pool.close()
@@ -1,43 +1,167 @@
 # Update: backend/app/services/knowledge_base.py
+import asyncio
 import chromadb
 import datetime
 import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 
 from app.core.config import get_settings
 from app.utils.embeddings import SentenceTransformerEmbeddings  # Fix import path
+from app.utils.kb_metadata import METADATA_SCHEMA_VERSION, build_metadata, normalize_metadata
 
 logger = logging.getLogger(__name__)
 
+# Active collection pointer, written atomically when a rebuilt version is swapped in
+ACTIVE_COLLECTION_FILE = "active_collection.json"
+COLLECTION_VERSION_PATTERN = re.compile(r"^(?P<base>.+)_v(?P<version>\d+)$")
+
+
+def split_collection_version(name: str) -> Tuple[str, int]:
+    """Split 'government_services_v3' into ('government_services', 3)"""
+    match = COLLECTION_VERSION_PATTERN.match(name)
+    if not match:
+        return name, 0
+    return match.group("base"), int(match.group("version"))
+
+
+def build_collection_metadata(settings, search_ef: Optional[int] = None) -> Dict[str, Any]:
+    """HNSW and embedding settings recorded on every collection version"""
+    return {
+        "hnsw:space": settings.CHROMADB_HNSW_SPACE,
+        "hnsw:M": settings.CHROMADB_HNSW_M,
+        "hnsw:construction_ef": settings.CHROMADB_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": search_ef or settings.CHROMADB_HNSW_SEARCH_EF,
+        "hnsw:num_threads": settings.CHROMADB_HNSW_NUM_THREADS,
+        "embedding_model": settings.CHROMADB_EMBEDDING_MODEL,
+        "metadata_schema": METADATA_SCHEMA_VERSION,
+    }
+
+
+def collection_search_ef(collection) -> Optional[int]:
+    """
+    ef_search a collection queries with. set_search_ef changes the collection
+    configuration, not the metadata it was created with, so the configuration wins.
+    """
+    try:
+        hnsw = (collection.configuration or {}).get("hnsw") or {}
+    except Exception:
+        hnsw = {}
+    if hnsw.get("ef_search"):
+        return hnsw["ef_search"]
+    return (collection.metadata or {}).get("hnsw:search_ef")
+
+
 class KnowledgeBaseService:
     def __init__(self):
         try:
-            settings = get_settings()
+            self.settings = get_settings()
             
             # Initialize ChromaDB client with persistent storage
-            self.client = chromadb.PersistentClient(path="/tmp/chroma_storage")
+            self.client = chromadb.PersistentClient(path=self.settings.CHROMADB_STORAGE_PATH)
             
             # Use Sentence Transformers for embeddings
             self.embedding_function = SentenceTransformerEmbeddings(
-                model_name="paraphrase-multilingual-MiniLM-L12-v2"
+                model_name=self.settings.CHROMADB_EMBEDDING_MODEL
             )
+
+            self._pointer_path = Path(self.settings.CHROMADB_STORAGE_PATH) / ACTIVE_COLLECTION_FILE
+            self._pointer_mtime: Optional[float] = None
+            self._rebuild_lock = threading.Lock()
+            self._rebuild_target = None
+            self.rebuild_status: Dict[str, Any] = {"state": "idle"}
+            self._unfiltered_collections = set()
             
-            # Create or get collection with metadata
-            self.collection = self.client.get_or_create_collection(
-                name=settings.CHROMADB_COLLECTION_NAME,
-                embedding_function=self.embedding_function,
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Open whichever collection version is currently active
+            self.collection = self._open_collection(self._read_active_collection_name())
             
-            logger.info(f"ChromaDB collection '{settings.CHROMADB_COLLECTION_NAME}' initialized successfully")
+            logger.info(f"ChromaDB collection '{self.collection.name}' initialized successfully")
             
         except Exception as e:
             logger.error(f"Failed to initialize KnowledgeBaseService: {str(e)}")
             raise RuntimeError(f"ChromaDB initialization failed: {str(e)}")
+
+    def _open_collection(self, name: str):
+        # Existing collections keep their own metadata, which tells whether they can be filtered
+        try:
+            return self.client.get_collection(name=name, embedding_function=self.embedding_function)
+        except Exception:
+            return self.client.create_collection(
+                name=name,
+                embedding_function=self.embedding_function,
+                metadata=build_collection_metadata(self.settings)
+            )
+
+    def _filterable(self, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        where, or None on a collection built before chunks carried the filter fields:
+        a scoped query there finds nothing and only costs a round trip before the fallback.
+        """
+        if not where:
+            return None
+        if (self.collection.metadata or {}).get("metadata_schema", 0) >= METADATA_SCHEMA_VERSION:
+            return where
+        if self.collection.name not in self._unfiltered_collections:
+            self._unfiltered_collections.add(self.collection.name)
+            logger.warning(
+                f"Collection '{self.collection.name}' predates the filter metadata; searching it "
+                f"unscoped until it is rebuilt"
+            )
+        return None
+
+    def _read_active_collection_name(self) -> str:
+        """Name from the active-collection pointer, falling back to CHROMADB_COLLECTION_NAME"""
+        try:
+            self._pointer_mtime = self._pointer_path.stat().st_mtime
+            with open(self._pointer_path, "r", encoding="utf-8") as f:
+                return json.load(f)["collection"]
+        except FileNotFoundError:
+            self._pointer_mtime = None
+            return self.settings.CHROMADB_COLLECTION_NAME
+        except Exception as e:
+            logger.error(f"Unreadable active collection pointer, using default: {str(e)}")
+            return self.settings.CHROMADB_COLLECTION_NAME
+
+    def _sync_active_collection(self):
+        """Pick up a swap made by another process (e.g. ChromaDataLoader); one stat() per call"""
+        try:
+            mtime = self._pointer_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._pointer_mtime:
+            name = self._read_active_collection_name()
+            if name != self.collection.name:
+                self.collection = self._open_collection(name)
+                logger.info(f"Switched to active collection '{name}'")
+
+    def _activate_collection(self, collection):
+        """Atomically point every reader at collection"""
+        self._pointer_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._pointer_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "collection": collection.name,
+                "activated_at": datetime.datetime.now().isoformat()
+            }, f)
+        os.replace(tmp_path, self._pointer_path)
+        self._pointer_mtime = self._pointer_path.stat().st_mtime
+
+        # Reference swap: in-flight queries finish on the old collection object
+        self.collection = collection
     
-    async def search(self, query: str, limit: int = 5):
-        """Search government services using natural language with error handling"""
+    async def search(self, query: str, limit: int = 5, where: Optional[Dict[str, Any]] = None):
+        """
+        Search government services using natural language with error handling.
+        where is a Chroma metadata filter (see app.utils.kb_metadata.build_where); a scoped
+        search that finds nothing falls back to searching the whole collection.
+        """
         try:
             if not query or not query.strip():
                 logger.warning("Empty query provided")
@@ -48,10 +172,20 @@ class KnowledgeBaseService:
             elif limit > 100:
                 limit = 100
                 
+            self._sync_active_collection()
+            where = self._filterable(where)
             results = self.collection.query(
                 query_texts=[query],
-                n_results=limit
+                n_results=limit,
+                where=where
             )
+
+            if where and (not results or not results.get('documents') or not results['documents'][0]):
+                logger.info(f"No results in scope {where}, searching the whole collection")
+                results = self.collection.query(
+                    query_texts=[query],
+                    n_results=limit
+                )
             
             if not results or not results.get('documents') or not results['documents'][0]:
                 logger.warning(f"No results found for query: {query}")
@@ -63,7 +197,65 @@ class KnowledgeBaseService:
         except Exception as e:
             logger.error(f"Error in ChromaDB search for query '{query[:50]}': {str(e)}")
             return {'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
-    
+
+    async def search_many(self, queries: List[str], limit: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, List]]:
+        """Search several queries at once; returns one search()-shaped result per query, in order"""
+        results_per_query = [
+            {'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+            for _ in queries
+        ]
+
+        # Empty queries keep their slot but are not sent to ChromaDB
+        positions = [i for i, query in enumerate(queries) if query and query.strip()]
+        if not positions:
+            logger.warning("No non-empty queries provided for batch search")
+            return results_per_query
+
+        if limit <= 0:
+            limit = 5
+        elif limit > 100:
+            limit = 100
+
+        try:
+            self._sync_active_collection()
+            where = self._filterable(where)
+
+            # One multi-query call: the embedding function encodes every query text in a
+            # single model call and the index is searched for all of them together
+            results = self.collection.query(
+                query_texts=[queries[i] for i in positions],
+                n_results=limit,
+                where=where
+            )
+
+            for batch_idx, query_idx in enumerate(positions):
+                results_per_query[query_idx] = {
+                    'documents': [results['documents'][batch_idx]],
+                    'metadatas': [results['metadatas'][batch_idx]],
+                    'distances': [results['distances'][batch_idx]]
+                }
+
+            # Same fallback as search(): queries with nothing in scope search the whole collection
+            unmatched = [i for i in positions if not results_per_query[i]['documents'][0]]
+            if where and unmatched:
+                fallback = self.collection.query(
+                    query_texts=[queries[i] for i in unmatched],
+                    n_results=limit
+                )
+                for batch_idx, query_idx in enumerate(unmatched):
+                    results_per_query[query_idx] = {
+                        'documents': [fallback['documents'][batch_idx]],
+                        'metadatas': [fallback['metadatas'][batch_idx]],
+                        'distances': [fallback['distances'][batch_idx]]
+                    }
+
+            logger.info(f"Batch search completed for {len(positions)} queries")
+            return results_per_query
+
+        except Exception as e:
+            logger.error(f"Error in ChromaDB batch search for {len(positions)} queries: {str(e)}")
+            return results_per_query
+
     async def add_documents(self, documents: List[str], metadatas: List[Dict], ids: List[str]):
         """Add new documents to knowledge base with comprehensive error handling"""
         try:
@@ -78,6 +270,7 @@ class KnowledgeBaseService:
                 metadatas=metadatas,
                 ids=ids
             )
+            self._mirror_to_rebuild_target(documents, metadatas, ids)
             
             logger.info(f"Successfully added {len(documents)} documents to knowledge base")
             return {
@@ -106,13 +299,13 @@ class KnowledgeBaseService:
             doc_id = f"webpage_{hashlib.sha256(url.encode()).hexdigest()}"
             
             # Create metadata for the document
-            metadata = {
-                "url": url,
-                "source_type": "government_website",
-                "last_updated": timestamp.isoformat(),
-                "content_type": "webpage",
-                "content_length": len(content)
-            }
+            metadata = build_metadata(
+                url=url,
+                content_type="webpage",
+                text=content,
+                last_updated=timestamp.isoformat(),
+                content_length=len(content)
+            )
             
             # Add or update the document in ChromaDB
             self.collection.upsert(
@@ -120,6 +313,7 @@ class KnowledgeBaseService:
                 metadatas=[metadata],
                 ids=[doc_id]
             )
+            self._mirror_to_rebuild_target([content], [metadata], [doc_id])
             
             logger.info(f"Successfully stored webpage content: {url} ({len(content)} chars)")
             return doc_id
@@ -131,10 +325,18 @@ class KnowledgeBaseService:
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the ChromaDB collection"""
         try:
+            self._sync_active_collection()
             count = self.collection.count()
+            _, version = split_collection_version(self.collection.name)
             return {
                 "document_count": count,
                 "collection_name": self.collection.name,
+                "collection_version": version,
+                "index_config": {
+                    **(self.collection.metadata or {}),
+                    "hnsw:search_ef": collection_search_ef(self.collection)
+                },
+                "rebuild": self.rebuild_status,
                 "status": "healthy"
             }
         except Exception as e:
@@ -145,3 +347,167 @@ class KnowledgeBaseService:
                 "status": "error",
                 "error": str(e)
             }
+
+    def set_search_ef(self, search_ef: int) -> Dict[str, Any]:
+        """Change the query-time HNSW ef of the active collection (higher = better recall, slower)"""
+        if search_ef <= 0:
+            raise ValueError("search_ef must be positive")
+        try:
+            self.collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        except Exception as e:
+            logger.error(f"Failed to update search_ef on '{self.collection.name}': {str(e)}")
+            raise RuntimeError(f"Failed to update search_ef: {str(e)}")
+
+        logger.info(f"search_ef set to {search_ef} on '{self.collection.name}'")
+        return {"collection_name": self.collection.name, "search_ef": search_ef}
+
+    def is_rebuilding(self) -> bool:
+        return self._rebuild_lock.locked()
+
+    def _mirror_to_rebuild_target(self, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        """Writes made while a rebuild is copying data must also land in the new version"""
+        target = self._rebuild_target
+        if target is None:
+            return
+        try:
+            target.upsert(documents=documents, metadatas=metadatas, ids=ids)
+        except Exception as e:
+            logger.error(f"Failed to mirror write into rebuild target '{target.name}': {str(e)}")
+
+    def _next_collection_name(self) -> str:
+        base, current_version = split_collection_version(self.collection.name)
+        versions = [current_version]
+        for collection in self.client.list_collections():
+            name = collection if isinstance(collection, str) else collection.name
+            other_base, version = split_collection_version(name)
+            if other_base == base:
+                versions.append(version)
+        return f"{base}_v{max(versions) + 1}"
+
+    def _copy_collection(self, source, target) -> int:
+        """Copy documents in batches, reusing stored embeddings when the model is unchanged"""
+        reuse_embeddings = (source.metadata or {}).get("embedding_model") == self.settings.CHROMADB_EMBEDDING_MODEL
+        include = ["documents", "metadatas", "embeddings"] if reuse_embeddings else ["documents", "metadatas"]
+        batch_size = self.settings.CHROMADB_REBUILD_BATCH_SIZE
+
+        copied = 0
+        offset = 0
+        while True:
+            batch = source.get(include=include, limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+
+            target.upsert(
+                ids=batch["ids"],
+                documents=batch["documents"],
+                # Backfill filter fields on documents indexed before they were written
+                metadatas=[
+                    normalize_metadata(metadata, document)
+                    for metadata, document in zip(batch["metadatas"], batch["documents"])
+                ],
+                embeddings=batch["embeddings"] if reuse_embeddings else None
+            )
+            copied += len(batch["ids"])
+            offset += batch_size
+            self.rebuild_status["documents"] = copied
+
+            # Throttle so the rebuild does not starve live queries of CPU
+            time.sleep(self.settings.CHROMADB_REBUILD_PAUSE_SECONDS)
+
+        return copied
+
+    def rebuild_collection(self, source: str = "collection", keep_search_ef: bool = True) -> Dict[str, Any]:
+        """
+        Build the next collection version (e.g. government_services_v2 -> _v3) with the
+        current HNSW settings, then atomically swap it in. Queries keep hitting the old
+        version until the swap. source is 'collection' (copy the active version) or
+        'scraped_data' (reload the checked-in scraped pages).
+
+        A search_ef tuned at runtime carries over to the new version, so a changed
+        CHROMADB_HNSW_SEARCH_EF only applies to rebuilds with keep_search_ef=False.
+        """
+        if source not in ("collection", "scraped_data"):
+            raise ValueError("source must be 'collection' or 'scraped_data'")
+        if not self._rebuild_lock.acquire(blocking=False):
+            raise RuntimeError("A knowledge base rebuild is already running")
+
+        target = None
+        started = time.perf_counter()
+        try:
+            previous = self.collection
+            target_name = self._next_collection_name()
+            self.rebuild_status = {
+                "state": "running",
+                "source": source,
+                "target": target_name,
+                "documents": 0,
+                "started_at": datetime.datetime.now().isoformat()
+            }
+
+            target = self.client.create_collection(
+                name=target_name,
+                embedding_function=self.embedding_function,
+                metadata=build_collection_metadata(
+                    self.settings, search_ef=collection_search_ef(previous) if keep_search_ef else None
+                )
+            )
+            self._rebuild_target = target
+
+            if source == "scraped_data":
+                from app.utils.chroma_loader import ChromaDataLoader
+                copied = ChromaDataLoader(kb_service=self).load_into(target)
+            else:
+                copied = self._copy_collection(previous, target)
+
+            self._activate_collection(target)
+            self._rebuild_target = None
+
+            # Keep the previous version for rollback, drop anything older
+            for collection in self.client.list_collections():
+                name = collection if isinstance(collection, str) else collection.name
+                if name in (target.name, previous.name):
+                    continue
+                if split_collection_version(name)[0] == split_collection_version(target.name)[0]:
+                    self.client.delete_collection(name)
+                    logger.info(f"Dropped old collection version '{name}'")
+
+            self.rebuild_status = {
+                "state": "completed",
+                "source": source,
+                "collection_name": target.name,
+                "previous_collection": previous.name,
+                "documents": copied,
+                "duration_seconds": round(time.perf_counter() - started, 2),
+                "finished_at": datetime.datetime.now().isoformat()
+            }
+            logger.info(f"Knowledge base rebuilt into '{target.name}' ({copied} documents)")
+            return self.rebuild_status
+
+        except Exception as e:
+            logger.error(f"Knowledge base rebuild failed: {str(e)}")
+            self._rebuild_target = None
+            self.rebuild_status = {"state": "failed", "source": source, "error": str(e)}
+            if target is not None and self.collection is not target:
+                try:
+                    self.client.delete_collection(target.name)
+                except Exception:
+                    pass
+            raise RuntimeError(f"Knowledge base rebuild failed: {str(e)}")
+        finally:
+            self._rebuild_lock.release()
+
+    async def rebuild_in_background(self, source: str = "collection", keep_search_ef: bool = True):
+        """Run rebuild_collection() off the event loop"""
+        try:
+            await asyncio.to_thread(self.rebuild_collection, source, keep_search_ef)
+        except Exception as e:
+            logger.error(f"Background knowledge base rebuild failed: {str(e)}")
+
+
+@lru_cache()
+def get_knowledge_base_service() -> KnowledgeBaseService:
+    """
+    Returns the process-wide KnowledgeBaseService.
+    The embedding model is loaded once and every caller sees collection swaps.
+    """
+    return KnowledgeBaseService()
@@ -10,7 +10,7 @@ from dataclasses import dataclass
 
 from app.core.config import get_settings
 from app.db.repositories.web_monitor import WebMonitorRepository
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import get_knowledge_base_service
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ class GovernmentWebMonitor:
         self.settings = get_settings()
         self.known_hashes = {}
         self.repo = WebMonitorRepository()
-        self.kb_service = KnowledgeBaseService()
+        self.kb_service = get_knowledge_base_service()
         self.session = None
         
     async def __aenter__(self):
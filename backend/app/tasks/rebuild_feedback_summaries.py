@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+
+from app.core.database import connect_db, disconnect_db, db
+from app.db.admin.feedback_repository import rebuild_service_feedback_summaries
+
+
+async def rebuild(service_id=None):
+    await connect_db()
+    try:
+        return await rebuild_service_feedback_summaries(db, service_id)
+    finally:
+        await disconnect_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild service feedback summaries from the Feedback table")
+    parser.add_argument("--service-id", help="Rebuild only this service's summary")
+    args = parser.parse_args()
+
+    result = asyncio.run(rebuild(args.service_id))
+    print(f"Rebuilt feedback summaries: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import signal
+
+from app.core.database import connect_db, disconnect_db
+from app.core.notification_pubsub import notification_bus
+from app.core.worker_supervisor import LEADER, SHARED, worker_supervisor
+from app.services.background_jobs import register_background_jobs, require_shared_notification_bus
+
+logger = logging.getLogger(__name__)
+
+
+async def run():
+    """Run the background jobs until SIGINT/SIGTERM, apart from the API processes"""
+    require_shared_notification_bus()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await connect_db()
+    try:
+        register_background_jobs(worker_supervisor)
+        await worker_supervisor.start([SHARED, LEADER])
+        await stop.wait()
+    finally:
+        logger.info("Shutting down workers...")
+        await worker_supervisor.stop()
+        await notification_bus.close()
+        await disconnect_db()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,27 @@
-import chromadb
-from chromadb.config import Settings
+import argparse
 import json
 from pathlib import Path
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import hashlib
 
-from app.core.config import get_settings
-from app.utils.embeddings import SentenceTransformerEmbeddings
-from app.services.knowledge_base import KnowledgeBaseService
+from app.utils.chunking import prepare_text_chunks
+from app.utils.kb_metadata import build_metadata
+from app.services.knowledge_base import KnowledgeBaseService, get_knowledge_base_service
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ChromaDataLoader:
-    def __init__(self):
-        settings = get_settings()
-        
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(path="chroma_storage")
-        
-        # Use Sentence Transformers for embeddings
-        self.embedding_function = SentenceTransformerEmbeddings(
-            model_name="paraphrase-multilingual-MiniLM-L12-v2"  # This model supports multiple languages
-        )
-        
-        # Create or get collection with metadata
-        self.collection = self.client.get_or_create_collection(
-            name=get_settings().CHROMADB_COLLECTION_NAME,
-            embedding_function=self.embedding_function,
-            metadata={"hnsw:space": "cosine"}  # Use cosine similarity for better matching
-        )
-
+    def __init__(self, kb_service: Optional[KnowledgeBaseService] = None):
+        # Share the API's ChromaDB storage, embedding model and active collection version
+        self.kb_service = kb_service or get_knowledge_base_service()
         self.scraped_data_path = Path(__file__).parent.parent / 'scraped_data'
+
+    @property
+    def collection(self):
+        return self.kb_service.collection
     
     def _generate_document_id(self, content: str, url: str) -> str:
         """Generate a unique ID for a document"""
@@ -42,86 +30,41 @@ class ChromaDataLoader:
     
     def _prepare_text_chunk(self, content: Dict[str, Any], parent_url: str = "") -> List[Dict]:
         """Prepare text chunks from content for embedding"""
-        chunks = []
-        
-        # Process main content
-        if content.get('main_content'):
-            chunks.append({
-                'text': content['main_content'],
-                'url': content['url'],
-                'type': 'main_content',
-                'title': content.get('title', ''),
-                'parent_url': parent_url
-            })
-        
-        # Process sections
-        for section in content.get('sections', []):
-            if section.get('content'):
-                chunks.append({
-                    'text': f"{section.get('heading', '')}\n{section['content']}",
-                    'url': content['url'],
-                    'type': 'section',
-                    'title': section.get('heading', ''),
-                    'parent_url': parent_url
-                })
-        
-        # Process tables
-        for table in content.get('tables', []):
-            table_text = ""
-            if table.get('headers'):
-                table_text += " | ".join(table['headers']) + "\n"
-            for row in table.get('rows', []):
-                table_text += " | ".join(str(cell) for cell in row) + "\n"
-            
-            if table_text:
-                chunks.append({
-                    'text': table_text,
-                    'url': content['url'],
-                    'type': 'table',
-                    'title': content.get('title', ''),
-                    'parent_url': parent_url
-                })
-        
-        # Process forms
-        for form in content.get('forms', []):
-            form_text = f"Form Action: {form.get('action', '')}\n"
-            for input_field in form.get('inputs', []):
-                form_text += f"Field: {input_field.get('name', '')} ({input_field.get('type', '')})\n"
-            
-            chunks.append({
-                'text': form_text,
-                'url': content['url'],
-                'type': 'form',
-                'title': 'Form: ' + content.get('title', ''),
-                'parent_url': parent_url
-            })
-        
-        return chunks
+        return prepare_text_chunks(content, parent_url)
     
     def load_scraped_data(self):
-        """Load scraped data from JSON files into ChromaDB"""
+        """Load scraped data from JSON files into the active ChromaDB collection"""
+        return self.load_into(self.collection)
+
+    def load_into(self, collection) -> int:
+        """Load scraped data from JSON files into the given collection; returns documents written"""
         try:
             # Get all JSON files in the scraped_data directory
             json_files = list(self.scraped_data_path.glob('*.json'))
             logger.info(f"Found {len(json_files)} JSON files to process")
             
+            loaded = 0
             for json_file in json_files:
                 logger.info(f"Processing {json_file.name}")
                 
                 with open(json_file, 'r', encoding='utf-8') as f:
                     content = json.load(f)
                 
-                # Process the content recursively
-                self._process_content(content)
+                documents, metadatas, ids = self._build_batch(content)
+                if documents:
+                    # upsert keeps reloading the same files idempotent
+                    collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+                    loaded += len(documents)
                 
-            logger.info("Completed loading data into ChromaDB")
+            logger.info(f"Completed loading {loaded} documents into '{collection.name}'")
+            return loaded
             
         except Exception as e:
             logger.error(f"Error loading data into ChromaDB: {str(e)}")
             raise
-    
-    async def _process_content(self, content: Dict[str, Any], parent_url: str = ""):
-        """Process content and batch add to ChromaDB"""
+
+    def _build_batch(self, content: Dict[str, Any], parent_url: str = ""):
+        """Chunk a scraped page into parallel documents/metadatas/ids lists"""
         chunks = self._prepare_text_chunk(content, parent_url)
         
         # Prepare batch data
@@ -131,22 +74,29 @@ class ChromaDataLoader:
         
         for chunk in chunks:
             doc_id = self._generate_document_id(chunk['text'], chunk['url'])
-            metadata = {
-                'url': chunk['url'],
-                'type': chunk['type'],
-                'title': chunk['title'],
-                'parent_url': chunk['parent_url'],
-                'timestamp': datetime.utcnow().isoformat()
-            }
+            metadata = build_metadata(
+                url=chunk['url'],
+                content_type=chunk['type'],
+                text=chunk['text'],
+                title=chunk['title'],
+                parent_url=chunk['parent_url'],
+                type=chunk['type'],
+                timestamp=datetime.utcnow().isoformat()
+            )
             
             documents.append(chunk['text'])
             metadatas.append(metadata)
             ids.append(doc_id)
+
+        return documents, metadatas, ids
+    
+    async def _process_content(self, content: Dict[str, Any], parent_url: str = ""):
+        """Process content and batch add to ChromaDB"""
+        documents, metadatas, ids = self._build_batch(content, parent_url)
         
         # USE add_documents() for bulk insertion
         if documents: 
-            kb_service = KnowledgeBaseService()
-            await kb_service.add_documents(documents, metadatas, ids)
+            await self.kb_service.add_documents(documents, metadatas, ids)
     
     def query_similar_content(self, query_text: str, n_results: int = 5) -> List[Dict]:
         """Query ChromaDB for similar content"""
@@ -169,8 +119,19 @@ class ChromaDataLoader:
         ]
 
 def main():
+    parser = argparse.ArgumentParser(description="Load scraped government pages into ChromaDB")
+    parser.add_argument(
+        "--rebuild", action="store_true",
+        help="Build a new collection version from scraped_data and swap it in, instead of upserting into the active one"
+    )
+    args = parser.parse_args()
+
     loader = ChromaDataLoader()
-    loader.load_scraped_data()
+    if args.rebuild:
+        status = loader.kb_service.rebuild_collection(source="scraped_data")
+        print(f"Rebuilt knowledge base: {status}")
+    else:
+        loader.load_scraped_data()
     
     # Test query
     test_query = "How do I renew my driver's license?"
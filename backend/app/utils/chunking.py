@@ -0,0 +1,86 @@
+# backend/app/utils/chunking.py
+from typing import Any, Dict, List
+
+
+def prepare_text_chunks(content: Dict[str, Any], parent_url: str = "") -> List[Dict]:
+    """Prepare text chunks from content for embedding"""
+    chunks = []
+    
+    # Process main content
+    if content.get('main_content'):
+        chunks.append({
+            'text': content['main_content'],
+            'url': content['url'],
+            'type': 'main_content',
+            'title': content.get('title', ''),
+            'parent_url': parent_url
+        })
+    
+    # Process sections
+    for section in content.get('sections', []):
+        if section.get('content'):
+            chunks.append({
+                'text': f"{section.get('heading', '')}\n{section['content']}",
+                'url': content['url'],
+                'type': 'section',
+                'title': section.get('heading', ''),
+                'parent_url': parent_url
+            })
+    
+    # Process tables
+    for table in content.get('tables', []):
+        table_text = ""
+        if table.get('headers'):
+            table_text += " | ".join(table['headers']) + "\n"
+        for row in table.get('rows', []):
+            table_text += " | ".join(str(cell) for cell in row) + "\n"
+        
+        if table_text:
+            chunks.append({
+                'text': table_text,
+                'url': content['url'],
+                'type': 'table',
+                'title': content.get('title', ''),
+                'parent_url': parent_url
+            })
+    
+    # Process forms
+    for form in content.get('forms', []):
+        form_text = f"Form Action: {form.get('action', '')}\n"
+        for input_field in form.get('inputs', []):
+            form_text += f"Field: {input_field.get('name', '')} ({input_field.get('type', '')})\n"
+        
+        chunks.append({
+            'text': form_text,
+            'url': content['url'],
+            'type': 'form',
+            'title': 'Form: ' + content.get('title', ''),
+            'parent_url': parent_url
+        })
+    
+    return chunks
+
+
+def prepare_window_chunks(content: Dict[str, Any], parent_url: str = "", chunk_size: int = 200, overlap: int = 40) -> List[Dict]:
+    """Split a page's structured text into fixed-size, overlapping word windows"""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError("overlap must be between 0 and chunk_size - 1")
+
+    words = " ".join(chunk['text'] for chunk in prepare_text_chunks(content, parent_url)).split()
+    step = chunk_size - overlap
+
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append({
+            'text': ' '.join(words[start:start + chunk_size]),
+            'url': content['url'],
+            'type': 'window',
+            'title': content.get('title', ''),
+            'parent_url': parent_url
+        })
+        if start + chunk_size >= len(words):
+            break
+
+    return chunks
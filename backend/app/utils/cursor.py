@@ -0,0 +1,36 @@
+# backend/app/utils/cursor.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+
+def encode_cursor(sort_value: Any, row_id: str) -> str:
+    """Opaque keyset cursor for the last row of a page: (sort column value, primary key)"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(sort value, primary key) from a cursor made by encode_cursor; ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(row_id, str):
+        raise ValueError("Invalid cursor")
+    return sort_value, row_id
+
+
+def decode_datetime_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Decode a cursor whose sort value is a timestamp; None when no cursor was given"""
+    if not cursor:
+        return None
+    sort_value, row_id = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(str(sort_value).replace("Z", "+00:00")), row_id
+    except ValueError:
+        raise ValueError("Invalid cursor")
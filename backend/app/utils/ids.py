@@ -0,0 +1,57 @@
+# backend/app/utils/ids.py
+import os
+import secrets
+import socket
+import threading
+import time
+
+# Ids in the format of Prisma's @default(cuid()), for rows whose id has to be known before
+# a bulk insert (create_many does not return the rows it creates).
+
+BASE = 36
+BLOCK_SIZE = 4
+DISCRETE_VALUES = BASE ** BLOCK_SIZE
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(number: int) -> str:
+    digits = ""
+    while True:
+        number, remainder = divmod(number, BASE)
+        digits = DIGITS[remainder] + digits
+        if not number:
+            return digits
+
+
+def pad(value: str, size: int) -> str:
+    return value[-size:].rjust(size, "0")
+
+
+def _fingerprint() -> str:
+    host = socket.gethostname()
+    host_id = sum(ord(char) for char in host) + len(host) + BASE
+    return pad(to_base36(os.getpid()), 2) + pad(to_base36(host_id), 2)
+
+
+_FINGERPRINT = _fingerprint()
+_counter = 0
+_counter_lock = threading.Lock()
+
+
+def _next_count() -> int:
+    global _counter
+    with _counter_lock:
+        _counter = (_counter + 1) % DISCRETE_VALUES
+        return _counter
+
+
+def cuid() -> str:
+    """Collision-resistant id: 'c', timestamp, counter, host fingerprint and random blocks"""
+    return (
+        "c"
+        + to_base36(int(time.time() * 1000))
+        + pad(to_base36(_next_count()), BLOCK_SIZE)
+        + _FINGERPRINT
+        + pad(to_base36(secrets.randbelow(DISCRETE_VALUES)), BLOCK_SIZE)
+        + pad(to_base36(secrets.randbelow(DISCRETE_VALUES)), BLOCK_SIZE)
+    )
@@ -0,0 +1,117 @@
+# backend/app/utils/kb_metadata.py
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+# Government domains and the department slug their content belongs to.
+# The longest matching suffix wins, so "dmt.gov.lk" is not filed under "gov.lk".
+DEPARTMENT_BY_DOMAIN = {
+    "dmt.gov.lk": "motor_traffic",
+    "transport.gov.lk": "transport",
+    "immigration.gov.lk": "immigration",
+    "health.gov.lk": "health",
+    "gov.lk": "government_portal",
+}
+
+# Version of the filter fields build_metadata writes, recorded on every collection
+# version created since; older collections get them on their next rebuild
+METADATA_SCHEMA_VERSION = 1
+
+CONTENT_TYPES = {"main_content", "section", "table", "form", "webpage", "window"}
+LANGUAGES = {"en", "si", "ta"}
+
+# Unicode blocks used to tell Sinhala and Tamil text apart from English
+SINHALA_RANGE = (0x0D80, 0x0DFF)
+TAMIL_RANGE = (0x0B80, 0x0BFF)
+
+
+def infer_department(url: str) -> str:
+    """Department slug for a government URL, or 'unknown'"""
+    host = (urlparse(url).hostname or "").lower()
+    for domain in sorted(DEPARTMENT_BY_DOMAIN, key=len, reverse=True):
+        if host == domain or host.endswith("." + domain):
+            return DEPARTMENT_BY_DOMAIN[domain]
+    return "unknown"
+
+
+def detect_language(text: str, url: Optional[str] = None) -> str:
+    """'si', 'ta' or 'en' from the script of the text, falling back to a ?lang= URL parameter"""
+    sinhala = tamil = letters = 0
+    for char in text or "":
+        code = ord(char)
+        if SINHALA_RANGE[0] <= code <= SINHALA_RANGE[1]:
+            sinhala += 1
+        elif TAMIL_RANGE[0] <= code <= TAMIL_RANGE[1]:
+            tamil += 1
+        if char.isalpha():
+            letters += 1
+
+    if letters:
+        if sinhala / letters >= 0.3:
+            return "si"
+        if tamil / letters >= 0.3:
+            return "ta"
+        if sinhala == 0 and tamil == 0:
+            return "en"
+
+    if url:
+        lang = parse_qs(urlparse(url).query).get("lang", [""])[0].lower()
+        if lang in LANGUAGES:
+            return lang
+
+    return "en"
+
+
+def build_metadata(
+    url: str,
+    content_type: str,
+    text: str = "",
+    title: str = "",
+    parent_url: str = "",
+    **extra: Any
+) -> Dict[str, Any]:
+    """Metadata every ingestion path writes, so retrieval can filter on it consistently"""
+    metadata = {
+        "url": url,
+        "source_type": "government_website",
+        "department": infer_department(url),
+        "language": detect_language(text, url),
+        "content_type": content_type,
+        "title": title or "",
+        "parent_url": parent_url or "",
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def normalize_metadata(metadata: Optional[Dict[str, Any]], document: str = "") -> Dict[str, Any]:
+    """Fill filter fields missing from documents indexed before they were written"""
+    metadata = dict(metadata or {})
+    url = metadata.get("url", "")
+    metadata.setdefault("source_type", "government_website")
+    metadata.setdefault("department", infer_department(url))
+    metadata.setdefault("language", detect_language(document, url))
+    metadata.setdefault("content_type", metadata.get("type", "webpage"))
+    return metadata
+
+
+def build_where(
+    department: Optional[Union[str, List[str]]] = None,
+    language: Optional[str] = None,
+    content_type: Optional[Union[str, List[str]]] = None
+) -> Optional[Dict[str, Any]]:
+    """Chroma where clause for the given scope, or None for an unscoped search"""
+    conditions = []
+    for field, value in (("department", department), ("language", language), ("content_type", content_type)):
+        if not value:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            conditions.append({field: {"$in": values}} if len(values) > 1 else {field: values[0]})
+        else:
+            conditions.append({field: value})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
@@ -0,0 +1,29 @@
+# backend/app/utils/sql_params.py
+from datetime import datetime, timezone
+from typing import Any, List
+
+# Parameters for raw SQL run with query_raw/execute_raw. DateTime columns are stored as
+# UTC timestamp(3) without a time zone, so timestamps are bound as naive UTC ISO strings.
+
+
+def timestamp_param(value: datetime) -> str:
+    """ISO timestamp comparable with the (UTC, timezone-less) DateTime columns"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def cursor_timestamp(value: Any) -> str:
+    """Keyset parameter for a timestamp read back from query_raw (datetime or ISO string)"""
+    return timestamp_param(value) if isinstance(value, datetime) else str(value)
+
+
+def like_pattern(search: str) -> str:
+    """Case-insensitive substring pattern with LIKE wildcards in the search escaped"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def in_params(ids: List[str], first: int) -> str:
+    """$n placeholders for an IN list starting at parameter number first"""
+    return ", ".join(f"${first + i}" for i in range(len(ids)))